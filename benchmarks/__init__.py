@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the workers. Run each module with `python -m benchmarks.<name> --help`.
+"""
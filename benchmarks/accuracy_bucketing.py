@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of the evaluation accuracy statistics.
+
+Compares the per-transaction loop eval.py used to run against the batched version in
+solbolt.accuracy on a synthetic set of transactions, and checks that both give the same summaries.
+
+    python -m benchmarks.accuracy_bucketing --transactions 1000000
+"""
+import argparse
+import math
+import random
+import time
+from statistics import mean, median
+
+from solbolt.accuracy import TransactionSampler
+
+GAS_CLASSES = [2500, 5000, 10000, 20000, 50000, 100000, 500000, 1000000]
+PAGE_SIZE = 1000
+
+def synthetic_pages(transactions, functions, seed):
+    rng = random.Random(seed)
+    selectors = [f"0x{rng.getrandbits(32):08x}" for _ in range(functions)]
+    # Some transactions call functions the symbolic execution did not see
+    unknown = [f"0x{rng.getrandbits(32):08x}" for _ in range(functions // 4 + 1)]
+    function_gas = {selector: rng.randint(21000, 600000) for selector in selectors}
+
+    pages = list()
+    for start in range(0, transactions, PAGE_SIZE):
+        page = list()
+        for _ in range(min(PAGE_SIZE, transactions - start)):
+            selector = rng.choice(selectors if rng.random() < 0.9 else unknown)
+            page.append({"input": selector + "a9059cbb" * 8, "gasUsed": str(int(rng.lognormvariate(11, 1)) + 21000)})
+        pages.append(page)
+    return function_gas, pages
+
+def loop_statistics(function_map, pages, per_function):
+    """
+    The per-transaction loop and linear class scan eval.py used before
+    """
+    def accuracy_summary(txn_list):
+        return {"sum": sum(txn_list), "mean": mean(txn_list), "median": median(txn_list), "count": len(txn_list)}
+
+    overall_accuracy = list()
+    per_function_stats = {key: list() for key in function_map}
+    per_gas_class_stats = [list() for _ in GAS_CLASSES]
+    per_gas_class_stats.append(list())
+
+    for etherscan_txns in pages:
+        for txn_data in etherscan_txns:
+            fn_hash = txn_data["input"][:10]
+            if fn_hash in function_map:
+                if len(per_function_stats[fn_hash]) >= per_function:
+                    continue
+                concrete_gas_used = int(txn_data["gasUsed"])
+                accuracy = function_map[fn_hash] / concrete_gas_used
+                overall_accuracy.append(accuracy)
+                per_function_stats[fn_hash].append(accuracy)
+                try:
+                    gas_class = next(index for index, value in enumerate(GAS_CLASSES) if value > concrete_gas_used)
+                except StopIteration:
+                    gas_class = -1
+                per_gas_class_stats[gas_class].append(accuracy)
+
+    return (
+        accuracy_summary(overall_accuracy),
+        {key: accuracy_summary(txns) for key, txns in per_function_stats.items() if len(txns) > 0},
+        {index: accuracy_summary(txns) for index, txns in enumerate(per_gas_class_stats) if len(txns) > 0},
+    )
+
+def batched_statistics(function_map, pages, per_function):
+    sampler = TransactionSampler(function_map, per_function)
+    for page in pages:
+        sampler.add_page(page)
+    return sampler.statistics(GAS_CLASSES)
+
+def same_summaries(a, b):
+    if a.keys() != b.keys():
+        return False
+    return all(a[key]["count"] == b[key]["count"] and
+               all(math.isclose(a[key][stat], b[key][stat], rel_tol=1e-9) for stat in ("sum", "mean", "median"))
+               for key in a)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the evaluation accuracy statistics')
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--functions', type=int, default=40)
+    parser.add_argument('--per-function', type=int, default=None,
+                        help='Transactions kept per function, defaults to all of them')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation, the fastest is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    per_function = args.per_function or args.transactions
+    function_gas, pages = synthetic_pages(args.transactions, args.functions, args.seed)
+
+    results = dict()
+    for name, fn in (("loop", loop_statistics), ("batched", batched_statistics)):
+        timings = list()
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = fn(function_gas, pages, per_function)
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<8} {min(timings):8.3f}s  ({args.transactions / min(timings):,.0f} transactions/s)")
+
+    (loop_overall, loop_functions, loop_classes) = results["loop"]
+    (batched_overall, batched_functions, batched_classes) = results["batched"]
+    matches = (same_summaries({0: loop_overall}, {0: batched_overall}) and
+               same_summaries(loop_functions, batched_functions) and
+               same_summaries(loop_classes, batched_classes))
+    print("Summaries match" if matches else "SUMMARIES DIFFER")
+    if not matches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+pragma solidity ^0.5.0;
+
+contract Auction {
+    address payable public beneficiary;
+    uint256 public auctionEnd;
+    address public highestBidder;
+    uint256 public highestBid;
+    bool public ended;
+
+    mapping(address => uint256) public pendingReturns;
+
+    event HighestBidIncreased(address bidder, uint256 amount);
+    event AuctionEnded(address winner, uint256 amount);
+
+    constructor(uint256 biddingTime, address payable _beneficiary) public {
+        beneficiary = _beneficiary;
+        auctionEnd = now + biddingTime;
+    }
+
+    function bid() public payable {
+        require(now <= auctionEnd, "Auction already ended.");
+        require(msg.value > highestBid, "There already is a higher bid.");
+
+        if (highestBid != 0) {
+            pendingReturns[highestBidder] += highestBid;
+        }
+        highestBidder = msg.sender;
+        highestBid = msg.value;
+        emit HighestBidIncreased(msg.sender, msg.value);
+    }
+
+    function withdraw() public returns (bool) {
+        uint256 amount = pendingReturns[msg.sender];
+        if (amount > 0) {
+            pendingReturns[msg.sender] = 0;
+
+            if (!msg.sender.send(amount)) {
+                pendingReturns[msg.sender] = amount;
+                return false;
+            }
+        }
+        return true;
+    }
+
+    function endAuction() public {
+        require(now >= auctionEnd, "Auction not yet ended.");
+        require(!ended, "endAuction has already been called.");
+
+        ended = true;
+        emit AuctionEnded(highestBidder, highestBid);
+
+        beneficiary.transfer(highestBid);
+    }
+}
@@ -0,0 +1,71 @@
+pragma solidity ^0.4.11;
+
+import "./Ownable.sol";
+import "./SafeMath.sol";
+
+contract Crowdsale is Ownable {
+    using SafeMath for uint256;
+
+    uint256 public startTime;
+    uint256 public endTime;
+    uint256 public rate;
+    uint256 public cap;
+    uint256 public weiRaised;
+    bool public finalized;
+
+    mapping (address => uint256) public contributions;
+    address[] public contributors;
+
+    event TokenPurchase(address indexed purchaser, uint256 value, uint256 amount);
+    event Finalized();
+
+    function Crowdsale(uint256 _startTime, uint256 _endTime, uint256 _rate, uint256 _cap) public {
+        require(_endTime >= _startTime);
+        require(_rate > 0);
+        require(_cap > 0);
+        startTime = _startTime;
+        endTime = _endTime;
+        rate = _rate;
+        cap = _cap;
+    }
+
+    function () public payable {
+        buyTokens();
+    }
+
+    function buyTokens() public payable {
+        require(validPurchase());
+        uint256 tokens = msg.value.mul(rate);
+        weiRaised = weiRaised.add(msg.value);
+        if (contributions[msg.sender] == 0) {
+            contributors.push(msg.sender);
+        }
+        contributions[msg.sender] = contributions[msg.sender].add(tokens);
+        TokenPurchase(msg.sender, msg.value, tokens);
+    }
+
+    function validPurchase() internal constant returns (bool) {
+        bool withinPeriod = now >= startTime && now <= endTime;
+        bool nonZeroPurchase = msg.value != 0;
+        bool withinCap = weiRaised.add(msg.value) <= cap;
+        return withinPeriod && nonZeroPurchase && withinCap;
+    }
+
+    function hasEnded() public constant returns (bool) {
+        return now > endTime || weiRaised >= cap;
+    }
+
+    function totalContributed(uint256 from, uint256 to) public constant returns (uint256 total) {
+        for (uint256 i = from; i < to && i < contributors.length; i++) {
+            total = total.add(contributions[contributors[i]]);
+        }
+    }
+
+    function finalize() public onlyOwner {
+        require(!finalized);
+        require(hasEnded());
+        finalized = true;
+        Finalized();
+        owner.transfer(this.balance);
+    }
+}
@@ -0,0 +1,582 @@
+pragma solidity ^0.4.15;
+
+import "./SafeMath.sol";
+import "./Ownable.sol";
+import "./VotesToken.sol";
+import "./Treasury.sol";
+
+contract Dao is Treasury, Pausable {
+    using SafeMath for uint256;
+
+    enum ProposalState { Pending, Active, Cancelled, Defeated, Succeeded, Queued, Expired, Executed, Vetoed }
+
+    enum Role { None, Member, Reviewer, Treasurer, Guardian }
+
+    struct Action {
+        address target;
+        uint256 value;
+        bytes data;
+    }
+
+    struct Proposal {
+        address proposer;
+        uint256 startBlock;
+        uint256 endBlock;
+        uint256 eta;
+        uint256 forVotes;
+        uint256 againstVotes;
+        uint256 abstainVotes;
+        bool cancelled;
+        bool executed;
+        bool vetoed;
+        bytes32 descriptionHash;
+        uint256 actionCount;
+    }
+
+    struct Receipt {
+        bool hasVoted;
+        uint8 support;
+        uint256 votes;
+    }
+
+    struct Member {
+        Role role;
+        uint256 joined;
+        uint256 reputation;
+        uint256 proposals;
+        uint256 votesCast;
+        bool active;
+    }
+
+    struct Grant {
+        address recipient;
+        address token;
+        uint256 amount;
+        uint256 paid;
+        uint256 milestoneCount;
+        uint256 approvedMilestones;
+        uint256 proposalId;
+        bool cancelled;
+    }
+
+    struct Milestone {
+        uint256 amount;
+        bytes32 deliverable;
+        bool submitted;
+        uint256 approvals;
+        bool paid;
+    }
+
+    VotesToken public token;
+
+    uint256 public votingDelay = 1;
+    uint256 public votingPeriod = 17280;
+    uint256 public proposalThreshold;
+    uint256 public quorumBasisPoints = 400;
+    uint256 public timelockDelay = 2 days;
+    uint256 public gracePeriod = 14 days;
+    uint256 public maxActions = 10;
+    uint256 public milestoneApprovals = 2;
+
+    uint256 public constant MIN_VOTING_PERIOD = 5760;
+    uint256 public constant MAX_VOTING_PERIOD = 80640;
+    uint256 public constant MIN_TIMELOCK_DELAY = 1 days;
+    uint256 public constant MAX_TIMELOCK_DELAY = 30 days;
+
+    uint256 public proposalCount;
+    uint256 public grantCount;
+    uint256 public memberCount;
+
+    mapping (uint256 => Proposal) public proposals;
+    mapping (uint256 => mapping (uint256 => Action)) internal actions;
+    mapping (uint256 => mapping (address => Receipt)) internal receipts;
+    mapping (address => uint256) public latestProposalIds;
+    mapping (bytes32 => bool) public queuedTransactions;
+    mapping (address => Member) public members;
+    mapping (uint256 => Grant) public grants;
+    mapping (uint256 => mapping (uint256 => Milestone)) internal milestones;
+    mapping (bytes32 => bool) internal milestoneApprovedBy;
+    mapping (address => uint256[]) internal grantsByRecipient;
+    address[] public memberList;
+
+    event ProposalCreated(uint256 indexed id, address indexed proposer, uint256 startBlock, uint256 endBlock, string description);
+    event VoteCast(address indexed voter, uint256 indexed proposalId, uint8 support, uint256 votes, string reason);
+    event ProposalCancelled(uint256 indexed id);
+    event ProposalQueued(uint256 indexed id, uint256 eta);
+    event ProposalExecuted(uint256 indexed id);
+    event ProposalVetoed(uint256 indexed id, address indexed guardian);
+    event ActionExecuted(uint256 indexed proposalId, uint256 index, address target, uint256 value);
+    event ParameterChanged(string parameter, uint256 oldValue, uint256 newValue);
+    event MemberAdded(address indexed account, uint8 role);
+    event MemberRemoved(address indexed account);
+    event RoleChanged(address indexed account, uint8 oldRole, uint8 newRole);
+    event ReputationChanged(address indexed account, uint256 reputation);
+    event GrantCreated(uint256 indexed id, address indexed recipient, address grantToken, uint256 amount);
+    event MilestoneAdded(uint256 indexed grantId, uint256 index, uint256 amount);
+    event MilestoneSubmitted(uint256 indexed grantId, uint256 index, bytes32 deliverable);
+    event MilestoneApproved(uint256 indexed grantId, uint256 index, address reviewer);
+    event MilestonePaid(uint256 indexed grantId, uint256 index, uint256 amount);
+    event GrantCancelled(uint256 indexed id, uint256 unpaid);
+
+    modifier onlyGovernance() {
+        // Parameters only change through an executed proposal
+        require(msg.sender == address(this));
+        _;
+    }
+
+    modifier onlyRole(Role role) {
+        require(members[msg.sender].active && members[msg.sender].role >= role);
+        _;
+    }
+
+    function Dao(address _token, uint256 _proposalThreshold) public {
+        require(_token != address(0));
+        token = VotesToken(_token);
+        proposalThreshold = _proposalThreshold;
+        addMemberInternal(msg.sender, Role.Guardian);
+    }
+
+    // Governance
+
+    function propose(address[] targets, uint256[] values, bytes calldatas, uint256[] calldataLengths, string description)
+        public whenNotPaused returns (uint256)
+    {
+        require(token.getPriorVotes(msg.sender, block.number - 1) >= proposalThreshold);
+        require(targets.length > 0 && targets.length <= maxActions);
+        require(targets.length == values.length && targets.length == calldataLengths.length);
+
+        uint256 latest = latestProposalIds[msg.sender];
+        if (latest != 0) {
+            ProposalState latestState = state(latest);
+            require(latestState != ProposalState.Active && latestState != ProposalState.Pending);
+        }
+
+        proposalCount = proposalCount.add(1);
+        uint256 id = proposalCount;
+        Proposal storage proposal = proposals[id];
+        proposal.proposer = msg.sender;
+        proposal.startBlock = block.number.add(votingDelay);
+        proposal.endBlock = proposal.startBlock.add(votingPeriod);
+        proposal.descriptionHash = keccak256(description);
+        proposal.actionCount = targets.length;
+
+        storeActions(id, targets, values, calldatas, calldataLengths);
+
+        latestProposalIds[msg.sender] = id;
+        if (members[msg.sender].active) {
+            members[msg.sender].proposals = members[msg.sender].proposals.add(1);
+        }
+        ProposalCreated(id, msg.sender, proposal.startBlock, proposal.endBlock, description);
+        return id;
+    }
+
+    function storeActions(uint256 id, address[] targets, uint256[] values, bytes calldatas, uint256[] calldataLengths) internal {
+        uint256 offset = 0;
+        for (uint256 i = 0; i < targets.length; i++) {
+            require(targets[i] != address(0));
+            bytes memory data = new bytes(calldataLengths[i]);
+            for (uint256 j = 0; j < calldataLengths[i]; j++) {
+                data[j] = calldatas[offset + j];
+            }
+            offset = offset.add(calldataLengths[i]);
+            actions[id][i] = Action(targets[i], values[i], data);
+        }
+        require(offset == calldatas.length);
+    }
+
+    function castVote(uint256 proposalId, uint8 support) public returns (uint256) {
+        return castVoteInternal(msg.sender, proposalId, support, "");
+    }
+
+    function castVoteWithReason(uint256 proposalId, uint8 support, string reason) public returns (uint256) {
+        return castVoteInternal(msg.sender, proposalId, support, reason);
+    }
+
+    function castVoteInternal(address voter, uint256 proposalId, uint8 support, string reason) internal returns (uint256) {
+        require(state(proposalId) == ProposalState.Active);
+        require(support <= 2);
+        Proposal storage proposal = proposals[proposalId];
+        Receipt storage receipt = receipts[proposalId][voter];
+        require(!receipt.hasVoted);
+
+        uint256 votes = token.getPriorVotes(voter, proposal.startBlock);
+        if (support == 0) {
+            proposal.againstVotes = proposal.againstVotes.add(votes);
+        } else if (support == 1) {
+            proposal.forVotes = proposal.forVotes.add(votes);
+        } else {
+            proposal.abstainVotes = proposal.abstainVotes.add(votes);
+        }
+
+        receipt.hasVoted = true;
+        receipt.support = support;
+        receipt.votes = votes;
+
+        if (members[voter].active) {
+            members[voter].votesCast = members[voter].votesCast.add(1);
+            members[voter].reputation = members[voter].reputation.add(1);
+        }
+        VoteCast(voter, proposalId, support, votes, reason);
+        return votes;
+    }
+
+    function quorum(uint256 blockNumber) public constant returns (uint256) {
+        return token.totalSupplyAt(blockNumber).percent(quorumBasisPoints);
+    }
+
+    function state(uint256 proposalId) public constant returns (ProposalState) {
+        require(proposalId > 0 && proposalId <= proposalCount);
+        Proposal storage proposal = proposals[proposalId];
+
+        if (proposal.vetoed) {
+            return ProposalState.Vetoed;
+        }
+        if (proposal.cancelled) {
+            return ProposalState.Cancelled;
+        }
+        if (proposal.executed) {
+            return ProposalState.Executed;
+        }
+        if (block.number <= proposal.startBlock) {
+            return ProposalState.Pending;
+        }
+        if (block.number <= proposal.endBlock) {
+            return ProposalState.Active;
+        }
+        if (proposal.forVotes <= proposal.againstVotes
+                || proposal.forVotes.add(proposal.abstainVotes) < quorum(proposal.startBlock)) {
+            return ProposalState.Defeated;
+        }
+        if (proposal.eta == 0) {
+            return ProposalState.Succeeded;
+        }
+        if (now >= proposal.eta.add(gracePeriod)) {
+            return ProposalState.Expired;
+        }
+        return ProposalState.Queued;
+    }
+
+    function queue(uint256 proposalId) public whenNotPaused {
+        require(state(proposalId) == ProposalState.Succeeded);
+        Proposal storage proposal = proposals[proposalId];
+        uint256 eta = now.add(timelockDelay);
+        for (uint256 i = 0; i < proposal.actionCount; i++) {
+            bytes32 txHash = actionHash(proposalId, i, eta);
+            require(!queuedTransactions[txHash]);
+            queuedTransactions[txHash] = true;
+        }
+        proposal.eta = eta;
+        ProposalQueued(proposalId, eta);
+    }
+
+    function execute(uint256 proposalId) public payable whenNotPaused {
+        require(state(proposalId) == ProposalState.Queued);
+        Proposal storage proposal = proposals[proposalId];
+        require(now >= proposal.eta);
+        proposal.executed = true;
+
+        for (uint256 i = 0; i < proposal.actionCount; i++) {
+            Action storage action = actions[proposalId][i];
+            bytes32 txHash = actionHash(proposalId, i, proposal.eta);
+            require(queuedTransactions[txHash]);
+            queuedTransactions[txHash] = false;
+            require(action.target.call.value(action.value)(action.data));
+            ActionExecuted(proposalId, i, action.target, action.value);
+        }
+
+        if (members[proposal.proposer].active) {
+            members[proposal.proposer].reputation = members[proposal.proposer].reputation.add(10);
+            ReputationChanged(proposal.proposer, members[proposal.proposer].reputation);
+        }
+        ProposalExecuted(proposalId);
+    }
+
+    function cancel(uint256 proposalId) public {
+        ProposalState current = state(proposalId);
+        require(current != ProposalState.Executed && current != ProposalState.Cancelled && current != ProposalState.Vetoed);
+        Proposal storage proposal = proposals[proposalId];
+        // Anyone may cancel a proposal whose proposer dropped below the threshold
+        require(msg.sender == proposal.proposer
+                || token.getPriorVotes(proposal.proposer, block.number - 1) < proposalThreshold);
+
+        proposal.cancelled = true;
+        clearQueued(proposalId);
+        ProposalCancelled(proposalId);
+    }
+
+    function veto(uint256 proposalId) public onlyRole(Role.Guardian) {
+        ProposalState current = state(proposalId);
+        require(current == ProposalState.Succeeded || current == ProposalState.Queued || current == ProposalState.Active);
+        proposals[proposalId].vetoed = true;
+        clearQueued(proposalId);
+        ProposalVetoed(proposalId, msg.sender);
+    }
+
+    function clearQueued(uint256 proposalId) internal {
+        Proposal storage proposal = proposals[proposalId];
+        if (proposal.eta == 0) {
+            return;
+        }
+        for (uint256 i = 0; i < proposal.actionCount; i++) {
+            queuedTransactions[actionHash(proposalId, i, proposal.eta)] = false;
+        }
+    }
+
+    function actionHash(uint256 proposalId, uint256 index, uint256 eta) public constant returns (bytes32) {
+        Action storage action = actions[proposalId][index];
+        return keccak256(proposalId, index, action.target, action.value, action.data, eta);
+    }
+
+    function getAction(uint256 proposalId, uint256 index) public constant returns (address target, uint256 value, bytes32 dataHash) {
+        require(index < proposals[proposalId].actionCount);
+        Action storage action = actions[proposalId][index];
+        return (action.target, action.value, keccak256(action.data));
+    }
+
+    function getReceipt(uint256 proposalId, address voter) public constant returns (bool hasVoted, uint8 support, uint256 votes) {
+        Receipt storage receipt = receipts[proposalId][voter];
+        return (receipt.hasVoted, receipt.support, receipt.votes);
+    }
+
+    function proposalVotes(uint256 proposalId) public constant returns (uint256 againstVotes, uint256 forVotes, uint256 abstainVotes) {
+        Proposal storage proposal = proposals[proposalId];
+        return (proposal.againstVotes, proposal.forVotes, proposal.abstainVotes);
+    }
+
+    // Parameters, changed by proposals calling back into the DAO
+
+    function setVotingDelay(uint256 newVotingDelay) public onlyGovernance {
+        require(newVotingDelay <= 40320);
+        ParameterChanged("votingDelay", votingDelay, newVotingDelay);
+        votingDelay = newVotingDelay;
+    }
+
+    function setVotingPeriod(uint256 newVotingPeriod) public onlyGovernance {
+        require(newVotingPeriod >= MIN_VOTING_PERIOD && newVotingPeriod <= MAX_VOTING_PERIOD);
+        ParameterChanged("votingPeriod", votingPeriod, newVotingPeriod);
+        votingPeriod = newVotingPeriod;
+    }
+
+    function setProposalThreshold(uint256 newProposalThreshold) public onlyGovernance {
+        require(newProposalThreshold <= token.totalSupply().percent(1000));
+        ParameterChanged("proposalThreshold", proposalThreshold, newProposalThreshold);
+        proposalThreshold = newProposalThreshold;
+    }
+
+    function setQuorum(uint256 newQuorumBasisPoints) public onlyGovernance {
+        require(newQuorumBasisPoints > 0 && newQuorumBasisPoints <= 10000);
+        ParameterChanged("quorumBasisPoints", quorumBasisPoints, newQuorumBasisPoints);
+        quorumBasisPoints = newQuorumBasisPoints;
+    }
+
+    function setTimelockDelay(uint256 newTimelockDelay) public onlyGovernance {
+        require(newTimelockDelay >= MIN_TIMELOCK_DELAY && newTimelockDelay <= MAX_TIMELOCK_DELAY);
+        ParameterChanged("timelockDelay", timelockDelay, newTimelockDelay);
+        timelockDelay = newTimelockDelay;
+    }
+
+    function setGracePeriod(uint256 newGracePeriod) public onlyGovernance {
+        require(newGracePeriod >= 1 days);
+        ParameterChanged("gracePeriod", gracePeriod, newGracePeriod);
+        gracePeriod = newGracePeriod;
+    }
+
+    function setMaxActions(uint256 newMaxActions) public onlyGovernance {
+        require(newMaxActions > 0 && newMaxActions <= 50);
+        ParameterChanged("maxActions", maxActions, newMaxActions);
+        maxActions = newMaxActions;
+    }
+
+    function setMilestoneApprovals(uint256 newMilestoneApprovals) public onlyGovernance {
+        require(newMilestoneApprovals > 0);
+        ParameterChanged("milestoneApprovals", milestoneApprovals, newMilestoneApprovals);
+        milestoneApprovals = newMilestoneApprovals;
+    }
+
+    // Members
+
+    function addMember(address account, Role role) public onlyGovernance {
+        addMemberInternal(account, role);
+    }
+
+    function addMemberInternal(address account, Role role) internal {
+        require(account != address(0));
+        require(role != Role.None);
+        Member storage member = members[account];
+        require(!member.active);
+        if (member.joined == 0) {
+            memberList.push(account);
+        }
+        member.role = role;
+        member.joined = now;
+        member.active = true;
+        memberCount = memberCount.add(1);
+        MemberAdded(account, uint8(role));
+    }
+
+    function removeMember(address account) public onlyGovernance {
+        Member storage member = members[account];
+        require(member.active);
+        member.active = false;
+        member.role = Role.None;
+        memberCount = memberCount.sub(1);
+        MemberRemoved(account);
+    }
+
+    function setRole(address account, Role role) public onlyGovernance {
+        Member storage member = members[account];
+        require(member.active && role != Role.None);
+        RoleChanged(account, uint8(member.role), uint8(role));
+        member.role = role;
+    }
+
+    function resign() public {
+        Member storage member = members[msg.sender];
+        require(member.active);
+        // The last guardian cannot leave, or vetoes would be impossible
+        require(member.role != Role.Guardian || countRole(Role.Guardian) > 1);
+        member.active = false;
+        member.role = Role.None;
+        memberCount = memberCount.sub(1);
+        MemberRemoved(msg.sender);
+    }
+
+    function slashReputation(address account, uint256 amount) public onlyRole(Role.Guardian) {
+        Member storage member = members[account];
+        require(member.active);
+        member.reputation = member.reputation > amount ? member.reputation - amount : 0;
+        ReputationChanged(account, member.reputation);
+    }
+
+    function countRole(Role role) public constant returns (uint256) {
+        uint256 count = 0;
+        for (uint256 i = 0; i < memberList.length; i++) {
+            Member storage member = members[memberList[i]];
+            if (member.active && member.role == role) {
+                count++;
+            }
+        }
+        return count;
+    }
+
+    function memberListLength() public constant returns (uint256) {
+        return memberList.length;
+    }
+
+    function isTreasurer(address account) public constant returns (bool) {
+        return account == address(this) || (members[account].active && members[account].role >= Role.Treasurer);
+    }
+
+    // Grants, paid out per milestone once enough reviewers approved it
+
+    function createGrant(address recipient, address grantToken, uint256[] amounts, uint256 proposalId)
+        public onlyGovernance returns (uint256)
+    {
+        require(recipient != address(0));
+        require(amounts.length > 0 && amounts.length <= 20);
+
+        uint256 total = 0;
+        for (uint256 i = 0; i < amounts.length; i++) {
+            require(amounts[i] > 0);
+            total = total.add(amounts[i]);
+        }
+        require(total <= available(grantToken));
+
+        uint256 id = grantCount;
+        grants[id] = Grant(recipient, grantToken, total, 0, amounts.length, 0, proposalId, false);
+        for (i = 0; i < amounts.length; i++) {
+            milestones[id][i].amount = amounts[i];
+            MilestoneAdded(id, i, amounts[i]);
+        }
+        grantsByRecipient[recipient].push(id);
+        reserved[grantToken] = reserved[grantToken].add(total);
+        grantCount = grantCount.add(1);
+        GrantCreated(id, recipient, grantToken, total);
+        return id;
+    }
+
+    function submitMilestone(uint256 grantId, uint256 index, bytes32 deliverable) public whenNotPaused {
+        Grant storage grant = grants[grantId];
+        require(msg.sender == grant.recipient && !grant.cancelled);
+        require(index < grant.milestoneCount);
+        Milestone storage milestone = milestones[grantId][index];
+        require(!milestone.paid);
+        // Resubmitting a deliverable restarts its review
+        milestone.deliverable = deliverable;
+        milestone.submitted = true;
+        milestone.approvals = 0;
+        MilestoneSubmitted(grantId, index, deliverable);
+    }
+
+    function approveMilestone(uint256 grantId, uint256 index) public onlyRole(Role.Reviewer) whenNotPaused {
+        Grant storage grant = grants[grantId];
+        require(!grant.cancelled && index < grant.milestoneCount);
+        require(msg.sender != grant.recipient);
+        Milestone storage milestone = milestones[grantId][index];
+        require(milestone.submitted && !milestone.paid);
+        bytes32 approvalKey = keccak256(grantId, index, milestone.deliverable, msg.sender);
+        require(!milestoneApprovedBy[approvalKey]);
+        milestoneApprovedBy[approvalKey] = true;
+        milestone.approvals = milestone.approvals.add(1);
+        members[msg.sender].reputation = members[msg.sender].reputation.add(1);
+        MilestoneApproved(grantId, index, msg.sender);
+
+        if (milestone.approvals >= milestoneApprovals) {
+            payMilestone(grantId, index);
+        }
+    }
+
+    function payMilestone(uint256 grantId, uint256 index) internal {
+        Grant storage grant = grants[grantId];
+        Milestone storage milestone = milestones[grantId][index];
+        milestone.paid = true;
+        grant.paid = grant.paid.add(milestone.amount);
+        grant.approvedMilestones = grant.approvedMilestones.add(1);
+        reserved[grant.token] = reserved[grant.token].sub(milestone.amount);
+        pay(grant.token, grant.recipient, milestone.amount);
+        MilestonePaid(grantId, index, milestone.amount);
+    }
+
+    function cancelGrant(uint256 grantId) public {
+        Grant storage grant = grants[grantId];
+        require(!grant.cancelled);
+        require(msg.sender == address(this) || (members[msg.sender].active && members[msg.sender].role == Role.Guardian));
+        uint256 unpaid = grant.amount.sub(grant.paid);
+        grant.cancelled = true;
+        reserved[grant.token] = reserved[grant.token].sub(unpaid);
+        GrantCancelled(grantId, unpaid);
+    }
+
+    function getMilestone(uint256 grantId, uint256 index)
+        public constant returns (uint256 amount, bytes32 deliverable, bool submitted, uint256 approvals, bool paid)
+    {
+        Milestone storage milestone = milestones[grantId][index];
+        return (milestone.amount, milestone.deliverable, milestone.submitted, milestone.approvals, milestone.paid);
+    }
+
+    function grantsOf(address recipient) public constant returns (uint256[]) {
+        return grantsByRecipient[recipient];
+    }
+
+    function grantProgress(uint256 grantId) public constant returns (uint256 paidBasisPoints, uint256 remaining) {
+        Grant storage grant = grants[grantId];
+        if (grant.amount == 0) {
+            return (0, 0);
+        }
+        return (grant.paid.mul(10000).div(grant.amount), grant.amount.sub(grant.paid));
+    }
+
+    // Emergency controls
+
+    function emergencyPause() public onlyRole(Role.Guardian) {
+        paused = true;
+        Pause();
+    }
+
+    function emergencyWithdraw(address withdrawToken, address to, uint256 amount) public onlyGovernance {
+        require(to != address(0));
+        require(amount <= available(withdrawToken));
+        pay(withdrawToken, to, amount);
+        Spent(withdrawToken, to, amount, "emergency");
+    }
+}
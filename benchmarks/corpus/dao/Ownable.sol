@@ -0,0 +1,56 @@
+pragma solidity ^0.4.15;
+
+contract Ownable {
+    address public owner;
+    address public pendingOwner;
+
+    event OwnershipTransferred(address indexed previousOwner, address indexed newOwner);
+
+    modifier onlyOwner() {
+        require(msg.sender == owner);
+        _;
+    }
+
+    function Ownable() public {
+        owner = msg.sender;
+    }
+
+    function transferOwnership(address newOwner) public onlyOwner {
+        require(newOwner != address(0));
+        pendingOwner = newOwner;
+    }
+
+    function claimOwnership() public {
+        require(msg.sender == pendingOwner);
+        OwnershipTransferred(owner, pendingOwner);
+        owner = pendingOwner;
+        pendingOwner = address(0);
+    }
+}
+
+contract Pausable is Ownable {
+    bool public paused;
+
+    event Pause();
+    event Unpause();
+
+    modifier whenNotPaused() {
+        require(!paused);
+        _;
+    }
+
+    modifier whenPaused() {
+        require(paused);
+        _;
+    }
+
+    function pause() public onlyOwner whenNotPaused {
+        paused = true;
+        Pause();
+    }
+
+    function unpause() public onlyOwner whenPaused {
+        paused = false;
+        Unpause();
+    }
+}
@@ -0,0 +1,185 @@
+pragma solidity ^0.4.15;
+
+import "./SafeMath.sol";
+import "./VotesToken.sol";
+
+contract Treasury {
+    using SafeMath for uint256;
+
+    struct Budget {
+        uint256 limit;
+        uint256 spent;
+        uint256 periodStart;
+        uint256 periodLength;
+        bool active;
+    }
+
+    struct Stream {
+        address recipient;
+        address token;
+        uint256 total;
+        uint256 withdrawn;
+        uint256 start;
+        uint256 cliff;
+        uint256 end;
+        bool revocable;
+        bool revoked;
+    }
+
+    uint256 public streamCount;
+    uint256 public constant MAX_PERIOD = 365 days;
+
+    mapping (address => Budget) public budgets;
+    mapping (uint256 => Stream) public streams;
+    mapping (address => uint256[]) public streamsByRecipient;
+    mapping (address => uint256) public reserved;
+    mapping (address => bool) public spenders;
+
+    event Received(address indexed from, uint256 amount);
+    event Spent(address indexed token, address indexed to, uint256 amount, string reference);
+    event BudgetSet(address indexed token, uint256 limit, uint256 periodLength);
+    event StreamCreated(uint256 indexed id, address indexed recipient, address token, uint256 total);
+    event StreamWithdrawn(uint256 indexed id, uint256 amount);
+    event StreamRevoked(uint256 indexed id, uint256 refunded);
+    event SpenderChanged(address indexed spender, bool enabled);
+
+    modifier onlyTreasurer() {
+        require(isTreasurer(msg.sender));
+        _;
+    }
+
+    function () public payable {
+        Received(msg.sender, msg.value);
+    }
+
+    function isTreasurer(address account) public constant returns (bool);
+
+    function setSpender(address spender, bool enabled) public onlyTreasurer {
+        spenders[spender] = enabled;
+        SpenderChanged(spender, enabled);
+    }
+
+    function setBudget(address token, uint256 limit, uint256 periodLength) public onlyTreasurer {
+        require(periodLength > 0 && periodLength <= MAX_PERIOD);
+        Budget storage budget = budgets[token];
+        budget.limit = limit;
+        budget.periodLength = periodLength;
+        budget.periodStart = now;
+        budget.spent = 0;
+        budget.active = true;
+        BudgetSet(token, limit, periodLength);
+    }
+
+    function disableBudget(address token) public onlyTreasurer {
+        budgets[token].active = false;
+    }
+
+    function available(address token) public constant returns (uint256) {
+        uint256 held = token == address(0) ? this.balance : ERC20(token).balanceOf(this);
+        if (held <= reserved[token]) {
+            return 0;
+        }
+        return held - reserved[token];
+    }
+
+    function remainingBudget(address token) public constant returns (uint256) {
+        Budget storage budget = budgets[token];
+        if (!budget.active) {
+            return 0;
+        }
+        if (now >= budget.periodStart.add(budget.periodLength)) {
+            return budget.limit;
+        }
+        return budget.limit > budget.spent ? budget.limit - budget.spent : 0;
+    }
+
+    function spend(address token, address to, uint256 amount, string reference) public {
+        require(spenders[msg.sender]);
+        require(amount <= available(token));
+        chargeBudget(token, amount);
+        pay(token, to, amount);
+        Spent(token, to, amount, reference);
+    }
+
+    function createStream(address recipient, address token, uint256 total, uint256 start, uint256 cliff, uint256 end, bool revocable)
+        public onlyTreasurer returns (uint256)
+    {
+        require(recipient != address(0));
+        require(total > 0);
+        require(start <= cliff && cliff <= end && start < end);
+        require(total <= available(token));
+
+        uint256 id = streamCount;
+        streams[id] = Stream(recipient, token, total, 0, start, cliff, end, revocable, false);
+        streamsByRecipient[recipient].push(id);
+        reserved[token] = reserved[token].add(total);
+        streamCount = streamCount.add(1);
+        StreamCreated(id, recipient, token, total);
+        return id;
+    }
+
+    function vested(uint256 id) public constant returns (uint256) {
+        Stream storage stream = streams[id];
+        if (stream.revoked || now < stream.cliff) {
+            return stream.revoked ? stream.withdrawn : 0;
+        }
+        if (now >= stream.end) {
+            return stream.total;
+        }
+        return stream.total.mul(now.sub(stream.start)).div(stream.end.sub(stream.start));
+    }
+
+    function withdrawable(uint256 id) public constant returns (uint256) {
+        return vested(id).sub(streams[id].withdrawn);
+    }
+
+    function withdrawStream(uint256 id) public {
+        Stream storage stream = streams[id];
+        require(msg.sender == stream.recipient);
+        uint256 amount = withdrawable(id);
+        require(amount > 0);
+        stream.withdrawn = stream.withdrawn.add(amount);
+        reserved[stream.token] = reserved[stream.token].sub(amount);
+        pay(stream.token, stream.recipient, amount);
+        StreamWithdrawn(id, amount);
+    }
+
+    function revokeStream(uint256 id) public onlyTreasurer {
+        Stream storage stream = streams[id];
+        require(stream.revocable && !stream.revoked);
+        uint256 owed = withdrawable(id);
+        uint256 refunded = stream.total.sub(stream.withdrawn).sub(owed);
+        stream.revoked = true;
+        stream.withdrawn = stream.withdrawn.add(owed);
+        reserved[stream.token] = reserved[stream.token].sub(owed).sub(refunded);
+        if (owed > 0) {
+            pay(stream.token, stream.recipient, owed);
+        }
+        StreamRevoked(id, refunded);
+    }
+
+    function streamsOf(address recipient) public constant returns (uint256[]) {
+        return streamsByRecipient[recipient];
+    }
+
+    function chargeBudget(address token, uint256 amount) internal {
+        Budget storage budget = budgets[token];
+        require(budget.active);
+        if (now >= budget.periodStart.add(budget.periodLength)) {
+            // Start the current period, skipping any periods without spending
+            uint256 periods = now.sub(budget.periodStart).div(budget.periodLength);
+            budget.periodStart = budget.periodStart.add(periods.mul(budget.periodLength));
+            budget.spent = 0;
+        }
+        budget.spent = budget.spent.add(amount);
+        require(budget.spent <= budget.limit);
+    }
+
+    function pay(address token, address to, uint256 amount) internal {
+        if (token == address(0)) {
+            to.transfer(amount);
+        } else {
+            require(ERC20(token).transfer(to, amount));
+        }
+    }
+}
@@ -0,0 +1,246 @@
+pragma solidity ^0.4.15;
+
+import "./SafeMath.sol";
+import "./Ownable.sol";
+
+contract ERC20Basic {
+    function totalSupply() public constant returns (uint256);
+    function balanceOf(address who) public constant returns (uint256);
+    function transfer(address to, uint256 value) public returns (bool);
+    event Transfer(address indexed from, address indexed to, uint256 value);
+}
+
+contract ERC20 is ERC20Basic {
+    function allowance(address owner, address spender) public constant returns (uint256);
+    function transferFrom(address from, address to, uint256 value) public returns (bool);
+    function approve(address spender, uint256 value) public returns (bool);
+    event Approval(address indexed owner, address indexed spender, uint256 value);
+}
+
+contract VotesToken is ERC20, Pausable {
+    using SafeMath for uint256;
+
+    struct Checkpoint {
+        uint128 fromBlock;
+        uint128 value;
+    }
+
+    string public name;
+    string public symbol;
+    uint8 public decimals = 18;
+    uint256 public cap;
+    uint256 internal supply;
+    bool public mintingFinished;
+
+    mapping (address => uint256) internal balances;
+    mapping (address => mapping (address => uint256)) internal allowed;
+    mapping (address => address) public delegates;
+    mapping (address => Checkpoint[]) internal votes;
+    mapping (address => bool) public minters;
+    mapping (address => bool) public frozen;
+    Checkpoint[] internal supplyHistory;
+
+    event Mint(address indexed to, uint256 amount);
+    event Burn(address indexed from, uint256 amount);
+    event MintFinished();
+    event DelegateChanged(address indexed delegator, address indexed fromDelegate, address indexed toDelegate);
+    event DelegateVotesChanged(address indexed delegate, uint256 previousBalance, uint256 newBalance);
+    event MinterChanged(address indexed minter, bool enabled);
+    event Frozen(address indexed account, bool isFrozen);
+
+    modifier canMint() {
+        require(!mintingFinished);
+        require(minters[msg.sender] || msg.sender == owner);
+        _;
+    }
+
+    modifier notFrozen(address account) {
+        require(!frozen[account]);
+        _;
+    }
+
+    function VotesToken(string _name, string _symbol, uint256 _cap) public {
+        require(_cap > 0);
+        name = _name;
+        symbol = _symbol;
+        cap = _cap;
+    }
+
+    function totalSupply() public constant returns (uint256) {
+        return supply;
+    }
+
+    function balanceOf(address who) public constant returns (uint256) {
+        return balances[who];
+    }
+
+    function allowance(address holder, address spender) public constant returns (uint256) {
+        return allowed[holder][spender];
+    }
+
+    function transfer(address to, uint256 value) public whenNotPaused notFrozen(msg.sender) returns (bool) {
+        _transfer(msg.sender, to, value);
+        return true;
+    }
+
+    function transferFrom(address from, address to, uint256 value) public whenNotPaused notFrozen(from) returns (bool) {
+        require(value <= allowed[from][msg.sender]);
+        allowed[from][msg.sender] = allowed[from][msg.sender].sub(value);
+        _transfer(from, to, value);
+        return true;
+    }
+
+    function approve(address spender, uint256 value) public returns (bool) {
+        // Changing a non-zero allowance straight to another non-zero value allows a front-run double spend
+        require(value == 0 || allowed[msg.sender][spender] == 0);
+        allowed[msg.sender][spender] = value;
+        Approval(msg.sender, spender, value);
+        return true;
+    }
+
+    function increaseApproval(address spender, uint256 addedValue) public returns (bool) {
+        allowed[msg.sender][spender] = allowed[msg.sender][spender].add(addedValue);
+        Approval(msg.sender, spender, allowed[msg.sender][spender]);
+        return true;
+    }
+
+    function decreaseApproval(address spender, uint256 subtractedValue) public returns (bool) {
+        uint256 oldValue = allowed[msg.sender][spender];
+        if (subtractedValue > oldValue) {
+            allowed[msg.sender][spender] = 0;
+        } else {
+            allowed[msg.sender][spender] = oldValue.sub(subtractedValue);
+        }
+        Approval(msg.sender, spender, allowed[msg.sender][spender]);
+        return true;
+    }
+
+    function setMinter(address minter, bool enabled) public onlyOwner {
+        minters[minter] = enabled;
+        MinterChanged(minter, enabled);
+    }
+
+    function freeze(address account, bool isFrozen) public onlyOwner {
+        frozen[account] = isFrozen;
+        Frozen(account, isFrozen);
+    }
+
+    function mint(address to, uint256 amount) public canMint returns (bool) {
+        require(to != address(0));
+        require(supply.add(amount) <= cap);
+        supply = supply.add(amount);
+        balances[to] = balances[to].add(amount);
+        updateCheckpoint(supplyHistory, supply);
+        moveVotes(address(0), delegateOf(to), amount);
+        Mint(to, amount);
+        Transfer(address(0), to, amount);
+        return true;
+    }
+
+    function finishMinting() public onlyOwner returns (bool) {
+        mintingFinished = true;
+        MintFinished();
+        return true;
+    }
+
+    function burn(uint256 amount) public {
+        require(amount <= balances[msg.sender]);
+        balances[msg.sender] = balances[msg.sender].sub(amount);
+        supply = supply.sub(amount);
+        updateCheckpoint(supplyHistory, supply);
+        moveVotes(delegateOf(msg.sender), address(0), amount);
+        Burn(msg.sender, amount);
+        Transfer(msg.sender, address(0), amount);
+    }
+
+    function delegate(address delegatee) public {
+        address current = delegateOf(msg.sender);
+        delegates[msg.sender] = delegatee;
+        DelegateChanged(msg.sender, current, delegateOf(msg.sender));
+        moveVotes(current, delegateOf(msg.sender), balances[msg.sender]);
+    }
+
+    function delegateOf(address account) public constant returns (address) {
+        address delegatee = delegates[account];
+        return delegatee == address(0) ? account : delegatee;
+    }
+
+    function getVotes(address account) public constant returns (uint256) {
+        Checkpoint[] storage history = votes[account];
+        if (history.length == 0) {
+            return 0;
+        }
+        return history[history.length - 1].value;
+    }
+
+    function getPriorVotes(address account, uint256 blockNumber) public constant returns (uint256) {
+        require(blockNumber < block.number);
+        return valueAt(votes[account], blockNumber);
+    }
+
+    function totalSupplyAt(uint256 blockNumber) public constant returns (uint256) {
+        require(blockNumber < block.number);
+        return valueAt(supplyHistory, blockNumber);
+    }
+
+    function numCheckpoints(address account) public constant returns (uint256) {
+        return votes[account].length;
+    }
+
+    function _transfer(address from, address to, uint256 value) internal {
+        require(to != address(0));
+        require(value <= balances[from]);
+        balances[from] = balances[from].sub(value);
+        balances[to] = balances[to].add(value);
+        moveVotes(delegateOf(from), delegateOf(to), value);
+        Transfer(from, to, value);
+    }
+
+    function moveVotes(address from, address to, uint256 amount) internal {
+        if (from == to || amount == 0) {
+            return;
+        }
+        if (from != address(0)) {
+            uint256 fromOld = getVotes(from);
+            uint256 fromNew = fromOld.sub(amount);
+            updateCheckpoint(votes[from], fromNew);
+            DelegateVotesChanged(from, fromOld, fromNew);
+        }
+        if (to != address(0)) {
+            uint256 toOld = getVotes(to);
+            uint256 toNew = toOld.add(amount);
+            updateCheckpoint(votes[to], toNew);
+            DelegateVotesChanged(to, toOld, toNew);
+        }
+    }
+
+    function updateCheckpoint(Checkpoint[] storage history, uint256 value) internal {
+        require(value < 2 ** 128);
+        if (history.length > 0 && history[history.length - 1].fromBlock == block.number) {
+            history[history.length - 1].value = uint128(value);
+        } else {
+            history.push(Checkpoint(uint128(block.number), uint128(value)));
+        }
+    }
+
+    function valueAt(Checkpoint[] storage history, uint256 blockNumber) internal constant returns (uint256) {
+        if (history.length == 0 || history[0].fromBlock > blockNumber) {
+            return 0;
+        }
+        if (history[history.length - 1].fromBlock <= blockNumber) {
+            return history[history.length - 1].value;
+        }
+
+        uint256 low = 0;
+        uint256 high = history.length - 1;
+        while (high > low) {
+            uint256 mid = high - (high - low) / 2;
+            if (history[mid].fromBlock <= blockNumber) {
+                low = mid;
+            } else {
+                high = mid - 1;
+            }
+        }
+        return history[low].value;
+    }
+}
@@ -0,0 +1,283 @@
+pragma solidity ^0.4.15;
+
+contract ERC20Interface {
+    function transfer(address to, uint256 value) public returns (bool);
+    function transferFrom(address from, address to, uint256 value) public returns (bool);
+    function balanceOf(address who) public constant returns (uint256);
+}
+
+contract Exchange {
+    struct Order {
+        address maker;
+        address tokenGive;
+        uint256 amountGive;
+        address tokenGet;
+        uint256 amountGet;
+        uint256 filled;
+        uint256 expires;
+        bool cancelled;
+    }
+
+    struct Market {
+        address base;
+        address quote;
+        uint256 minAmount;
+        uint256 makerFee;
+        uint256 takerFee;
+        bool active;
+    }
+
+    address public admin;
+    address public feeAccount;
+    bool public paused;
+    uint256 public orderCount;
+    uint256 public marketCount;
+    uint256 public constant FEE_DENOMINATOR = 10000;
+    uint256 public constant MAX_FEE = 100;
+
+    mapping (address => mapping (address => uint256)) public tokens;
+    mapping (address => mapping (address => uint256)) public locked;
+    mapping (uint256 => Order) public orders;
+    mapping (uint256 => Market) public markets;
+    mapping (address => bool) public operators;
+    mapping (address => uint256[]) public ordersByMaker;
+    mapping (address => uint256) public nonces;
+    mapping (address => bool) public whitelistedTokens;
+    address[] public tokenList;
+
+    event Deposit(address token, address user, uint256 amount, uint256 balance);
+    event Withdraw(address token, address user, uint256 amount, uint256 balance);
+    event OrderPlaced(uint256 id, address maker, address tokenGive, uint256 amountGive, address tokenGet, uint256 amountGet);
+    event OrderCancelled(uint256 id);
+    event Trade(uint256 id, address taker, uint256 amountGet, uint256 amountGive, uint256 fee);
+    event MarketAdded(uint256 id, address base, address quote);
+    event MarketUpdated(uint256 id, uint256 makerFee, uint256 takerFee, bool active);
+    event Paused(bool paused);
+
+    modifier onlyAdmin() {
+        require(msg.sender == admin);
+        _;
+    }
+
+    modifier onlyOperator() {
+        require(msg.sender == admin || operators[msg.sender]);
+        _;
+    }
+
+    modifier whenNotPaused() {
+        require(!paused);
+        _;
+    }
+
+    function Exchange(address _feeAccount) public {
+        admin = msg.sender;
+        feeAccount = _feeAccount;
+    }
+
+    function safeAdd(uint256 a, uint256 b) internal constant returns (uint256) {
+        uint256 c = a + b;
+        assert(c >= a);
+        return c;
+    }
+
+    function safeSub(uint256 a, uint256 b) internal constant returns (uint256) {
+        assert(b <= a);
+        return a - b;
+    }
+
+    function safeMul(uint256 a, uint256 b) internal constant returns (uint256) {
+        uint256 c = a * b;
+        assert(a == 0 || c / a == b);
+        return c;
+    }
+
+    function setAdmin(address _admin) public onlyAdmin {
+        require(_admin != address(0));
+        admin = _admin;
+    }
+
+    function setFeeAccount(address _feeAccount) public onlyAdmin {
+        feeAccount = _feeAccount;
+    }
+
+    function setOperator(address operator, bool enabled) public onlyAdmin {
+        operators[operator] = enabled;
+    }
+
+    function setPaused(bool _paused) public onlyAdmin {
+        paused = _paused;
+        Paused(_paused);
+    }
+
+    function whitelistToken(address token, bool enabled) public onlyOperator {
+        if (enabled && !whitelistedTokens[token]) {
+            tokenList.push(token);
+        }
+        whitelistedTokens[token] = enabled;
+    }
+
+    function addMarket(address base, address quote, uint256 minAmount, uint256 makerFee, uint256 takerFee) public onlyOperator returns (uint256) {
+        require(base != quote);
+        require(makerFee <= MAX_FEE && takerFee <= MAX_FEE);
+        require(whitelistedTokens[base] && whitelistedTokens[quote]);
+        uint256 id = marketCount;
+        markets[id] = Market(base, quote, minAmount, makerFee, takerFee, true);
+        marketCount = safeAdd(marketCount, 1);
+        MarketAdded(id, base, quote);
+        return id;
+    }
+
+    function updateMarket(uint256 id, uint256 makerFee, uint256 takerFee, bool active) public onlyOperator {
+        require(id < marketCount);
+        require(makerFee <= MAX_FEE && takerFee <= MAX_FEE);
+        Market storage market = markets[id];
+        market.makerFee = makerFee;
+        market.takerFee = takerFee;
+        market.active = active;
+        MarketUpdated(id, makerFee, takerFee, active);
+    }
+
+    function deposit() public payable whenNotPaused {
+        tokens[0][msg.sender] = safeAdd(tokens[0][msg.sender], msg.value);
+        Deposit(0, msg.sender, msg.value, tokens[0][msg.sender]);
+    }
+
+    function withdraw(uint256 amount) public {
+        require(safeSub(tokens[0][msg.sender], locked[0][msg.sender]) >= amount);
+        tokens[0][msg.sender] = safeSub(tokens[0][msg.sender], amount);
+        msg.sender.transfer(amount);
+        Withdraw(0, msg.sender, amount, tokens[0][msg.sender]);
+    }
+
+    function depositToken(address token, uint256 amount) public whenNotPaused {
+        require(token != 0);
+        require(whitelistedTokens[token]);
+        require(ERC20Interface(token).transferFrom(msg.sender, this, amount));
+        tokens[token][msg.sender] = safeAdd(tokens[token][msg.sender], amount);
+        Deposit(token, msg.sender, amount, tokens[token][msg.sender]);
+    }
+
+    function withdrawToken(address token, uint256 amount) public {
+        require(token != 0);
+        require(safeSub(tokens[token][msg.sender], locked[token][msg.sender]) >= amount);
+        tokens[token][msg.sender] = safeSub(tokens[token][msg.sender], amount);
+        require(ERC20Interface(token).transfer(msg.sender, amount));
+        Withdraw(token, msg.sender, amount, tokens[token][msg.sender]);
+    }
+
+    function balanceOf(address token, address user) public constant returns (uint256) {
+        return tokens[token][user];
+    }
+
+    function availableBalance(address token, address user) public constant returns (uint256) {
+        return safeSub(tokens[token][user], locked[token][user]);
+    }
+
+    function placeOrder(address tokenGive, uint256 amountGive, address tokenGet, uint256 amountGet, uint256 expires) public whenNotPaused returns (uint256) {
+        require(amountGive > 0 && amountGet > 0);
+        require(expires > block.number);
+        require(availableBalance(tokenGive, msg.sender) >= amountGive);
+        uint256 id = orderCount;
+        orders[id] = Order(msg.sender, tokenGive, amountGive, tokenGet, amountGet, 0, expires, false);
+        locked[tokenGive][msg.sender] = safeAdd(locked[tokenGive][msg.sender], amountGive);
+        ordersByMaker[msg.sender].push(id);
+        orderCount = safeAdd(orderCount, 1);
+        nonces[msg.sender] = safeAdd(nonces[msg.sender], 1);
+        OrderPlaced(id, msg.sender, tokenGive, amountGive, tokenGet, amountGet);
+        return id;
+    }
+
+    function cancelOrder(uint256 id) public {
+        Order storage order = orders[id];
+        require(order.maker == msg.sender || operators[msg.sender]);
+        require(!order.cancelled);
+        uint256 remaining = safeSub(order.amountGive, order.filled);
+        locked[order.tokenGive][order.maker] = safeSub(locked[order.tokenGive][order.maker], remaining);
+        order.cancelled = true;
+        OrderCancelled(id);
+    }
+
+    function cancelAllOrders() public {
+        uint256[] storage ids = ordersByMaker[msg.sender];
+        for (uint256 i = 0; i < ids.length; i++) {
+            Order storage order = orders[ids[i]];
+            if (!order.cancelled && order.filled < order.amountGive) {
+                uint256 remaining = safeSub(order.amountGive, order.filled);
+                locked[order.tokenGive][msg.sender] = safeSub(locked[order.tokenGive][msg.sender], remaining);
+                order.cancelled = true;
+                OrderCancelled(ids[i]);
+            }
+        }
+    }
+
+    function availableVolume(uint256 id) public constant returns (uint256) {
+        Order storage order = orders[id];
+        if (order.cancelled || block.number > order.expires) {
+            return 0;
+        }
+        return safeSub(order.amountGive, order.filled);
+    }
+
+    function trade(uint256 id, uint256 amountGive, uint256 feeRate) public whenNotPaused {
+        require(feeRate <= MAX_FEE);
+        Order storage order = orders[id];
+        require(!order.cancelled);
+        require(block.number <= order.expires);
+        require(safeAdd(order.filled, amountGive) <= order.amountGive);
+
+        uint256 amountGet = safeMul(order.amountGet, amountGive) / order.amountGive;
+        uint256 fee = safeMul(amountGive, feeRate) / FEE_DENOMINATOR;
+
+        tokens[order.tokenGet][msg.sender] = safeSub(tokens[order.tokenGet][msg.sender], amountGet);
+        tokens[order.tokenGet][order.maker] = safeAdd(tokens[order.tokenGet][order.maker], amountGet);
+
+        locked[order.tokenGive][order.maker] = safeSub(locked[order.tokenGive][order.maker], amountGive);
+        tokens[order.tokenGive][order.maker] = safeSub(tokens[order.tokenGive][order.maker], amountGive);
+        tokens[order.tokenGive][msg.sender] = safeAdd(tokens[order.tokenGive][msg.sender], safeSub(amountGive, fee));
+        tokens[order.tokenGive][feeAccount] = safeAdd(tokens[order.tokenGive][feeAccount], fee);
+
+        order.filled = safeAdd(order.filled, amountGive);
+        Trade(id, msg.sender, amountGet, amountGive, fee);
+    }
+
+    function batchTrade(uint256[] ids, uint256[] amounts, uint256 feeRate) public whenNotPaused {
+        require(ids.length == amounts.length);
+        for (uint256 i = 0; i < ids.length; i++) {
+            if (availableVolume(ids[i]) >= amounts[i]) {
+                trade(ids[i], amounts[i], feeRate);
+            }
+        }
+    }
+
+    function ordersOf(address maker) public constant returns (uint256[]) {
+        return ordersByMaker[maker];
+    }
+
+    function openOrderCount(address maker) public constant returns (uint256 count) {
+        uint256[] storage ids = ordersByMaker[maker];
+        for (uint256 i = 0; i < ids.length; i++) {
+            if (availableVolume(ids[i]) > 0) {
+                count++;
+            }
+        }
+    }
+
+    function totalLocked(address token, uint256 from, uint256 to) public constant returns (uint256 total) {
+        for (uint256 i = from; i < to && i < orderCount; i++) {
+            Order storage order = orders[i];
+            if (order.tokenGive == token && !order.cancelled) {
+                total = safeAdd(total, safeSub(order.amountGive, order.filled));
+            }
+        }
+    }
+
+    function tokenCount() public constant returns (uint256) {
+        return tokenList.length;
+    }
+
+    function sweep(address token, uint256 amount) public onlyAdmin {
+        require(safeSub(tokens[token][feeAccount], locked[token][feeAccount]) >= amount);
+        tokens[token][feeAccount] = safeSub(tokens[token][feeAccount], amount);
+        tokens[token][admin] = safeAdd(tokens[token][admin], amount);
+    }
+}
@@ -0,0 +1,95 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "./lib/Strings.sol";
+
+contract Registry {
+    using Strings for string;
+
+    struct Record {
+        address owner;
+        address resolver;
+        uint64 expires;
+    }
+
+    uint256 public constant PERIOD = 365 days;
+    uint256 public price;
+    address public treasury;
+
+    mapping(bytes32 => Record) public records;
+    mapping(address => bytes32[]) private owned;
+
+    error NotOwner(bytes32 node);
+    error Unavailable(bytes32 node);
+
+    event Registered(bytes32 indexed node, address indexed owner, uint64 expires);
+    event Transferred(bytes32 indexed node, address indexed owner);
+
+    constructor(uint256 _price, address _treasury) {
+        price = _price;
+        treasury = _treasury;
+    }
+
+    function nodeOf(string calldata label) public pure returns (bytes32) {
+        return keccak256(bytes(label.toLower()));
+    }
+
+    function available(bytes32 node) public view returns (bool) {
+        return records[node].expires < block.timestamp;
+    }
+
+    function register(string calldata label, uint256 periods) external payable returns (bytes32 node) {
+        require(label.isValidLabel(), "invalid label");
+        require(periods > 0 && msg.value >= price * periods, "underpaid");
+        node = nodeOf(label);
+        if (!available(node)) {
+            revert Unavailable(node);
+        }
+        uint64 expires = uint64(block.timestamp + PERIOD * periods);
+        records[node] = Record(msg.sender, address(0), expires);
+        owned[msg.sender].push(node);
+        emit Registered(node, msg.sender, expires);
+    }
+
+    function renew(bytes32 node, uint256 periods) external payable {
+        require(msg.value >= price * periods, "underpaid");
+        Record storage record = records[node];
+        if (record.owner != msg.sender) {
+            revert NotOwner(node);
+        }
+        unchecked {
+            record.expires += uint64(PERIOD * periods);
+        }
+    }
+
+    function transfer(bytes32 node, address to) external {
+        Record storage record = records[node];
+        if (record.owner != msg.sender || record.expires < block.timestamp) {
+            revert NotOwner(node);
+        }
+        record.owner = to;
+        owned[to].push(node);
+        emit Transferred(node, to);
+    }
+
+    function setResolver(bytes32 node, address resolver) external {
+        if (records[node].owner != msg.sender) {
+            revert NotOwner(node);
+        }
+        records[node].resolver = resolver;
+    }
+
+    function activeCount(address user) external view returns (uint256 count) {
+        bytes32[] storage nodes = owned[user];
+        for (uint256 i = 0; i < nodes.length; i++) {
+            Record storage record = records[nodes[i]];
+            if (record.owner == user && record.expires >= block.timestamp) {
+                count++;
+            }
+        }
+    }
+
+    function withdraw() external {
+        payable(treasury).transfer(address(this).balance);
+    }
+}
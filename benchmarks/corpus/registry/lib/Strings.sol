@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+library Strings {
+    function toLower(string memory value) internal pure returns (string memory) {
+        bytes memory b = bytes(value);
+        bytes memory lower = new bytes(b.length);
+        for (uint256 i = 0; i < b.length; i++) {
+            bytes1 c = b[i];
+            if (c >= 0x41 && c <= 0x5A) {
+                lower[i] = bytes1(uint8(c) + 32);
+            } else {
+                lower[i] = c;
+            }
+        }
+        return string(lower);
+    }
+
+    function isValidLabel(string memory value) internal pure returns (bool) {
+        bytes memory b = bytes(value);
+        if (b.length == 0 || b.length > 32) {
+            return false;
+        }
+        for (uint256 i = 0; i < b.length; i++) {
+            bytes1 c = b[i];
+            bool digit = c >= 0x30 && c <= 0x39;
+            bool letter = (c >= 0x41 && c <= 0x5A) || (c >= 0x61 && c <= 0x7A);
+            if (!digit && !letter && c != 0x2D) {
+                return false;
+            }
+        }
+        return true;
+    }
+}
@@ -0,0 +1,13 @@
+pragma solidity ^0.4.10;
+
+contract SimpleStorage {
+    uint256 storedData;
+
+    function set(uint256 x) public {
+        storedData = x;
+    }
+
+    function get() public constant returns (uint256) {
+        return storedData;
+    }
+}
@@ -0,0 +1,88 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.7.0;
+
+contract Staking {
+    struct Stake {
+        uint256 amount;
+        uint256 since;
+        uint256 claimed;
+    }
+
+    address public owner;
+    uint256 public rewardRate;
+    uint256 public totalStaked;
+    address[] public stakers;
+    mapping(address => Stake) public stakes;
+
+    event Staked(address indexed user, uint256 amount);
+    event Unstaked(address indexed user, uint256 amount);
+    event RewardPaid(address indexed user, uint256 reward);
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "not owner");
+        _;
+    }
+
+    constructor(uint256 _rewardRate) {
+        owner = msg.sender;
+        rewardRate = _rewardRate;
+    }
+
+    receive() external payable {}
+
+    function setRewardRate(uint256 _rewardRate) external onlyOwner {
+        rewardRate = _rewardRate;
+    }
+
+    function stake() external payable {
+        require(msg.value > 0, "nothing to stake");
+        Stake storage s = stakes[msg.sender];
+        if (s.amount == 0) {
+            stakers.push(msg.sender);
+            s.since = block.timestamp;
+        } else {
+            _payReward(msg.sender);
+        }
+        s.amount += msg.value;
+        totalStaked += msg.value;
+        emit Staked(msg.sender, msg.value);
+    }
+
+    function pendingReward(address user) public view returns (uint256) {
+        Stake storage s = stakes[user];
+        if (s.amount == 0) {
+            return 0;
+        }
+        return s.amount * rewardRate * (block.timestamp - s.since) / 1e18;
+    }
+
+    function claim() external {
+        _payReward(msg.sender);
+    }
+
+    function unstake(uint256 amount) external {
+        Stake storage s = stakes[msg.sender];
+        require(amount <= s.amount, "too much");
+        _payReward(msg.sender);
+        s.amount -= amount;
+        totalStaked -= amount;
+        msg.sender.transfer(amount);
+        emit Unstaked(msg.sender, amount);
+    }
+
+    function totalPending() external view returns (uint256 total) {
+        for (uint256 i = 0; i < stakers.length; i++) {
+            total += pendingReward(stakers[i]);
+        }
+    }
+
+    function _payReward(address user) internal {
+        uint256 reward = pendingReward(user);
+        stakes[user].since = block.timestamp;
+        if (reward > 0) {
+            stakes[user].claimed += reward;
+            payable(user).transfer(reward);
+            emit RewardPaid(user, reward);
+        }
+    }
+}
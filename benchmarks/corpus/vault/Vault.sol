@@ -0,0 +1,51 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.6.5;
+
+interface IERC20 {
+    function transfer(address to, uint256 amount) external returns (bool);
+    function transferFrom(address from, address to, uint256 amount) external returns (bool);
+    function balanceOf(address account) external view returns (uint256);
+}
+
+contract Vault {
+    IERC20 public immutable token;
+    uint256 public totalShares;
+    mapping(address => uint256) public shares;
+
+    event Deposited(address indexed user, uint256 amount, uint256 shares);
+    event Withdrawn(address indexed user, uint256 amount, uint256 shares);
+
+    constructor(IERC20 _token) public {
+        token = _token;
+    }
+
+    function totalAssets() public view returns (uint256) {
+        return token.balanceOf(address(this));
+    }
+
+    function deposit(uint256 amount) external {
+        require(amount > 0, "zero amount");
+        uint256 assets = totalAssets();
+        uint256 minted = totalShares == 0 || assets == 0 ? amount : amount * totalShares / assets;
+        shares[msg.sender] += minted;
+        totalShares += minted;
+        require(token.transferFrom(msg.sender, address(this), amount), "transfer failed");
+        emit Deposited(msg.sender, amount, minted);
+    }
+
+    function withdraw(uint256 shareAmount) external {
+        require(shareAmount > 0 && shareAmount <= shares[msg.sender], "bad shares");
+        uint256 amount = shareAmount * totalAssets() / totalShares;
+        shares[msg.sender] -= shareAmount;
+        totalShares -= shareAmount;
+        require(token.transfer(msg.sender, amount), "transfer failed");
+        emit Withdrawn(msg.sender, amount, shareAmount);
+    }
+
+    function previewWithdraw(address user) external view returns (uint256) {
+        if (totalShares == 0) {
+            return 0;
+        }
+        return shares[user] * totalAssets() / totalShares;
+    }
+}
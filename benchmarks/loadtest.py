@@ -0,0 +1,296 @@
+"""
+Load generator for the HTTP API.
+
+Clients submit /compile/ and /sym/ jobs built from the benchmark corpus and poll /<task_id> until
+the task finishes, the way the frontend does. Reports p50/p95/p99 submit latency, poll latency and
+end-to-end completion time, plus the error rate.
+
+Against a running deployment:
+
+    python -m benchmarks.loadtest --url http://localhost:5000 --clients 16 --duration 120
+
+Or start gunicorn and a Celery worker locally, with Redis or with a Redis-free filesystem broker:
+
+    python -m benchmarks.loadtest --local --broker filesystem --gunicorn-workers 8 --celery-concurrency 2
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .suite import CORPUS_DIR, DEFAULT_COMPILE_SETTINGS, DEFAULT_SYMEXEC_SETTINGS, ROOT, load_cases, solc_installed
+
+FINISHED_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+def percentile(values, p):
+    if len(values) == 0:
+        return None
+    # Nearest rank
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+class Recorder:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.samples = dict()
+        self.errors = dict()
+        self.jobs = dict()
+
+    def add(self, kind, metric, seconds):
+        with self.lock:
+            self.samples.setdefault((kind, metric), list()).append(seconds)
+
+    def finish(self, kind, error=None):
+        with self.lock:
+            self.jobs[kind] = self.jobs.get(kind, 0) + 1
+            if error is not None:
+                self.errors.setdefault(kind, dict())
+                self.errors[kind][error] = self.errors[kind].get(error, 0) + 1
+
+    def report(self):
+        report = dict()
+        for kind, jobs in self.jobs.items():
+            errors = sum(self.errors.get(kind, {}).values())
+            report[kind] = {
+                "jobs": jobs,
+                "error_rate": errors / jobs if jobs else 0,
+                "errors": self.errors.get(kind, {}),
+                **{metric: summarize(values) for (sample_kind, metric), values in self.samples.items() if sample_kind == kind},
+            }
+        return report
+
+class Client:
+    def __init__(self, url, recorder, poll_interval, poll_timeout, compress=False, upload_sources=False) -> None:
+        self.url = url.rstrip("/")
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self.compress = compress
+        self.upload_sources = upload_sources
+        self.session = requests.Session()
+
+    def by_hash(self, payload):
+        """
+        Replaces file contents with their hashes, uploading the sources the server does not have yet
+        """
+        files = payload["files"]
+        hashes = [hashlib.sha256(file["content"].encode("utf8")).hexdigest() for file in files]
+        r = self.session.post(f"{self.url}/sources/missing", json={"hashes": hashes}, timeout=30)
+        r.raise_for_status()
+        missing = set(r.json()["missing"])
+        uploads = list({digest: file["content"] for digest, file in zip(hashes, files) if digest in missing}.values())
+        if len(uploads) > 0:
+            self.session.post(f"{self.url}/sources/", json={"contents": uploads}, timeout=30).raise_for_status()
+        return {**payload, "files": [{"name": file["name"], "hash": digest} for file, digest in zip(files, hashes)]}
+
+    def submit(self, kind, payload):
+        if self.upload_sources:
+            payload = self.by_hash(payload)
+        if not self.compress:
+            return self.session.post(f"{self.url}/{kind}/", json=payload, timeout=30)
+        body = gzip.compress(json.dumps(payload).encode("utf8"))
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        return self.session.post(f"{self.url}/{kind}/", data=body, headers=headers, timeout=30)
+
+    def run_job(self, kind, payload):
+        """
+        Submits one job and polls it to completion
+        :return: The finished task result, or None on error
+        """
+        start = time.monotonic()
+        try:
+            r = self.submit(kind, payload)
+            self.recorder.add(kind, "submit_seconds", time.monotonic() - start)
+            if r.status_code != 200:
+                self.recorder.finish(kind, f"submit HTTP {r.status_code}")
+                return None
+            task_id = r.json()["task_id"]
+
+            while time.monotonic() - start < self.poll_timeout:
+                time.sleep(self.poll_interval)
+                poll_start = time.monotonic()
+                r = self.session.get(f"{self.url}/{kind}/{task_id}", timeout=30)
+                self.recorder.add(kind, "poll_seconds", time.monotonic() - poll_start)
+                if r.status_code != 200:
+                    self.recorder.finish(kind, f"poll HTTP {r.status_code}")
+                    return None
+                status = r.json()
+                if status["task_status"] in FINISHED_STATES:
+                    self.recorder.add(kind, "completion_seconds", time.monotonic() - start)
+                    result = status["task_result"]
+                    if status["task_status"] != "SUCCESS" or not result or not result.get("success"):
+                        self.recorder.finish(kind, f"task {status['task_status']}")
+                        return None
+                    self.recorder.finish(kind)
+                    return result
+
+            self.recorder.finish(kind, "timeout")
+        except (requests.RequestException, ValueError, KeyError) as e:
+            self.recorder.finish(kind, type(e).__name__)
+        return None
+
+def build_jobs(cases):
+    jobs = list()
+    for case in cases:
+        sol_files = list()
+        for name in case["files"]:
+            with open(os.path.join(CORPUS_DIR, case["directory"], name)) as f:
+                sol_files.append({"name": name, "content": f.read()})
+        jobs.append({
+            "case": case,
+            "compile": {"files": sol_files, "settings": {**DEFAULT_COMPILE_SETTINGS, **case.get("compile", {}), "version": case["version"]}},
+        })
+    return jobs
+
+def prepare_sym_jobs(client, jobs):
+    """
+    Compiles every case once through the API to build the /sym/ payloads
+    """
+    for job in jobs:
+        result = client.run_job("compile", job["compile"])
+        if result is None:
+            print(f"Could not compile {job['case']['name']}, leaving it out of /sym/ jobs")
+            continue
+        job["sym"] = {
+            "files": job["compile"]["files"],
+            "json": json.dumps(result["result"]),
+            "contract": job["case"]["contract"],
+            "settings": {**DEFAULT_SYMEXEC_SETTINGS, **job["case"].get("symexec", {})},
+        }
+
+def start_local(args, with_worker=True):
+    """
+    Starts gunicorn and a Celery worker, returning their processes and the base URL
+    :param with_worker: Whether to start the Celery worker, status polling alone does not need one
+    """
+    env = dict(os.environ)
+    env["SOLBOLT_BIND"] = f"127.0.0.1:{args.port}"
+    env["SOLBOLT_GUNICORN_WORKERS"] = str(args.gunicorn_workers)
+    env["SOLBOLT_GUNICORN_WORKER_CLASS"] = args.worker_class
+    if args.broker == "filesystem":
+        broker_dir = tempfile.mkdtemp(prefix="solbolt-broker-")
+        env["CELERY_BROKER_URL"] = "filesystem://"
+        env["CELERY_RESULT_BACKEND"] = f"file://{os.path.join(broker_dir, 'results')}"
+        env["SOLBOLT_BROKER_DIR"] = broker_dir
+        os.makedirs(os.path.join(broker_dir, "results"), exist_ok=True)
+    else:
+        env["CELERY_BROKER_URL"] = env["CELERY_RESULT_BACKEND"] = args.broker
+
+    processes = [subprocess.Popen(["gunicorn", "--config", "gunicorn.conf.py", "wsgi:app"], cwd=ROOT, env=env)]
+    if with_worker:
+        processes.append(subprocess.Popen(["celery", "-A", "solbolt.tasks", "worker", "-l", "warning",
+                                           f"--concurrency={args.celery_concurrency}"], cwd=ROOT, env=env))
+    url = f"http://127.0.0.1:{args.port}"
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/swagger.json", timeout=2).status_code == 200:
+                return processes, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_local(processes)
+    raise SystemExit("gunicorn did not come up")
+
+def stop_local(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def print_report(report, elapsed):
+    print(f"Ran for {elapsed:.0f}s")
+    for kind, result in report.items():
+        print(f"\n/{kind}/: {result['jobs']} jobs, error rate {result['error_rate'] * 100:.1f}% {result['errors'] or ''}")
+        for metric in ("submit_seconds", "poll_seconds", "completion_seconds"):
+            if metric in result:
+                m = result[metric]
+                print(f"  {metric:<20} n={m['count']:<6} p50={m['p50']:.3f} p95={m['p95']:.3f} p99={m['p99']:.3f} max={m['max']:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the compile and symbolic execution API')
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the API')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to keep submitting jobs')
+    parser.add_argument('--sym-ratio', type=float, default=0.2, help='Fraction of jobs that are /sym/ submissions')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between status polls')
+    parser.add_argument('--poll-timeout', type=float, default=600, help='Seconds before a job counts as timed out')
+    parser.add_argument('--cases', help='Comma separated corpus cases to submit, defaults to all with an installed solc')
+    parser.add_argument('--compress-requests', action='store_true', help='Send gzip compressed request bodies')
+    parser.add_argument('--upload-sources', action='store_true',
+                        help='Upload missing sources to /sources/ and refer to files by hash')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the report to this JSON file')
+    parser.add_argument('--local', action='store_true', help='Start gunicorn and a Celery worker for the run')
+    parser.add_argument('--broker', default='filesystem', help="With --local: 'filesystem' or a Redis URL")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--gunicorn-workers', type=int, default=8)
+    parser.add_argument('--worker-class', default='sync', help="gunicorn worker class, 'sync' or 'gevent'")
+    parser.add_argument('--celery-concurrency', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.local and shutil.which("gunicorn") is None:
+        raise SystemExit("gunicorn is not installed")
+
+    cases = [case for case in load_cases(args.cases.split(",") if args.cases else None) if solc_installed(case["version"])]
+    if len(cases) == 0:
+        raise SystemExit("No corpus case has its solc binary installed")
+
+    processes, url = start_local(args) if args.local else (list(), args.url)
+    try:
+        recorder = Recorder()
+        jobs = build_jobs(cases)
+        if args.sym_ratio > 0:
+            prepare_sym_jobs(Client(url, Recorder(), args.poll_interval, args.poll_timeout), jobs)
+        sym_jobs = [job for job in jobs if "sym" in job]
+
+        start = time.monotonic()
+
+        def client_loop(index):
+            rng = random.Random(args.seed + index)
+            client = Client(url, recorder, args.poll_interval, args.poll_timeout, args.compress_requests, args.upload_sources)
+            while time.monotonic() - start < args.duration:
+                job = rng.choice(jobs)
+                if len(sym_jobs) > 0 and rng.random() < args.sym_ratio:
+                    client.run_job("sym", rng.choice(sym_jobs)["sym"])
+                else:
+                    client.run_job("compile", job["compile"])
+
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            list(executor.map(client_loop, range(args.clients)))
+
+        report = recorder.report()
+        print_report(report, time.monotonic() - start)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"settings": vars(args), "report": report}, f, indent=2)
+    finally:
+        stop_local(processes)
+
+if __name__ == "__main__":
+    sys.exit(main())
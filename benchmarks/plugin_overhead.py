@@ -0,0 +1,112 @@
+"""
+Measures the overhead of each analysis plugin on symbolic execution instruction throughput.
+
+Runs the same contract with no analysis plugins, with each plugin on its own and with all of them,
+and reports executed instructions per second relative to the run without plugins.
+
+    python -m benchmarks.plugin_overhead Token.sol Token --version v0.4.15+commit.8b45bddb
+"""
+import argparse
+import json
+import statistics
+import time
+
+from mythril.laser.plugin.builder import PluginBuilder
+from mythril.laser.plugin.interface import LaserPlugin
+from mythril.laser.plugin.loader import LaserPluginLoader
+
+from solbolt.apis.symexec import ANALYSIS_PLUGINS, SymExec
+from solbolt.tasks import compile_solidity
+from solbolt.blobs import load_result
+
+COUNTER_PLUGIN_NAME = "benchmark-instruction-counter"
+
+class InstructionCounterBuilder(PluginBuilder):
+    name = COUNTER_PLUGIN_NAME
+
+    def __call__(self, *args, **kwargs):
+        return InstructionCounter()
+
+class InstructionCounter(LaserPlugin):
+    instructions = 0
+
+    def initialize(self, symbolic_vm):
+        InstructionCounter.instructions = 0
+
+        @symbolic_vm.laser_hook("execute_state")
+        def execute_state_hook(global_state):
+            InstructionCounter.instructions += 1
+
+def compile_contract(path, version, optimize):
+    with open(path) as f:
+        sol_files = [{"name": path, "content": f.read()}]
+    result = load_result(compile_solidity(sol_files, {
+        "version": version,
+        "enable_optimizer": optimize,
+        "optimize_runs": 200,
+        "evmVersion": "Default",
+        "viaIR": False,
+    }))
+    if not result["success"]:
+        raise SystemExit(result["result"])
+    return sol_files, result["result"]
+
+def run(sol_files, compiled_json, contract, analyses, args):
+    exec_env = SymExec(solidity_files=sol_files,
+                       contract_name=contract,
+                       json=[compiled_json],
+                       max_depth=args.max_depth,
+                       loop_bound=args.loop_bound,
+                       transaction_count=args.transaction_count,
+                       execution_timeout=args.execution_timeout,
+                       checkpoint=False,
+                       creation_cache=False,
+                       analyses=analyses)
+    start = time.monotonic()
+    exec_env.execute_command()
+    elapsed = time.monotonic() - start
+    return InstructionCounter.instructions, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-plugin overhead on instruction throughput')
+    parser.add_argument('file', help='Solidity file')
+    parser.add_argument('contract', help='Contract to execute')
+    parser.add_argument('--version', default='v0.4.15+commit.8b45bddb', help='solc version from the solc/ directory')
+    parser.add_argument('--optimize', action='store_true')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration, the median is reported')
+    parser.add_argument('--max-depth', type=int, default=128)
+    parser.add_argument('--loop-bound', type=int, default=10)
+    parser.add_argument('--transaction-count', type=int, default=2)
+    parser.add_argument('--execution-timeout', type=int, default=300)
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    LaserPluginLoader().load(InstructionCounterBuilder())
+    sol_files, compiled_json = compile_contract(args.file, args.version, args.optimize)
+
+    configurations = [("none", [])] + [(analysis, [analysis]) for analysis in ANALYSIS_PLUGINS] + [("all", list(ANALYSIS_PLUGINS))]
+    results = dict()
+    for name, analyses in configurations:
+        runs = [run(sol_files, compiled_json, args.contract, analyses, args) for _ in range(args.repeat)]
+        instructions = statistics.median(count for count, _ in runs)
+        elapsed = statistics.median(seconds for _, seconds in runs)
+        results[name] = {
+            "instructions": instructions,
+            "seconds": round(elapsed, 3),
+            "instructions_per_second": round(instructions / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    baseline = results["none"]["instructions_per_second"]
+    print(f"{'plugins':<16}{'instructions':>14}{'seconds':>10}{'instr/s':>12}{'overhead':>10}")
+    for name, result in results.items():
+        throughput = result["instructions_per_second"]
+        overhead = (baseline / throughput - 1) * 100 if baseline and throughput else 0
+        result["overhead_percent"] = round(overhead, 1)
+        print(f"{name:<16}{result['instructions']:>14}{result['seconds']:>10}{throughput:>12}{overhead:>9.1f}%")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares status poll throughput of the gunicorn worker classes.
+
+Starts the API once per worker class and keeps many clients polling task status for a while, the
+way idle browser tabs do, then reports completed polls per second and poll latency.
+
+    python -m benchmarks.poll_throughput --clients 500 --duration 30 --worker-classes sync,gevent
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .loadtest import start_local, stop_local, summarize
+
+def poll(url, clients, duration, batch):
+    """
+    :return: Number of polls, errors and latencies in seconds
+    """
+    latencies = list()
+    errors = 0
+    lock = threading.Lock()
+    start = time.monotonic()
+
+    def client_loop(_):
+        nonlocal errors
+        session = requests.Session()
+        task_ids = [str(uuid.uuid4()) for _ in range(batch)]
+        while time.monotonic() - start < duration:
+            poll_start = time.monotonic()
+            try:
+                if batch > 1:
+                    r = session.get(f"{url}/tasks/status", params={"ids": ",".join(task_ids)}, timeout=30)
+                else:
+                    r = session.get(f"{url}/compile/{task_ids[0]}", timeout=30)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.monotonic() - poll_start)
+                else:
+                    errors += 1
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client_loop, range(clients)))
+    return latencies, errors, time.monotonic() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare concurrent status poll throughput of gunicorn worker classes')
+    parser.add_argument('--worker-classes', default='sync,gevent')
+    parser.add_argument('--clients', type=int, default=200, help='Concurrent polling clients')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--batch', type=int, default=1, help='Task ids per poll, above 1 uses /tasks/status')
+    parser.add_argument('--broker', default='filesystem', help="'filesystem' or a Redis URL")
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--gunicorn-workers', type=int, default=8)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = dict()
+    for worker_class in args.worker_classes.split(","):
+        args.worker_class = worker_class
+        processes, url = start_local(args, with_worker=False)
+        try:
+            latencies, errors, elapsed = poll(url, args.clients, args.duration, args.batch)
+        finally:
+            stop_local(processes)
+        results[worker_class] = {
+            "polls_per_second": round(len(latencies) / elapsed, 1),
+            "errors": errors,
+            "latency_seconds": summarize(latencies),
+        }
+        m = results[worker_class]["latency_seconds"]
+        print(f"{worker_class:<8} {results[worker_class]['polls_per_second']:>9} polls/s  errors={errors:<6}"
+              + (f" p50={m['p50']:.3f} p95={m['p95']:.3f} p99={m['p99']:.3f}" if m["count"] else ""))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
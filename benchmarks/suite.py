@@ -0,0 +1,233 @@
+"""
+Offline compile and symbolic execution benchmark over the corpus in benchmarks/corpus.
+
+Every case runs `compile_solidity` and `symbolic_exec` in-process, in a fresh interpreter so peak RSS
+is per case, against the solc binaries in solc/. Checkpoints and the creation cache are disabled so
+each run does the full work. No network or Redis is needed.
+
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --threshold 0.2
+
+Cases whose solc binary is not installed are reported as skipped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+
+DEFAULT_COMPILE_SETTINGS = {
+    "enable_optimizer": True,
+    "optimize_runs": 200,
+    "evmVersion": "Default",
+    "viaIR": False,
+}
+
+DEFAULT_SYMEXEC_SETTINGS = {
+    "max_depth": 128,
+    "call_depth_limit": 10,
+    "strategy": "bfs",
+    "loop_bound": 10,
+    "transaction_count": 2,
+    "enable_onchain": False,
+    "ignore_constraints": True,
+}
+
+# Metrics compared against the baseline, with the smallest absolute change worth reporting
+COMPARED_METRICS = {
+    "wall_seconds": 0.05,
+    "cpu_seconds": 0.05,
+    "peak_rss_bytes": 8 * 1024 * 1024,
+    "output_bytes": 1024,
+}
+
+def load_cases(names=None):
+    with open(os.path.join(CORPUS_DIR, "manifest.json")) as f:
+        cases = json.load(f)["cases"]
+    if names:
+        cases = [case for case in cases if case["name"] in names]
+    return cases
+
+def solc_installed(version):
+    return os.path.exists(os.path.join(ROOT, "solc", f"solc-linux-amd64-{version}"))
+
+def peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux; solc runs as a child process
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+
+def cpu_seconds():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+def measure(fn, *args):
+    from solbolt.blobs import load_result
+
+    wall_start = time.monotonic()
+    cpu_start = cpu_seconds()
+    result = load_result(fn(*args))
+    metrics = {
+        "wall_seconds": round(time.monotonic() - wall_start, 4),
+        "cpu_seconds": round(cpu_seconds() - cpu_start, 4),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "output_bytes": len(json.dumps(result, default=str)),
+        "success": result.get("success", False),
+    }
+    if not metrics["success"]:
+        metrics["error"] = result.get("result")
+    return result, metrics
+
+def run_case(case, run_symexec, queue):
+    """
+    Runs one case in the current process and puts its metrics on the queue
+    """
+    os.chdir(ROOT)
+    from solbolt.tasks import compile_solidity, symbolic_exec
+
+    directory = os.path.join(CORPUS_DIR, case["directory"])
+    sol_files = list()
+    for name in case["files"]:
+        with open(os.path.join(directory, name)) as f:
+            sol_files.append({"name": name, "content": f.read()})
+
+    compile_settings = {**DEFAULT_COMPILE_SETTINGS, **case.get("compile", {}), "version": case["version"]}
+    compiled, compile_metrics = measure(compile_solidity, sol_files, compile_settings)
+    metrics = {"compile": compile_metrics}
+
+    if run_symexec and compile_metrics["success"]:
+        symexec_settings = {**DEFAULT_SYMEXEC_SETTINGS, **case.get("symexec", {})}
+        result, symexec_metrics = measure(symbolic_exec, sol_files, case["contract"], compiled["result"], symexec_settings)
+        if symexec_metrics["success"]:
+            symexec_metrics["coverage"] = result["result"]["cov_percentage"]
+        metrics["symexec"] = symexec_metrics
+
+    queue.put(metrics)
+
+def run_isolated(case, run_symexec):
+    """
+    Runs one case in a fresh interpreter
+    :return: Metrics by phase, or a failed "process" phase if the interpreter died without reporting them
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(case, run_symexec, queue))
+    start = time.monotonic()
+    process.start()
+    try:
+        while True:
+            # Checked before reading, so metrics put right before the process exited are still read
+            alive = process.is_alive()
+            try:
+                return queue.get(timeout=1)
+            except queue_module.Empty:
+                if not alive:
+                    break
+    finally:
+        process.join()
+
+    return {"process": {
+        "wall_seconds": round(time.monotonic() - start, 4),
+        "cpu_seconds": 0,
+        "peak_rss_bytes": 0,
+        "output_bytes": 0,
+        "success": False,
+        "error": f"Benchmark process exited with code {process.exitcode}",
+    }}
+
+def aggregate(runs):
+    """
+    Median wall and CPU time over repeated runs, maximum for sizes
+    """
+    aggregated = dict()
+    # A run whose process died only has a "process" phase
+    for phase in dict.fromkeys(phase for run in runs for phase in run):
+        phase_runs = [run[phase] for run in runs if phase in run]
+        aggregated[phase] = dict(phase_runs[-1])
+        for metric in ("wall_seconds", "cpu_seconds"):
+            aggregated[phase][metric] = round(statistics.median(run[metric] for run in phase_runs), 4)
+        for metric in ("peak_rss_bytes", "output_bytes"):
+            aggregated[phase][metric] = max(run[metric] for run in phase_runs)
+    return aggregated
+
+def compare(results, baseline, threshold):
+    """
+    :return: List of regression descriptions
+    """
+    regressions = list()
+    for name, phases in results.items():
+        for phase, metrics in phases.items():
+            base = baseline.get(name, {}).get(phase)
+            if base is None or not metrics.get("success") or not base.get("success"):
+                continue
+            for metric, floor in COMPARED_METRICS.items():
+                current, previous = metrics[metric], base[metric]
+                if current > previous * (1 + threshold) and current - previous > floor:
+                    regressions.append(f"{name} {phase} {metric}: {previous} -> {current} (+{(current / previous - 1) * 100:.0f}%)"
+                                       if previous else f"{name} {phase} {metric}: {previous} -> {current}")
+            if metrics.get("coverage") is not None and base.get("coverage") is not None and metrics["coverage"] < base["coverage"] - 1:
+                regressions.append(f"{name} {phase} coverage: {base['coverage']:.1f}% -> {metrics['coverage']:.1f}%")
+    return regressions
+
+def print_results(results):
+    print(f"{'case':<16}{'phase':<9}{'wall s':>9}{'cpu s':>9}{'rss MB':>9}{'output KB':>11}{'coverage':>10}")
+    for name, phases in results.items():
+        if "skipped" in phases:
+            print(f"{name:<16}skipped: {phases['skipped']}")
+            continue
+        for phase, m in phases.items():
+            coverage = f"{m['coverage']:.1f}%" if m.get("coverage") is not None else ""
+            status = "" if m["success"] else f"  FAILED: {m.get('error')}"
+            print(f"{name:<16}{phase:<9}{m['wall_seconds']:>9.3f}{m['cpu_seconds']:>9.3f}"
+                  f"{m['peak_rss_bytes'] / 1024 / 1024:>9.1f}{m['output_bytes'] / 1024:>11.1f}{coverage:>10}{status}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline compile and symbolic execution benchmarks')
+    parser.add_argument('--cases', help='Comma separated case names, defaults to all')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case, wall and CPU time are medians')
+    parser.add_argument('--compile-only', action='store_true', help='Skip symbolic execution')
+    parser.add_argument('--output', help='Write the results to this file')
+    parser.add_argument('--save-baseline', help='Write the results to this baseline file')
+    parser.add_argument('--compare', help='Baseline file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative increase counted as a regression')
+    args = parser.parse_args()
+
+    # Every run has to do the full work, and must not touch the shared cache
+    os.environ["SOLBOLT_CHECKPOINTS"] = "0"
+    os.environ["SOLBOLT_CREATION_CACHE"] = "0"
+    os.environ["SOLBOLT_CACHE_DIR"] = tempfile.mkdtemp(prefix="solbolt-bench-")
+
+    results = dict()
+    for case in load_cases(args.cases.split(",") if args.cases else None):
+        if not solc_installed(case["version"]):
+            results[case["name"]] = {"skipped": f"solc {case['version']} not installed"}
+            continue
+        runs = [run_isolated(case, not args.compile_only) for _ in range(args.repeat)]
+        results[case["name"]] = aggregate(runs)
+
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare({name: phases for name, phases in results.items() if "skipped" not in phases}, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 from distutils.log import error
 from matplotlib.pyplot import xlabel
-import requests
 import os
 import json
 from solbolt.tasks import compile_solidity, symbolic_exec
+from solbolt.blobs import load_result
+from solbolt.etherscan import DEFAULT_MODE, MODES, EtherscanClient
+from solbolt.evalstore import RESULTS_PATH, EvalStore
+from solbolt.accuracy import TransactionSampler, bucket, bucket_counts
 from statistics import median, mean
 
 from os.path import exists
-import ast
 from packaging import version
 
 import traceback
@@ -26,10 +28,16 @@ from enum import Enum
 import time
 from pathlib import Path
 
+import heapq
+import multiprocessing
+from multiprocessing.connection import wait
+import resource
+import signal
+
 ############ EVAL #############
 
+CONTRACTS_FILE = "contracts.json"
 CONTRACT_INDEX_URL = "https://raw.githubusercontent.com/tintinweb/smart-contract-sanctuary-ethereum/71f4a95fb5394c810238952dace1b2c3103e7617/contracts/mainnet/contracts.json"
-ETHERSCAN_API_ENDPOINT = 'https://api.etherscan.io/api'
 ETHERSCAN_API_KEY = os.environ.get("REACT_APP_SOLBOLT_ETHERSCAN_KEY")
 
 ETHERSCAN_SOURCE = "SourceCode"
@@ -85,6 +93,49 @@ def get_cov_class_name(cov_class):
     return f'{COV_CLASSES[cov_class - 1]}% - {COV_CLASSES[cov_class]}%'
   return f'>{COV_CLASSES[cov_class - 1]}%'
 
+etherscan_mode = DEFAULT_MODE
+_etherscan = None
+
+# One client per process, created on first use so forked evaluation workers do not share a session
+def etherscan_client():
+  global _etherscan
+  if (_etherscan == None):
+    _etherscan = EtherscanClient(ETHERSCAN_API_KEY, mode=etherscan_mode)
+  return _etherscan
+
+results_path = RESULTS_PATH
+_results = None
+
+def results_store():
+  global _results
+  if (_results == None):
+    _results = EvalStore(results_path)
+  return _results
+
+def save_result(address, output, prefix=None):
+  results_store().put(address, output, prefix)
+
+# Bump a stage's version to invalidate its cached outputs after changing what it computes
+STAGE_VERSIONS = {
+  "compile": 1,
+  "symexec": 1
+}
+
+refresh_stages = False
+
+# Runs a pipeline stage, or reuses its output from an earlier run with the same inputs
+def cached_stage(stage, inputs, compute):
+  key = EvalStore.stage_key({"stage_version": STAGE_VERSIONS[stage], **inputs})
+  if (not refresh_stages):
+    output = results_store().get_stage(stage, key)
+    if (output != None):
+      print(f"{bcolors.OKBLUE}[EVAL]: Using cached {stage} output...{bcolors.ENDC}")
+      return (key, output)
+  
+  output = compute()
+  results_store().put_stage(stage, key, output)
+  return (key, output)
+
 class bcolors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -114,14 +165,48 @@ def contract_ether_key(e):
 def contract_tx_key(e):
   return int(e["txcount"])
 
-def read_file(filename):
-    contracts = list()
+# Streams the contracts index, keeping the `limit` contracts with the most transactions among
+# those with at least `min_tx_count`, sorted by transaction count. `on_contract` sees every contract.
+def read_file(filename, limit=None, min_tx_count=0, on_contract=None):
+    heap = list()
+    total = 0
     with open(filename) as f:
         for i, line in enumerate(f):
-            contracts.append(json.loads(line))
+            contract = json.loads(line)
+            total += 1
+            if (on_contract != None):
+                on_contract(contract)
             
-    contracts.sort(reverse=True, key=contract_tx_key)
-    return (contracts, i + 1)
+            tx_count = contract_tx_key(contract)
+            if (tx_count < min_tx_count or limit == 0):
+                continue
+            
+            # Earlier lines win ties, like the stable sort this replaces
+            item = (tx_count, -i, {"address": contract["address"], "name": contract["name"], "txcount": tx_count})
+            if (limit == None or len(heap) < limit):
+                heapq.heappush(heap, item)
+            elif (item > heap[0]):
+                heapq.heapreplace(heap, item)
+    
+    contracts = [contract for (_, _, contract) in sorted(heap, reverse=True)]
+    return (contracts, total)
+
+# Loads the top contracts of the index, refreshing the address to compiler version index on the way
+# if the index file changed
+def read_candidates(limit=None):
+  store = results_store()
+  if (store.versions_current(CONTRACTS_FILE)):
+    return read_file(CONTRACTS_FILE, limit, MIN_TX_COUNT)
+  
+  with store.rebuilding_versions(CONTRACTS_FILE) as add_version:
+    return read_file(CONTRACTS_FILE, limit, MIN_TX_COUNT, lambda contract: add_version(contract['address'], contract['compiler']))
+
+# Builds the address to compiler version index if it is missing or out of date
+def ensure_version_index():
+  store = results_store()
+  if (not store.versions_current(CONTRACTS_FILE)):
+    with store.rebuilding_versions(CONTRACTS_FILE) as add_version:
+      read_file(CONTRACTS_FILE, limit=0, on_contract=lambda contract: add_version(contract['address'], contract['compiler']))
 
 # Takes a code and address for a smart contract to test, compiles it, and symbolically executes it
 # if there are Etherscan transaction avaliable for us to test.
@@ -142,6 +227,7 @@ class Evaluator:
       self.symexec_dict = symexec_dict
       
       self.compiler_settings = None
+      self.compile_key = None
       self.prefix = prefix
       self.source_contents = list()
       
@@ -163,7 +249,7 @@ class Evaluator:
         "status": 1,
         "result": eval_result
       }
-      self.save_to_file(str(output_dict), prefix=self.prefix)
+      self.save_to_file(output_dict, prefix=self.prefix)
     except Exception as e:
       print(f"{bcolors.FAIL}[EVAL]: {e.__class__.__name__} caught! Skipping...{bcolors.ENDC}")
       output_dict = {
@@ -171,22 +257,14 @@ class Evaluator:
         "result": f"{e.__class__.__name__} caught",
         "traceback": traceback.format_exc()
       }
-      self.save_to_file(str(output_dict), prefix=self.prefix)
+      self.save_to_file(output_dict, prefix=self.prefix)
+    
+    return output_dict["status"]
       
 
   # gets Etherscan code
   def get_etherscan_code(self):
-    etherscan_response = requests.get(ETHERSCAN_API_ENDPOINT, params={
-      "module": 'contract',
-      "action": 'getsourcecode',
-      "address": self.address,
-      "apikey": ETHERSCAN_API_KEY
-    })
-    
-    if (etherscan_response.status_code != 200):
-      raise EtherscanException
-    
-    etherscan_data = etherscan_response.json()
+    etherscan_data = etherscan_client().get_source_code(self.address)
     
     result: str = etherscan_data["result"][0]
     
@@ -254,11 +332,18 @@ class Evaluator:
     
   
   def compile(self):
-    compilation_result = compile_solidity(self.source_contents, self.compiler_settings)
-    if (not compilation_result["success"]):
-      raise CompilationFailedException
-      
-    return compilation_result["result"]
+    def run_compile():
+      compilation_result = load_result(compile_solidity(self.source_contents, self.compiler_settings))
+      if (not compilation_result["success"]):
+        raise CompilationFailedException
+      return compilation_result["result"]
+    
+    inputs = {
+      "sources": self.source_contents,
+      "settings": self.compiler_settings
+    }
+    (self.compile_key, compilation_result) = cached_stage("compile", inputs, run_compile)
+    return compilation_result
     
   def symexec(self, compilation_result):
     symexec_settings = {
@@ -267,96 +352,48 @@ class Evaluator:
       'onchain_address': self.address
     }
     
-    symexec_result = symbolic_exec(self.source_contents, self.contract_name, compilation_result, symexec_settings)
-  
-    if (not symexec_result["success"]):
-      raise SymExecFailedException
-    
-    return symexec_result["result"]
+    def run_symexec():
+      symexec_result = load_result(symbolic_exec(self.source_contents, self.contract_name, compilation_result, symexec_settings))
+      if (not symexec_result["success"]):
+        raise SymExecFailedException
+      return symexec_result["result"]
+    
+    # The compiler output is identified by the key of the compile stage rather than hashed again
+    inputs = {
+      "compile": self.compile_key,
+      "contract": self.contract_name,
+      "settings": symexec_settings
+    }
+    (_, symexec_result) = cached_stage("symexec", inputs, run_symexec)
+    return symexec_result
   
   # Outputs:
   # Overall summary: Stats for mean, median and sum overall accuracy (% of estimated gas over actual gas), total number of txns tested
   # Per function stats: Overall accuracy (mean, median and sum) for each function, number of concrete instances compared
   def eval(self, symexec_result):
     symexec_gas_map = symexec_result["function_gas"]
-    overall_accuracy = list()
-    per_function_stats = dict()
-    per_gas_class_stats = [list() for _ in GAS_CLASSES]
-    
-    per_gas_class_stats.append(list())
     
     current_page = 1
-    current_txns = 0
     
     no_more_txns = False
     
     function_map = {k[:10]: v for k, v in symexec_gas_map.items()}
-    
-    for key in function_map.keys():
-      per_function_stats[key] = list()   
-      
-    while ((current_page < MAX_PAGES or current_txns < MIN_TX_COUNT) and not no_more_txns):
-      etherscan_tx_response = requests.get(ETHERSCAN_API_ENDPOINT, params={
-        "module": 'account',
-        "action": 'txlist',
-        "address": self.address,
-        "startblock": 0,
-        "endblock": 99999999,
-        "page": current_page,
-        "offset": 1000,
-        "sort": "desc",
-        "apikey": ETHERSCAN_API_KEY
-      })
+    sampler = TransactionSampler(function_map, MAX_NUMBER_OF_TX_FOR_EACH_FUNCTION)
       
-      etherscan_txns_data = etherscan_tx_response.json()
+    while ((current_page < MAX_PAGES or sampler.total < MIN_TX_COUNT) and not no_more_txns):
+      etherscan_txns_data = etherscan_client().get_transactions(self.address, current_page)
       
       if (etherscan_txns_data["status"] == "0"):
         no_more_txns = True
       else:
-        etherscan_txns = etherscan_txns_data["result"]
-        
-        for txn_data in etherscan_txns:
-          fn_hash = txn_data["input"][:10]
-          if fn_hash in function_map:
-            if len(per_function_stats[fn_hash]) >= MAX_NUMBER_OF_TX_FOR_EACH_FUNCTION:
-              continue
-            
-            symexec_gas_estimate = function_map[fn_hash]
-            concrete_gas_used = int(txn_data["gasUsed"])
-            
-            accuracy = symexec_gas_estimate / concrete_gas_used
-            
-            overall_accuracy.append(accuracy)
-            per_function_stats[fn_hash].append(accuracy)
-            
-            try: 
-              gas_class = next(index for index, value in enumerate(GAS_CLASSES) if value > concrete_gas_used)
-            except StopIteration:
-              gas_class = -1
-              
-            per_gas_class_stats[gas_class].append(accuracy)
-            current_txns += 1
+        sampler.add_page(etherscan_txns_data["result"])
       
       current_page += 1
     
-    if (len(overall_accuracy) > 0):
-      overall_summary = self.get_accuracy_summary(overall_accuracy)
-    else:
+    if (sampler.total == 0):
       raise NoMatchingTransactionsException
     
-    per_function_summary = dict()
-    
-    for key in per_function_stats.keys():
-      function_txn_list = per_function_stats[key]
-      if (len(function_txn_list) > 0):
-        function_summary = self.get_accuracy_summary(function_txn_list)
-        per_function_summary[key] = function_summary
-  
-    per_gas_class_summary = dict()
-    for index, gas_class_txns in enumerate(per_gas_class_stats):
-      if (len(gas_class_txns) > 0):
-        gas_class_summary = self.get_accuracy_summary(gas_class_txns)
-        per_gas_class_summary[index] = gas_class_summary
+    (overall_summary, per_function_summary, per_gas_class_summary) = sampler.statistics(GAS_CLASSES)
   
     return {
       "summary": overall_summary,
@@ -365,28 +402,8 @@ class Evaluator:
       "symexec_result": symexec_result
     }
   
-  def save_to_file(self, result, prefix=None):
-    prefix_text = "" if prefix == None else f'{prefix}/'
-    
-    path = f"eval/contracts/{prefix_text}"
-    
-    Path(path).mkdir(parents=True, exist_ok=True)
-    
-    with open(f"{path}{self.address}.txt", "w") as result_file:
-          result_file.write(result)
-  
-  def get_accuracy_summary(self, txn_list):
-    sum_accuracy = sum(txn_list)
-    mean_accuracy = mean(txn_list)
-    median_accuracy = median(txn_list)
-    number_of_txns = len(txn_list)
-    
-    return {
-      "sum": sum_accuracy,
-      "mean": mean_accuracy,
-      "median": median_accuracy,
-      "count": number_of_txns
-    }
+  def save_to_file(self, output, prefix=None):
+    save_result(self.address, output, prefix)
   
   def safe_access(self, source, path):
     current_item = source
@@ -423,47 +440,178 @@ class NoMatchingTransactionsException(Error):
 # Gets the code and address for the next smart contract to test, and saves progress
 # Also saves in separate files the result for individual smart contracts
 class EvalWrapper:
-  def __init__(self) -> None:
-      (self.contracts_list, self.total_contracts) = read_file("contracts.json")
+  def __init__(self, limit=None) -> None:
+      self.limit = limit
+    
+  def contract_jobs(self):
+    (contracts_list, total_contracts) = read_candidates(self.limit)
+    
+    jobs = list()
+    for current_contract_json in contracts_list:
+      jobs.append({
+        "address": current_contract_json['address'],
+        "name": current_contract_json['name'],
+        "prefix": None
+      })
     
-  def exec_eval(self):
-    num_contracts_analysed = 0
+    limit_text = "" if self.limit == None else f", evaluating the top {self.limit}"
+    print(f"{bcolors.OKGREEN}[WRAPPER]: {len(jobs)}/{total_contracts} contracts selected with at least {MIN_TX_COUNT} transactions{limit_text}{bcolors.ENDC}")
+    return jobs
     
-    while num_contracts_analysed < self.total_contracts:
-      current_contract_json = self.contracts_list[num_contracts_analysed]
-      num_contracts_analysed += 1
-      
-      print(f"{bcolors.OKGREEN}[WRAPPER]: Analysing {num_contracts_analysed}/{self.total_contracts} contracts: {current_contract_json['name']} at {current_contract_json['address']}, with balance {current_contract_json['balance']}...{bcolors.ENDC}")
-      
-      if (os.path.exists(f"eval/contracts/{current_contract_json['address']}.txt")):
-        print(f"{bcolors.OKGREEN}[WRAPPER]: Contract already analysed! Skipping...{bcolors.ENDC}")
-        continue
-      
-      if (current_contract_json['txcount'] < MIN_TX_COUNT):
-        print(f"{bcolors.OKGREEN}[WRAPPER]: Contract only has {current_contract_json['txcount']} transactions, which is lower than the minimum of {MIN_TX_COUNT}. Skipping...{bcolors.ENDC}")
-        continue
-      
-      evaluator = Evaluator(current_contract_json['address'], current_contract_json['name'])
-      evaluator.run_all()
+  def exec_eval(self, runner):
+    runner.run(self.contract_jobs())
+    print("Evaluation complete!")
     
+  def symloaded_jobs(self):
+    # Contracts that failed in v2 but have a successful v1 symexec result to evaluate again
+    rows = results_store().query("""SELECT v2.address FROM results v2
+                                     JOIN results v1 ON v1.prefix = '' AND v1.address = v2.address
+                                     WHERE v2.prefix = 'v2' AND v2.status = 0 AND v1.status = 1
+                                     ORDER BY v2.address""")
+    # The symexec result is loaded by the process evaluating the contract
+    return [{"address": address, "name": "contract", "prefix": "v2", "symexec_prefix": None} for (address,) in rows]
+    
+  def exec_eval_symloaded(self, runner):
+    runner.run(self.symloaded_jobs())
     print("Evaluation complete!")
+
+# Evaluates a single contract in a process of its own, started by EvalRunner
+def run_job(job, memory_limit):
+  # Own process group, so a timeout also kills the solc processes started by this one
+  os.setpgrp()
+  
+  if (memory_limit > 0):
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+  
+  symexec_dict = None
+  if ("symexec_prefix" in job):
+    symexec_dict = results_store().get(job["address"], job["symexec_prefix"])["result"]["symexec_result"]
+  
+  evaluator = Evaluator(job["address"], job["name"], symexec_dict=symexec_dict, prefix=job["prefix"])
+  sys.exit(0 if evaluator.run_all() == 1 else 1)
+
+# Append-only record of the contracts started and finished by EvalRunner.
+# Contracts that were started but never finished are run again when resuming.
+class EvalJournal:
+  FINISHED = ("success", "error", "timeout", "killed")
+  FAILED = ("error", "timeout", "killed")
+  
+  def __init__(self, path) -> None:
+    self.path = path
+    self.states = dict()
+    
+    if (os.path.exists(path)):
+      with open(path) as f:
+        for line in f:
+          try:
+            record = json.loads(line)
+          except json.JSONDecodeError:
+            # Last line of a run that was killed while writing it
+            continue
+          self.states[record["job"]] = record["status"]
+    
+    Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+    self.file = open(path, "a")
+    
+  @staticmethod
+  def key(job):
+    return f"{job['prefix'] or ''}/{job['address']}"
+    
+  def record(self, job, status, **details):
+    self.states[self.key(job)] = status
+    self.file.write(json.dumps({"job": self.key(job), "status": status, "time": time.time(), **details}) + "\n")
+    self.file.flush()
+    os.fsync(self.file.fileno())
+    
+  def finished(self, job, retry_failed=False):
+    status = self.states.get(self.key(job))
+    if (retry_failed and status in self.FAILED):
+      return False
+    return status in self.FINISHED
+
+# Runs evaluation jobs in parallel worker processes, one process per contract, with per-contract
+# time and memory limits. Progress is recorded in an EvalJournal, so an interrupted run resumes
+# with the contracts it had not finished.
+class EvalRunner:
+  def __init__(self, journal, jobs=1, timeout=0, memory_limit=0, retry_failed=False) -> None:
+    self.journal = journal
+    self.jobs = max(1, jobs)
+    self.timeout = timeout
+    self.memory_limit = memory_limit
+    self.retry_failed = retry_failed
+    
+  def pending_jobs(self, jobs):
+    pending = list()
+    for job in jobs:
+      if (self.journal.finished(job, self.retry_failed)):
+        continue
+      if (self.journal.key(job) not in self.journal.states):
+        # Evaluated before the journal was kept. Re-evaluations of failed results exist because of
+        # that failure, so only their successes count as done.
+        stored_status = results_store().status(job["address"], job["prefix"])
+        if (stored_status == 1):
+          self.journal.record(job, "success", imported=True)
+          continue
+        if (stored_status != None and "symexec_prefix" not in job):
+          self.journal.record(job, "error", imported=True)
+          continue
+      pending.append(job)
+    return pending
+    
+  def run(self, jobs):
+    pending = self.pending_jobs(jobs)
+    total = len(pending)
+    completed = 0
+    print(f"{bcolors.OKGREEN}[WRAPPER]: {total} contracts to evaluate, {len(jobs) - total} already done, {self.jobs} at a time{bcolors.ENDC}")
+    
+    # Forked, as this script parses its arguments on import
+    context = multiprocessing.get_context("fork")
+    running = dict()
     
-  def exec_eval_symloaded(self):
-    contract_directory = 'eval/contracts/v2'
-    contract_directory_v1 = 'eval/contracts'
-    for filename in os.listdir(contract_directory):
-      full_filename = os.path.join(contract_directory, filename)
-      full_filename_v1 = os.path.join(contract_directory_v1, filename)
-      # checking if it is a file
-      if os.path.isfile(full_filename):
-        with open(full_filename) as f:
-          json_content = ast.literal_eval(f.read())
-          if (json_content["status"] == 0):
-            with open(full_filename_v1) as f1:
-              json_content_v1 = ast.literal_eval(f1.read())
-              if (json_content_v1["status"] == 1):
-                evaluator = Evaluator(filename[:-4], symexec_dict=json_content_v1["result"]["symexec_result"], prefix="v2")
-                evaluator.run_all()
+    try:
+      while (len(pending) > 0 or len(running) > 0):
+        while (len(pending) > 0 and len(running) < self.jobs):
+          job = pending.pop(0)
+          self.journal.record(job, "started")
+          process = context.Process(target=run_job, args=(job, self.memory_limit))
+          process.start()
+          running[process.sentinel] = (process, job, time.monotonic())
+        
+        ready = wait(list(running.keys()), timeout=1.0)
+        now = time.monotonic()
+        
+        for sentinel, (process, job, started) in list(running.items()):
+          if (sentinel in ready):
+            process.join()
+            if (process.exitcode == 0):
+              status = "success"
+            elif (process.exitcode == 1):
+              status = "error"
+            else:
+              status = "killed"
+              save_result(job["address"], {"status": 0, "result": "WorkerKilledException caught", "exitcode": process.exitcode}, job["prefix"])
+          elif (self.timeout > 0 and now - started > self.timeout):
+            self.kill(process)
+            status = "timeout"
+            save_result(job["address"], {"status": 0, "result": "TimeoutException caught"}, job["prefix"])
+          else:
+            continue
+          
+          del running[sentinel]
+          completed += 1
+          self.journal.record(job, status, seconds=round(now - started, 1), exitcode=process.exitcode)
+          print(f"{bcolors.OKGREEN}[WRAPPER]: {completed}/{total} {job['address']}: {status} after {now - started:.0f}s{bcolors.ENDC}")
+    finally:
+      # Interrupted: unfinished contracts stay "started" in the journal and run again on resume
+      for (process, _, _) in running.values():
+        self.kill(process)
+    
+  def kill(self, process):
+    try:
+      os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+      pass
+    process.join()
     
 class ResultMode(Enum):
     default = 'default'
@@ -481,38 +629,19 @@ class ResultParser:
       self.mode = mode
         
   def default_parse(self):
-    contract_directory = 'eval/contracts'
-    success_count = 0
-    accuracy_list = []
+    store = results_store()
+    rows = store.query("SELECT accuracy_sum / accuracy_count, cov_percentage FROM results WHERE prefix = '' AND status = 1")
+    success_count = len(rows)
+    accuracy_list = [accuracy_for_contact * 100.0 for (accuracy_for_contact, _) in rows]
+    coverage_list = [cov_percentage for (_, cov_percentage) in rows]
     
     accuracy_classes = [0.5, 0.8, 0.9, 1.0, 1.1, 1.2, 1.5, 1.75, 3.0, 7.0]
-    accuracy_class_list = [0 for _ in accuracy_classes]
-    accuracy_class_list.append(0)
     
     accuracy_labels = ["<50%", "50% - 80%", "80% - 90%", "90% - 100%", "100% - 110%", "110% - 120%", "120% - 150%", "150% - 175%", "175% - 300%", "300% - 700%", ">700%"]
     
-    coverage_list = []
-    for filename in os.listdir(contract_directory):
-      full_filename = os.path.join(contract_directory, filename)
-      # checking if it is a file
-      if os.path.isfile(full_filename):
-        with open(full_filename) as f:
-          json_content = ast.literal_eval(f.read())
-          if (json_content["status"] == 1):
-            success_count += 1
-            accuracy_for_contact = json_content["result"]["summary"]["sum"] / json_content["result"]["summary"]["count"]
-            accuracy_list.append(accuracy_for_contact * 100.0)
-            coverage_list.append(json_content["result"]["symexec_result"]["cov_percentage"])
-
-            function_gas = json_content["result"]["functions"]
-
-            for function_name, summary in function_gas.items():
-              fn_accuracy = summary["mean"]
-              try: 
-                acc_class = next(index for index, value in enumerate(accuracy_classes) if value > fn_accuracy)
-              except StopIteration:
-                acc_class = -1
-              accuracy_class_list[acc_class] += 1
+    # Functions are only stored for successful evaluations
+    fn_accuracies = [fn_accuracy for (fn_accuracy,) in store.query("SELECT accuracy_mean FROM functions WHERE prefix = ''")]
+    accuracy_class_list = bucket_counts(fn_accuracies, accuracy_classes).tolist()
     
     print(f'Total contracts successfully evaluated: {success_count}')
     print(f'Mean accuracy (estimated gas over exact): {mean(accuracy_list)}')
@@ -618,18 +747,12 @@ class ResultParser:
     fig_gastap.write_html(f"eval/plots/overall_gastap_fn_accuracy_plot.html")
 
   def coverage_parse(self):
-    contract_directory = 'eval/contracts'
+    coverage_results = pd.DataFrame(results_store().query("SELECT cov_percentage, accuracy_mean FROM results WHERE prefix = '' AND status = 1"),
+                          columns=["cov_percentage", "accuracy_mean"])
+    coverage_results["cov_class"] = bucket(coverage_results["cov_percentage"], COV_CLASSES)
     cov_dict = {c: [] for c in range(len(COV_CLASSES))}
-    for filename in os.listdir(contract_directory):
-      full_filename = os.path.join(contract_directory, filename)
-      # checking if it is a file
-      if os.path.isfile(full_filename):
-        with open(full_filename) as f:
-          json_content = ast.literal_eval(f.read())
-          if (json_content["status"] == 1):
-            cov_percentage = json_content["result"]["symexec_result"]["cov_percentage"]
-            cov_class = next(index for index, value in enumerate(COV_CLASSES) if value > cov_percentage)
-            cov_dict[cov_class].append(json_content["result"]["summary"]["mean"] * 100.0)
+    # Full coverage falls past the last class boundary
+    cov_dict.update({cov_class: (group["accuracy_mean"] * 100.0).tolist() for cov_class, group in coverage_results.groupby("cov_class")})
             
     colors = n_colors('rgb(5, 200, 200)', 'rgb(200, 10, 10)', len(cov_dict), colortype='rgb')
 
@@ -650,7 +773,6 @@ class ResultParser:
     fig.write_html(f"eval/plots/coverage_against_accuracy_plot.html")
     
   def error_parse(self):
-    contract_directory = 'eval/contracts'
     error_dict = {
       "Success": 0,
       "Solidity version too low or Etherscan API error": 0,
@@ -660,31 +782,26 @@ class ResultParser:
       "Symbolic execution failed": 0,
       "Other errors": 0
     }
-    for filename in os.listdir(contract_directory):
-      full_filename = os.path.join(contract_directory, filename)
-      # checking if it is a file
-      if os.path.isfile(full_filename):
-        with open(full_filename) as f:
-          json_content = ast.literal_eval(f.read())
-          error_class = "Success"
-          
-          if (json_content["status"] != 1):
-            error_logged = json_content["result"][:-7]
-            
-            if error_logged.startswith("Etherscan"):
-              error_class = "Solidity version too low or Etherscan API error"
-            elif error_logged.startswith("NoMatching"):
-              error_class = "Not enough concrete transactions"
-            elif error_logged.startswith("Unsupported"):
-              error_class = "Unsupported language"
-            elif error_logged.startswith("Compilation"):
-              error_class = "Compilation failed"
-            elif error_logged.startswith("SymExec"):
-              error_class = "Symbolic execution failed"
-            else:
-              error_class = "Other errors"
-          
-          error_dict[error_class] += 1
+    for (status, error) in results_store().query("SELECT status, error FROM results WHERE prefix = ''"):
+      error_class = "Success"
+      
+      if (status != 1):
+        error_logged = error[:-7]
+        
+        if error_logged.startswith("Etherscan"):
+          error_class = "Solidity version too low or Etherscan API error"
+        elif error_logged.startswith("NoMatching"):
+          error_class = "Not enough concrete transactions"
+        elif error_logged.startswith("Unsupported"):
+          error_class = "Unsupported language"
+        elif error_logged.startswith("Compilation"):
+          error_class = "Compilation failed"
+        elif error_logged.startswith("SymExec"):
+          error_class = "Symbolic execution failed"
+        else:
+          error_class = "Other errors"
+      
+      error_dict[error_class] += 1
     
     error_dict_parsed = [{'Evaluation status': k, 'Count': v} for (k, v) in error_dict.items()]
     
@@ -700,35 +817,24 @@ class ResultParser:
     fig.write_html(f"eval/plots/eval_errors.html")
     
   def version_parse(self):
-    contract_directory = 'eval/contracts'
     version_dict = dict()
     
-    (contracts_list, _) = read_file("contracts.json")
+    ensure_version_index()
     
-    contract_to_version_map = {current_contract_json['address']: current_contract_json['compiler'] for current_contract_json in contracts_list}
+    for (compiler_version_str,) in results_store().query("""SELECT v.compiler FROM results r
+                                                            JOIN contract_versions v ON v.address = r.address
+                                                            WHERE r.prefix = '' AND r.status = 1"""):
+      if compiler_version_str.startswith('v'):
+        compiler_version_str = compiler_version_str[1:]
+        
+      compiler_version = version.parse(compiler_version_str)
+      
+      solidity_version_key = f'0.{compiler_version.minor}.x'
+      
+      if solidity_version_key not in version_dict:
+        version_dict[solidity_version_key] = 0
     
-    for filename in os.listdir(contract_directory):
-      full_filename = os.path.join(contract_directory, filename)
-      # checking if it is a file
-      if os.path.isfile(full_filename):
-        with open(full_filename) as f:
-          json_content = ast.literal_eval(f.read())
-          
-          if (json_content["status"] == 1):
-            contract_address = filename[:-4]
-            
-            compiler_version_str = contract_to_version_map[contract_address]
-            if compiler_version_str.startswith('v'):
-              compiler_version_str = compiler_version_str[1:]
-              
-            compiler_version = version.parse(compiler_version_str)
-            
-            solidity_version_key = f'0.{compiler_version.minor}.x'
-            
-            if solidity_version_key not in version_dict:
-              version_dict[solidity_version_key] = 0
-          
-            version_dict[solidity_version_key] += 1
+      version_dict[solidity_version_key] += 1
     
     version_dict_parsed = [{'Solidity version': k, 'Count': v} for (k, v) in version_dict.items()]
     
@@ -745,20 +851,12 @@ class ResultParser:
     
     
   def gas_parse(self):
-    contract_directory = 'eval/contracts/v2'
     gas_dict = dict()
-    for filename in os.listdir(contract_directory):
-      full_filename = os.path.join(contract_directory, filename)
-      # checking if it is a file
-      if os.path.isfile(full_filename):
-        with open(full_filename) as f:
-          json_content = ast.literal_eval(f.read())
-          if (json_content["status"] == 1):
-            gas_classes = json_content["result"]["gas_class"]
-            for gas_class, summary in gas_classes.items():
-              if gas_class not in gas_dict:
-                gas_dict[gas_class] = []
-              gas_dict[gas_class].append(summary["sum"] / summary["count"] * 100)
+    # Gas classes are only stored for successful evaluations
+    for (gas_class, accuracy) in results_store().query("SELECT gas_class, accuracy_sum / accuracy_count FROM gas_classes WHERE prefix = 'v2'"):
+      if gas_class not in gas_dict:
+        gas_dict[gas_class] = []
+      gas_dict[gas_class].append(accuracy * 100)
             
     colors = n_colors('rgb(5, 200, 200)', 'rgb(200, 10, 10)', len(gas_dict), colortype='rgb')
 
@@ -789,13 +887,30 @@ class ResultParser:
     mode_table[self.mode]()
     
 def run_main(args):
-  test_wrapper = EvalWrapper()
-  test_wrapper.exec_eval_symloaded()
+  global etherscan_mode, results_path, refresh_stages
+  etherscan_mode = args.etherscan
+  results_path = args.results
+  refresh_stages = args.refresh_stages
+  journal = EvalJournal(args.journal or f"eval/journal-{args.source}.jsonl")
+  runner = EvalRunner(journal, jobs=args.jobs, timeout=args.timeout,
+                      memory_limit=args.memory_limit * 1024 * 1024, retry_failed=args.retry_failed)
+  test_wrapper = EvalWrapper(args.top)
+  if (args.source == 'contracts'):
+    test_wrapper.exec_eval(runner)
+  else:
+    test_wrapper.exec_eval_symloaded(runner)
 
 def eval_main(args):
+  global results_path
+  results_path = args.results
   result_parser = ResultParser(args.mode)
   result_parser.exec_parse()
 
+def import_main(args):
+  store = EvalStore(args.results)
+  imported = store.import_directory(args.directory)
+  print(f"Imported {imported} results from {args.directory} into {args.results}")
+
 # if __name__ == "__main__":
 #   # test_wrapper = EvalWrapper()
 #   # test_wrapper.exec_eval()
@@ -811,13 +926,33 @@ subparsers = parser.add_subparsers()
 
 # Create a run subcommand    
 parser_run = subparsers.add_parser('run', help='Run symbolic execution on verified contracts')
+parser_run.add_argument('--source', choices=['contracts', 'symloaded'], default='symloaded',
+                        help="'contracts' evaluates contracts.json from scratch, 'symloaded' re-evaluates failed v2 results with the saved symexec results")
+parser_run.add_argument('--top', type=int, help="With --source contracts: only evaluate this many contracts with the most transactions")
+parser_run.add_argument('--jobs', type=int, default=1, help='Contracts evaluated in parallel')
+parser_run.add_argument('--timeout', type=float, default=900, help='Seconds before a contract is killed, 0 for no limit')
+parser_run.add_argument('--memory-limit', type=int, default=0, help='Address space limit per contract in MB, 0 for no limit')
+parser_run.add_argument('--journal', help='Progress journal to resume from, defaults to eval/journal-<source>.jsonl')
+parser_run.add_argument('--etherscan', choices=MODES, default=DEFAULT_MODE,
+                        help="Etherscan responses: 'cache' reads through the on-disk cache, 'record' refetches and updates it, 'replay' runs offline from it, 'live' bypasses it")
+parser_run.add_argument('--results', default=RESULTS_PATH, help='Evaluation result store')
+parser_run.add_argument('--retry-failed', action='store_true', help='Run contracts that failed, timed out or were killed again')
+parser_run.add_argument('--refresh-stages', action='store_true',
+                        help='Compile and run symbolic execution again instead of reusing the cached stage outputs')
 parser_run.set_defaults(func=run_main)
 
 # Create a eval subcommand       
 parser_eval = subparsers.add_parser('eval', help='Evaluate the completed symbolic execution results')
 parser_eval.add_argument('mode', type=ResultMode, choices=list(ResultMode))
+parser_eval.add_argument('--results', default=RESULTS_PATH, help='Evaluation result store')
 parser_eval.set_defaults(func=eval_main)
 
+# Create an import subcommand
+parser_import = subparsers.add_parser('import', help='Import result files written by earlier versions into the result store')
+parser_import.add_argument('directory', nargs='?', default='eval/contracts', help='Directory of <address>.txt result files')
+parser_import.add_argument('--results', default=RESULTS_PATH, help='Evaluation result store')
+parser_import.set_defaults(func=import_main)
+
 if len(sys.argv) <= 1:
     sys.argv.append('--help')
 
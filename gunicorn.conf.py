@@ -0,0 +1,10 @@
+import os
+
+bind = os.environ.get("SOLBOLT_BIND", "[::]:5000")
+workers = int(os.environ.get("SOLBOLT_GUNICORN_WORKERS", "8"))
+# 'sync' serves one request per worker at a time. 'gevent' serves up to worker_connections
+# concurrently per worker, which idle pollers and event streams need.
+worker_class = os.environ.get("SOLBOLT_GUNICORN_WORKER_CLASS", "sync")
+worker_connections = int(os.environ.get("SOLBOLT_GUNICORN_WORKER_CONNECTIONS", "1000"))
+# Sync workers are killed after this many seconds on one request, so event streams need gevent
+timeout = int(os.environ.get("SOLBOLT_GUNICORN_TIMEOUT", "30"))
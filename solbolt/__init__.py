@@ -9,6 +9,8 @@ except ImportError:
     flask.helpers._endpoint_from_view_func = flask.scaffold._endpoint_from_view_func
     from flask_restplus import Api, Resource
 from solbolt.apis import api
+from solbolt.metrics import metrics_view
+from solbolt import compression
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -35,6 +37,8 @@ def create_app(test_config=None):
         pass
 
     api.init_app(app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    compression.init_app(app)
     
     CORS(app, resources={r'/*': {'origins': '*'}})
     
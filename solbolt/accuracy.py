@@ -0,0 +1,124 @@
+"""
+Batched accuracy statistics for the evaluation scripts.
+
+Transactions are collected into arrays, bucketed with searchsorted and summarised with grouped
+aggregations, instead of one Python iteration and class scan per transaction.
+"""
+import numpy as np
+
+def bucket(values, boundaries):
+    """
+    Class of each value: the index of the first boundary greater than it, or len(boundaries)
+    for values past the last one
+    :param values: Array-like of numbers
+    :param boundaries: Ascending class boundaries
+    :return: Integer array of class indices
+    """
+    return np.searchsorted(np.asarray(boundaries), np.asarray(values), side="right")
+
+def bucket_counts(values, boundaries):
+    """
+    :return: Number of values in each of the len(boundaries) + 1 classes
+    """
+    return np.bincount(bucket(values, boundaries), minlength=len(boundaries) + 1)
+
+def rank_within_groups(keys):
+    """
+    :return: For each key, the number of equal keys before it
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    is_start = np.ones(len(keys), dtype=bool)
+    is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    starts = np.maximum.accumulate(np.where(is_start, np.arange(len(keys)), 0))
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(len(keys)) - starts
+    return ranks
+
+def grouped_summaries(keys, values, groups):
+    """
+    :param keys: Group index of each value, between 0 and groups - 1
+    :param values: Float array
+    :param groups: Number of groups
+    :return: Dict of group index to sum, mean, median and count, for every non-empty group
+    """
+    counts = np.bincount(keys, minlength=groups)
+    sums = np.bincount(keys, weights=values, minlength=groups)
+
+    # Values sorted by group, then by value, so each group's median sits in the middle of its run
+    sorted_values = values[np.lexsort((values, keys))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = np.flatnonzero(counts)
+    low = sorted_values[starts[present] + (counts[present] - 1) // 2]
+    high = sorted_values[starts[present] + counts[present] // 2]
+
+    return {
+        int(group): {
+            "sum": float(sums[group]),
+            "mean": float(sums[group] / counts[group]),
+            "median": float((low[i] + high[i]) / 2),
+            "count": int(counts[group]),
+        }
+        for i, group in enumerate(present)
+    }
+
+class TransactionSampler:
+    """
+    Collects the concrete transactions calling known functions, page by page, keeping at most
+    `per_function` transactions of each function in the order they are seen
+    """
+    def __init__(self, function_gas, per_function) -> None:
+        """
+        :param function_gas: Estimated gas of each function, by 4 byte selector with 0x prefix
+        :param per_function: Transactions kept per function
+        """
+        self.selectors = list(function_gas.keys())
+        self.codes = {selector: code for code, selector in enumerate(self.selectors)}
+        self.estimates = np.array([function_gas[selector] for selector in self.selectors], dtype=np.float64)
+        self.per_function = per_function
+        self.counts = np.zeros(len(self.selectors), dtype=np.int64)
+        self.pages = list()
+        self.total = 0
+
+    def add_page(self, transactions):
+        """
+        :param transactions: Etherscan transaction list entries
+        :return: Number of transactions kept from the page
+        """
+        codes = np.fromiter((self.codes.get(transaction["input"][:10], -1) for transaction in transactions),
+                            dtype=np.int64, count=len(transactions))
+        matched = np.flatnonzero(codes >= 0)
+        codes = codes[matched]
+
+        # Position of each transaction among those of its function, across pages
+        keep = rank_within_groups(codes) + self.counts[codes] < self.per_function
+        matched, codes = matched[keep], codes[keep]
+        if len(codes) == 0:
+            return 0
+
+        gas_used = np.fromiter((int(transactions[i]["gasUsed"]) for i in matched), dtype=np.int64, count=len(matched))
+        self.counts += np.bincount(codes, minlength=len(self.selectors))
+        self.pages.append((codes, gas_used))
+        self.total += len(codes)
+        return len(codes)
+
+    def arrays(self):
+        """
+        :return: Function codes, gas used and accuracy (estimate over gas used) of the kept transactions
+        """
+        if len(self.pages) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        codes = np.concatenate([codes for codes, _ in self.pages])
+        gas_used = np.concatenate([gas_used for _, gas_used in self.pages])
+        return codes, gas_used, self.estimates[codes] / gas_used
+
+    def statistics(self, gas_classes):
+        """
+        :param gas_classes: Ascending gas class boundaries
+        :return: Overall summary, summaries by function selector and summaries by gas class index
+        """
+        codes, gas_used, accuracy = self.arrays()
+        overall = grouped_summaries(np.zeros(len(codes), dtype=np.int64), accuracy, 1)[0]
+        by_function = grouped_summaries(codes, accuracy, len(self.selectors))
+        by_gas_class = grouped_summaries(bucket(gas_used, gas_classes), accuracy, len(gas_classes) + 1)
+        return overall, {self.selectors[code]: stats for code, stats in by_function.items()}, by_gas_class
@@ -0,0 +1,233 @@
+"""
+Admission control for the task endpoints.
+
+Requests are validated before they are enqueued, so a bad compiler version or out of range setting
+is rejected straight away instead of after a broker round trip and a queue wait. Once the broker
+queue is longer than MAX_QUEUE_DEPTH, or the estimated wait of a new task passes MAX_QUEUE_WAIT
+seconds, requests are rejected with 429 and a Retry-After estimate rather than accepted only to
+time out.
+"""
+import logging
+import math
+import os
+import re
+import time
+
+import redis
+
+from .apis.symexec import ANALYSIS_PLUGINS, InvalidSettingsError
+from .metrics import BROKER_URL, REJECTED, queued_tasks
+from .sources import MissingSourcesError
+from . import sources
+from .tasks import solc_binaries
+
+log = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.environ.get("SOLBOLT_ADMISSION", "1") == "1"
+ADMISSION_QUEUE = os.environ.get("SOLBOLT_ADMISSION_QUEUE", "celery")
+MAX_QUEUE_DEPTH = int(os.environ.get("SOLBOLT_MAX_QUEUE_DEPTH", "200"))
+MAX_QUEUE_WAIT = float(os.environ.get("SOLBOLT_MAX_QUEUE_WAIT", "300"))
+# Worker processes serving the queue, to turn queued work into an estimated wait
+WORKER_CONCURRENCY = int(os.environ.get("SOLBOLT_WORKER_CONCURRENCY", str(os.cpu_count() or 1)))
+# Typical run time of each task, in seconds
+TASK_SECONDS = {
+    "compile_solidity": float(os.environ.get("SOLBOLT_COMPILE_SECONDS", "2")),
+    "symbolic_exec": float(os.environ.get("SOLBOLT_SYMEXEC_SECONDS", "60")),
+    "symbolic_exec_bytecode": float(os.environ.get("SOLBOLT_SYMEXEC_SECONDS", "60")),
+}
+# Every request would otherwise read the queue, so reuse a reading for this long
+QUEUE_READ_INTERVAL = 1.0
+# Messages inspected to estimate the task mix. /sym/ messages carry the whole compiled JSON, so
+# only the oldest messages, the next to run, are read and assumed representative.
+QUEUE_SAMPLE = int(os.environ.get("SOLBOLT_ADMISSION_SAMPLE", "20"))
+MAX_RETRY_AFTER = 600
+
+MAX_FILES = int(os.environ.get("SOLBOLT_MAX_FILES", "100"))
+MAX_SOURCE_BYTES = int(os.environ.get("SOLBOLT_MAX_SOURCE_BYTES", str(5 * 1024 * 1024)))
+MAX_COMPILED_JSON_BYTES = int(os.environ.get("SOLBOLT_MAX_COMPILED_JSON_BYTES", str(50 * 1024 * 1024)))
+# Hex characters of bytecode, well above the 24KB runtime and 48KB initcode limits
+MAX_BYTECODE_CHARS = int(os.environ.get("SOLBOLT_MAX_BYTECODE_CHARS", str(512 * 1024)))
+HEX = re.compile(r"[0-9a-fA-F]*")
+
+EVM_VERSIONS = ("Default", "homestead", "tangerineWhistle", "spuriousDragon", "byzantium",
+                "constantinople", "petersburg", "istanbul", "berlin", "london")
+STRATEGIES = ("bfs", "dfs", "naive-random", "weighted-random")
+
+# Inclusive bounds of the integer symbolic execution settings
+SYMEXEC_BOUNDS = {
+    "max_depth": (1, int(os.environ.get("SOLBOLT_MAX_DEPTH", "512"))),
+    "call_depth_limit": (0, int(os.environ.get("SOLBOLT_MAX_CALL_DEPTH", "20"))),
+    "loop_bound": (1, int(os.environ.get("SOLBOLT_MAX_LOOP_BOUND", "50"))),
+    "transaction_count": (1, int(os.environ.get("SOLBOLT_MAX_TRANSACTION_COUNT", "5"))),
+}
+
+def check_integer(settings, key, low, high):
+    value = settings.get(key)
+    if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+        raise InvalidSettingsError(f"'{key}' must be an integer between {low} and {high}")
+
+def check_files(sol_files):
+    if not isinstance(sol_files, list) or len(sol_files) == 0:
+        raise InvalidSettingsError("At least one file is required")
+    if len(sol_files) > MAX_FILES:
+        raise InvalidSettingsError(f"At most {MAX_FILES} files are allowed")
+
+    total = 0
+    hashed = list()
+    for file in sol_files:
+        if not isinstance(file, dict) or not isinstance(file.get("name"), str):
+            raise InvalidSettingsError("Every file needs a 'name' and a 'content' or 'hash' string")
+        if sources.has_content(file):
+            total += len(file["content"].encode("utf8"))
+        elif isinstance(file.get("hash"), str):
+            hashed.append(file["hash"])
+        else:
+            raise InvalidSettingsError("Every file needs a 'name' and a 'content' or 'hash' string")
+
+    absent = sources.missing(hashed)
+    if len(absent) > 0:
+        raise MissingSourcesError(absent)
+    total += sum(sources.size(digest) or 0 for digest in hashed)
+    if total > MAX_SOURCE_BYTES:
+        raise InvalidSettingsError(f"Sources are larger than {MAX_SOURCE_BYTES} bytes")
+
+def check_symexec_settings(settings):
+    if not isinstance(settings, dict):
+        raise InvalidSettingsError("Settings are required")
+    for key, (low, high) in SYMEXEC_BOUNDS.items():
+        check_integer(settings, key, low, high)
+    if settings.get("strategy") not in STRATEGIES:
+        raise InvalidSettingsError(f"Unknown strategy: {settings.get('strategy')}")
+    for key in ("enable_onchain", "ignore_constraints"):
+        if not isinstance(settings.get(key), bool):
+            raise InvalidSettingsError(f"'{key}' must be a boolean")
+    for key in ("incremental", "aggregate_gas"):
+        if not isinstance(settings.get(key, False), bool):
+            raise InvalidSettingsError(f"'{key}' must be a boolean")
+
+    analyses = settings.get("analyses")
+    if analyses is not None:
+        if not isinstance(analyses, list) or not all(isinstance(analysis, str) for analysis in analyses):
+            raise InvalidSettingsError("'analyses' must be a list of strings")
+        unknown = [analysis for analysis in analyses if analysis not in ANALYSIS_PLUGINS]
+        if len(unknown) > 0:
+            raise InvalidSettingsError(f"Unknown analyses: {', '.join(map(str, unknown))}")
+
+def validate_compile(sol_files, settings):
+    """
+    :raises InvalidSettingsError: If the request would be rejected by the worker, or is out of bounds
+    :raises MissingSourcesError: If files refer to sources that have to be uploaded first
+    """
+    check_files(sol_files)
+    if not isinstance(settings, dict):
+        raise InvalidSettingsError("Settings are required")
+    if settings.get("version") not in solc_binaries:
+        raise InvalidSettingsError(f"Compiler version not found: {settings.get('version')}")
+    check_integer(settings, "optimize_runs", 0, 2 ** 32 - 1)
+    for key in ("enable_optimizer", "viaIR"):
+        if not isinstance(settings.get(key), bool):
+            raise InvalidSettingsError(f"'{key}' must be a boolean")
+    if settings.get("evmVersion") not in EVM_VERSIONS:
+        raise InvalidSettingsError(f"Unknown EVM version: {settings.get('evmVersion')}")
+
+def validate_symexec(solidity_files, contract, compiled_json, settings):
+    """
+    :param compiled_json: Decoded compiler output
+    :raises InvalidSettingsError: If the request would be rejected by the worker, or is out of bounds
+    :raises MissingSourcesError: If files refer to sources that have to be uploaded first
+    """
+    check_files(solidity_files)
+    check_symexec_settings(settings)
+
+    contracts = compiled_json.get("contracts", {}) if isinstance(compiled_json, dict) else {}
+    if not any(contract in file_contracts for file_contracts in contracts.values()):
+        raise InvalidSettingsError(f"Contract {contract} not found in the compiled JSON")
+
+def validate_bytecode(bytecode, runtime, source_map, settings):
+    """
+    :raises InvalidSettingsError: If the request would be rejected by the worker, or is out of bounds
+    """
+    if not isinstance(bytecode, str):
+        raise InvalidSettingsError("'bytecode' must be a hex string")
+    code = bytecode[2:] if bytecode.startswith("0x") else bytecode
+    if len(code) == 0 or len(code) % 2 != 0 or HEX.fullmatch(code) is None:
+        raise InvalidSettingsError("'bytecode' must be a non-empty hex string")
+    if len(code) > MAX_BYTECODE_CHARS:
+        raise InvalidSettingsError(f"'bytecode' is longer than {MAX_BYTECODE_CHARS} hex characters")
+    if not isinstance(runtime, bool):
+        raise InvalidSettingsError("'runtime' must be a boolean")
+    if source_map is not None and (not isinstance(source_map, str) or len(source_map) > MAX_SOURCE_BYTES):
+        raise InvalidSettingsError(f"'source_map' must be a string of at most {MAX_SOURCE_BYTES} characters")
+    check_symexec_settings(settings)
+
+_client = None
+_last_read = (0, None)
+
+def queue_snapshot():
+    """
+    :return: Queue length and queued messages by task name, or None if the queue cannot be read
+    """
+    global _client, _last_read
+    read_at, snapshot = _last_read
+    if time.monotonic() - read_at < QUEUE_READ_INTERVAL:
+        return snapshot
+
+    if _client is None:
+        _client = redis.Redis.from_url(BROKER_URL, socket_timeout=1)
+    try:
+        snapshot = queued_tasks(_client, ADMISSION_QUEUE, QUEUE_SAMPLE)
+    except redis.RedisError as e:
+        log.warning("Could not read queue %s for admission control: %s", ADMISSION_QUEUE, e)
+        snapshot = None
+    _last_read = (time.monotonic(), snapshot)
+    return snapshot
+
+def estimated_wait(length, counts):
+    """
+    :return: Seconds until a task enqueued now would start
+    """
+    inspected = sum(counts.values())
+    work = sum(TASK_SECONDS.get(task, 0) * count for task, count in counts.items())
+    if inspected < length and inspected > 0:
+        # Only the oldest messages were sampled, assume the rest has the same mix
+        work *= length / inspected
+    return work / max(1, WORKER_CONCURRENCY)
+
+def overloaded(task):
+    """
+    :param task: Name of the task about to be enqueued
+    :return: Seconds the client should wait before retrying, or None if the task can be admitted
+    """
+    if not ADMISSION_ENABLED or not BROKER_URL.startswith(("redis://", "rediss://", "unix://")):
+        return None
+
+    snapshot = queue_snapshot()
+    if snapshot is None:
+        # Fail open, the broker itself decides whether publishing works
+        return None
+
+    length, counts = snapshot
+    wait = estimated_wait(length, counts)
+    if length >= MAX_QUEUE_DEPTH:
+        reason = "queue_depth"
+    elif wait + TASK_SECONDS.get(task, 0) > MAX_QUEUE_WAIT:
+        reason = "queue_wait"
+    else:
+        return None
+
+    REJECTED.labels(task=task, reason=reason).inc()
+    # Time for the queue to drain back below the thresholds
+    excess = max(wait - MAX_QUEUE_WAIT, (length - MAX_QUEUE_DEPTH + 1) * wait / max(1, length))
+    return min(MAX_RETRY_AFTER, max(1, math.ceil(excess)))
+
+def rejection(task, error):
+    REJECTED.labels(task=task, reason="invalid").inc()
+    return {"message": str(error)}, 400
+
+def missing_sources(task, error):
+    REJECTED.labels(task=task, reason="missing_sources").inc()
+    return {"message": str(error), "missing": error.missing}, 409
+
+def too_busy(retry_after):
+    return ({"message": f"Too many queued tasks, please retry in {retry_after} seconds"}, 429,
+            {"Retry-After": str(retry_after)})
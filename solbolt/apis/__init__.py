@@ -2,6 +2,8 @@ from flask_restplus import Api
 
 from .compile import api as compile_ns
 from .sym import api as sym_ns
+from .status import api as status_ns
+from .sources import api as sources_ns
 
 api = Api(
     title='Solbolt Backend',
@@ -11,4 +13,6 @@ api = Api(
 )
 
 api.add_namespace(compile_ns)
-api.add_namespace(sym_ns)
\ No newline at end of file
+api.add_namespace(sym_ns)
+api.add_namespace(status_ns)
+api.add_namespace(sources_ns)
\ No newline at end of file
@@ -8,6 +8,18 @@ from subprocess import PIPE, Popen
 from json.decoder import JSONDecodeError
 
 from ..tasks import compile_solidity, celery
+from ..timing import Timings
+from ..events import stream_response
+from ..blobs import status_response
+from ..admission import (
+    InvalidSettingsError,
+    MissingSourcesError,
+    missing_sources,
+    overloaded,
+    rejection,
+    too_busy,
+    validate_compile
+)
 
 api = Namespace('compile', description='Compilation operations')
 
@@ -26,7 +38,8 @@ solc_details = api.model('Solidity Compiler Details',
 sol_file = api.model('Compilation file',
                 {
                     'name': fields.String(description="Filename", required=True),
-                    'content': fields.String(description="Solidity content", required=True),
+                    'content': fields.String(description="Solidity content"),
+                    'hash': fields.String(description="sha256 of the content uploaded to /sources, instead of the content"),
                 })
 
 solc_settings = api.model('Solidity Compiler Settings',
@@ -58,22 +71,39 @@ solidity_model = api.model('Compile Solidity',
 
 @api.route('/')
 class Compile(Resource):
-    @api.doc('compile', responses={ 200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error' })
+    @api.doc('compile', responses={ 200: 'OK', 400: 'Invalid Argument', 409: 'Sources Missing', 429: 'Too Many Queued Tasks', 500: 'Mapping Key Error' })
     @api.expect(solidity_model)
     def post(self):
         '''Compile Solidity into EVM'''
-        sol_files = request.json['files']
-        settings = request.json['settings']
-        task = compile_solidity.delay(sol_files, settings)
-        return {"task_id": task.id}
+        timings = Timings()
+        if not isinstance(request.json, dict):
+            return rejection("compile_solidity", "Request body must be a JSON object")
+        sol_files = request.json.get('files')
+        settings = request.json.get('settings')
+        with timings.phase("admission"):
+            try:
+                validate_compile(sol_files, settings)
+            except MissingSourcesError as e:
+                return missing_sources("compile_solidity", e)
+            except InvalidSettingsError as e:
+                return rejection("compile_solidity", e)
+            retry_after = overloaded("compile_solidity")
+        if retry_after is not None:
+            return too_busy(retry_after)
+        with timings.phase("enqueue"):
+            task = compile_solidity.delay(sol_files, settings)
+        timings.log("compile_request", task_id=task.id)
+        return {"task_id": task.id, "timings": timings.as_dict()}
 
 @api.route('/<task_id>')
 class CompileStatus(Resource):
     def get(self, task_id):
         task_result = celery.AsyncResult(task_id)
-        result = {
-            "task_id": task_id,
-            "task_status": task_result.status,
-            "task_result": task_result.result
-        }
-        return result
+        return status_response(task_id, task_result.status, task_result.result)
+
+@api.route('/<task_id>/events')
+class CompileEvents(Resource):
+    @api.doc('compile_events', responses={ 200: 'Server-sent event stream' })
+    def get(self, task_id):
+        '''Streams the state transitions and the result of a compilation'''
+        return stream_response(celery, [task_id])
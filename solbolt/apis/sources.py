@@ -0,0 +1,44 @@
+from flask_restplus import Namespace, Resource, fields
+from flask import request
+from .. import sources
+from ..admission import MAX_FILES, MAX_SOURCE_BYTES
+
+api = Namespace('sources', description='Source upload operations')
+
+upload_request = api.model('Source upload',
+                {
+                    'contents': fields.List(fields.String, description='Solidity sources to store', required=True),
+                })
+
+missing_request = api.model('Missing sources',
+                {
+                    'hashes': fields.List(fields.String, required=True,
+                            description='sha256 hex digests of the UTF-8 sources a request will refer to'),
+                })
+
+def string_list(key):
+    values = request.json.get(key) if isinstance(request.json, dict) else None
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        api.abort(400, f"'{key}' must be a list of strings")
+    if len(values) > MAX_FILES:
+        api.abort(400, f"At most {MAX_FILES} {key} per request")
+    return values
+
+@api.route('/')
+class SourceUpload(Resource):
+    @api.doc('upload_sources', responses={ 200: 'OK', 400: 'Invalid Argument' })
+    @api.expect(upload_request)
+    def post(self):
+        '''Stores sources, which /compile and /sym files can then refer to by hash'''
+        contents = string_list('contents')
+        if sum(len(content.encode("utf8")) for content in contents) > MAX_SOURCE_BYTES:
+            api.abort(400, f"Sources are larger than {MAX_SOURCE_BYTES} bytes")
+        return {"hashes": sources.put(contents)}
+
+@api.route('/missing')
+class MissingSources(Resource):
+    @api.doc('missing_sources', responses={ 200: 'OK', 400: 'Invalid Argument' })
+    @api.expect(missing_request)
+    def post(self):
+        '''Returns the hashes that have to be uploaded before a request can refer to them'''
+        return {"missing": sources.missing(string_list('hashes'))}
@@ -0,0 +1,90 @@
+from flask_restplus import Namespace, Resource, fields
+from flask import request
+from celery.backends.redis import RedisBackend
+from ..tasks import celery
+from ..events import FINISHED_STATES, MAX_STREAM_TASKS, read_states, stream_response
+from ..blobs import load_result
+
+api = Namespace('tasks', description='Task status operations')
+
+MAX_STATUS_TASKS = 500
+
+status_request = api.model('Task status request',
+                {
+                    'ids': fields.List(fields.String, description='Task ids', required=True),
+                    'include_results': fields.Boolean(default=False,
+                            description="Includes the results of finished tasks. Only states are returned by default."),
+                })
+
+def requested_ids(task_ids=None, limit=MAX_STREAM_TASKS):
+    if task_ids is None:
+        task_ids = [task_id for task_id in request.args.get('ids', '').split(',') if task_id]
+    if len(task_ids) == 0:
+        api.abort(400, "No task ids given")
+    if len(task_ids) > limit:
+        api.abort(400, f"At most {limit} task ids per request")
+    return task_ids
+
+def result_metas(task_ids):
+    """
+    Reads the results of many tasks at once. With the Redis result backend all of them are
+    fetched in a single MGET, otherwise one backend read per task.
+    """
+    backend = celery.backend
+    if isinstance(backend, RedisBackend):
+        values = backend.client.mget([backend.get_key_for_task(task_id) for task_id in task_ids])
+        return [backend.decode_result(value) if value is not None else {"status": "PENDING", "result": None}
+                    for value in values]
+    return [{"status": result.status, "result": result.result} for result in map(celery.AsyncResult, task_ids)]
+
+def task_statuses(task_ids, include_results=False):
+    """
+    Reads the state of many tasks at once. Without results, only the states recorded by the
+    workers are fetched; results are read for the remaining tasks, e.g. queued ones.
+    :return: List of task statuses in the order of task_ids
+    """
+    metas = dict()
+    if not include_results:
+        metas = {task_id: {"status": state} for task_id, state in zip(task_ids, read_states(task_ids))
+                    if state is not None}
+    missing = [task_id for task_id in task_ids if task_id not in metas]
+    if len(missing) > 0:
+        metas.update(zip(missing, result_metas(missing)))
+
+    statuses = list()
+    for task_id in task_ids:
+        meta = metas[task_id]
+        status = {"task_id": task_id, "task_status": meta["status"]}
+        if include_results and meta["status"] in FINISHED_STATES:
+            status["task_result"] = load_result(meta["result"]) if meta["status"] == "SUCCESS" else str(meta["result"])
+        statuses.append(status)
+    return statuses
+
+@api.route('/status')
+class TaskStatus(Resource):
+    @api.doc('task_status', params={'ids': 'Comma separated task ids', 'include_results': 'Include results of finished tasks'},
+             responses={ 200: 'OK', 400: 'Invalid Argument' })
+    def get(self):
+        '''Returns the states of a batch of tasks'''
+        include_results = request.args.get('include_results', 'false').lower() in ('1', 'true')
+        return {"tasks": task_statuses(requested_ids(limit=MAX_STATUS_TASKS), include_results)}
+
+    @api.doc('task_status_post', responses={ 200: 'OK', 400: 'Invalid Argument' })
+    @api.expect(status_request)
+    def post(self):
+        '''Returns the states of a batch of tasks, for id lists too long for a query string'''
+        body = request.json if isinstance(request.json, dict) else {}
+        task_ids = body.get('ids')
+        if not isinstance(task_ids, list) or not all(isinstance(task_id, str) for task_id in task_ids):
+            api.abort(400, "'ids' must be a list of strings")
+        include_results = body.get('include_results', False)
+        if not isinstance(include_results, bool):
+            api.abort(400, "'include_results' must be a boolean")
+        return {"tasks": task_statuses(requested_ids(task_ids, limit=MAX_STATUS_TASKS), include_results)}
+
+@api.route('/events')
+class TaskEvents(Resource):
+    @api.doc('task_events', params={'ids': 'Comma separated task ids'}, responses={ 200: 'Server-sent event stream', 400: 'Invalid Argument' })
+    def get(self):
+        '''Streams the state transitions and results of a batch of tasks'''
+        return stream_response(celery, requested_ids())
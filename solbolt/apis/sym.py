@@ -1,6 +1,20 @@
 from flask_restplus import Namespace, Resource, fields
 from flask import request
-from ..tasks import symbolic_exec, celery
+from ..tasks import symbolic_exec, symbolic_exec_bytecode, celery
+from ..timing import Timings
+from ..events import stream_response
+from ..blobs import status_response
+from ..admission import (
+    MAX_COMPILED_JSON_BYTES,
+    InvalidSettingsError,
+    MissingSourcesError,
+    missing_sources,
+    overloaded,
+    rejection,
+    too_busy,
+    validate_bytecode,
+    validate_symexec
+)
 import json
 
 api = Namespace('sym', description='Symbolic execution operations')
@@ -20,12 +34,19 @@ sym_settings = api.model('Symbolic execution Settings',
                     'onchain_address': fields.String(description="Address used for on chain concrete execution"),
                     'ignore_constraints': fields.Boolean(default=True,
                             description="Enables or disables the Z3 satisfiability checker. Enabling this will check if each path is satisfiable, but may not reach all states."),
+                    'analyses': fields.List(fields.String, default=['gas', 'coverage', 'function_gas', 'loop_gas', 'loop_mutation'],
+                            description="Analyses to run. Can include 'gas', 'coverage', 'function_gas', 'loop_gas' and 'loop_mutation'. Leaving some out skips their per-instruction work."),
+                    'incremental': fields.Boolean(default=False,
+                            description="Reuses the results of functions unchanged since the last run of this contract with the same settings."),
+                    'aggregate_gas': fields.Boolean(default=False,
+                            description="Returns creation and runtime gas summed per source line range and per function in 'source_gas', instead of per instruction."),
                 })
 
 sym_file = api.model('Symbolic execution file',
                 {
                     'name': fields.String(description="Filename", required=True),
-                    'content': fields.String(description="Solidity content", required=True),
+                    'content': fields.String(description="Solidity content"),
+                    'hash': fields.String(description="sha256 of the content uploaded to /sources, instead of the content"),
                 })
 
 solidity_model = api.model('Symbolic Execute', 
@@ -39,26 +60,86 @@ solidity_model = api.model('Symbolic Execute',
 					                  help="Settings cannot be blank.")
             })
 
+bytecode_model = api.model('Symbolic Execute Bytecode',
+          { 'bytecode': fields.String(required = True, description="Hex encoded EVM bytecode"),
+            'runtime': fields.Boolean(default=True,
+                            description="Whether the bytecode is runtime (deployed) code. Set to false for creation code."),
+            'source_map': fields.String(description="Compressed solc source map of the bytecode. When given, the result maps each analysed instruction to its source range."),
+            'settings': fields.Nested(sym_settings, required = True,
+                            description="Settings for symbolic execution", 
+                                      help="Settings cannot be blank.")
+            })
+
 @api.route('/')
 class Symbolic(Resource):
-    @api.doc('symexec', responses={ 200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error' })
+    @api.doc('symexec', responses={ 200: 'OK', 400: 'Invalid Argument', 409: 'Sources Missing', 429: 'Too Many Queued Tasks', 500: 'Mapping Key Error' })
     @api.expect(solidity_model)
     def post(self):
         '''Symbolically execute Solidity'''
-        solidity_files = request.json['files']
-        contract = request.json['contract']
-        compiled_json = json.loads(request.json['json'])
-        settings = request.json['settings']
-        task = symbolic_exec.delay(solidity_files, contract, compiled_json, settings)
-        return {"task_id": task.id}
+        timings = Timings()
+        if not isinstance(request.json, dict):
+            return rejection("symbolic_exec", "Request body must be a JSON object")
+        solidity_files = request.json.get('files')
+        contract = request.json.get('contract')
+        settings = request.json.get('settings')
+        compiled = request.json.get('json')
+        if not isinstance(compiled, str) or len(compiled) > MAX_COMPILED_JSON_BYTES:
+            return rejection("symbolic_exec", f"'json' must be a string of at most {MAX_COMPILED_JSON_BYTES} bytes")
+        with timings.phase("json_decode"):
+            try:
+                compiled_json = json.loads(compiled)
+            except ValueError:
+                return rejection("symbolic_exec", "'json' is not valid JSON")
+        with timings.phase("admission"):
+            try:
+                validate_symexec(solidity_files, contract, compiled_json, settings)
+            except MissingSourcesError as e:
+                return missing_sources("symbolic_exec", e)
+            except InvalidSettingsError as e:
+                return rejection("symbolic_exec", e)
+            retry_after = overloaded("symbolic_exec")
+        if retry_after is not None:
+            return too_busy(retry_after)
+        with timings.phase("enqueue"):
+            task = symbolic_exec.delay(solidity_files, contract, compiled_json, settings)
+        timings.log("sym_request", task_id=task.id)
+        return {"task_id": task.id, "timings": timings.as_dict()}
     
+@api.route('/bytecode')
+class SymbolicBytecode(Resource):
+    @api.doc('symexec_bytecode', responses={ 200: 'OK', 400: 'Invalid Argument', 429: 'Too Many Queued Tasks', 500: 'Mapping Key Error' })
+    @api.expect(bytecode_model)
+    def post(self):
+        '''Symbolically execute EVM bytecode, without sources or compiler output'''
+        timings = Timings()
+        if not isinstance(request.json, dict):
+            return rejection("symbolic_exec_bytecode", "Request body must be a JSON object")
+        bytecode = request.json.get('bytecode')
+        runtime = request.json.get('runtime', True)
+        source_map = request.json.get('source_map')
+        settings = request.json.get('settings')
+        with timings.phase("admission"):
+            try:
+                validate_bytecode(bytecode, runtime, source_map, settings)
+            except InvalidSettingsError as e:
+                return rejection("symbolic_exec_bytecode", e)
+            retry_after = overloaded("symbolic_exec_bytecode")
+        if retry_after is not None:
+            return too_busy(retry_after)
+        with timings.phase("enqueue"):
+            task = symbolic_exec_bytecode.delay(bytecode, runtime, source_map, settings)
+        timings.log("sym_bytecode_request", task_id=task.id)
+        return {"task_id": task.id, "timings": timings.as_dict()}
+
 @api.route('/<task_id>')
 class SymbolicStatus(Resource):
     def get(self, task_id):
         task_result = celery.AsyncResult(task_id)
-        result = {
-            "task_id": task_id,
-            "task_status": task_result.status,
-            "task_result": task_result.result
-        }
-        return result
\ No newline at end of file
+        return status_response(task_id, task_result.status, task_result.result)
+
+@api.route('/<task_id>/events')
+class SymbolicEvents(Resource):
+    @api.doc('symexec_events', responses={ 200: 'Server-sent event stream' })
+    def get(self, task_id):
+        '''Streams the state transitions and the result of a symbolic execution'''
+        return stream_response(celery, [task_id])
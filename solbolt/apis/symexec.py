@@ -4,6 +4,8 @@ import os
 import sys
 import re
 import time
+from contextlib import contextmanager
+from copy import copy
 
 from mythril.mythril import MythrilAnalyzer, MythrilDisassembler, MythrilConfig
 from mythril.exceptions import (
@@ -19,6 +21,29 @@ from z3 import Z3Exception
 from mythril.laser.plugin.plugins.plugin_annotations import (
     GasMeterItem
 )
+from mythril.laser.plugin.loader import LaserPluginLoader
+
+from ..onchain import CachedEthJsonRpc
+from ..checkpoint import (
+    CHECKPOINTS_ENABLED,
+    CREATION_CACHE_ENABLED,
+    CREATION_CACHE_MAX_BYTES,
+    CREATION_CACHE_TTL,
+    CheckpointStore,
+    checkpoint_key,
+    find_resume,
+    load_checkpoint_plugin
+)
+from ..timing import Timings, load_timing_plugin
+from ..incremental import (
+    ContractIndex,
+    IncrementalStore,
+    apply_reuse,
+    incremental_key,
+    load_incremental_plugin,
+    plan_reuse,
+    split_results
+)
 
 default_colors = [
     {
@@ -112,6 +137,45 @@ EXECUTION_TIMEOUT = 300
 # CREATION_TIMEOUT = int(os.environ.get("SOLBOLT_CREATION_TIMEOUT", "60"))
 CREATION_TIMEOUT = 60
 
+# HOST:PORT of a JSON-RPC node to use instead of Infura, e.g. a local solbolt.devnode
+ONCHAIN_RPC = os.environ.get("SOLBOLT_RPC", "")
+ONCHAIN_CACHE_ENABLED = os.environ.get("SOLBOLT_ONCHAIN_CACHE", "1") == "1"
+
+# Analyses a request can ask for and the laser plugin that computes each of them
+ANALYSIS_PLUGINS = {
+    "gas": "gas-meter",
+    "coverage": "coverage",
+    "function_gas": "function-tracker",
+    "loop_gas": "loop-gas-meter",
+    "loop_mutation": "loop-mutation-detector",
+}
+
+class InvalidSettingsError(ValueError):
+    pass
+
+@contextmanager
+def plugin_selection(disabled):
+    """
+    Keeps the given plugins out of the laser runs started inside the block, so their hooks
+    never run. Every other enabled plugin is instrumented as usual.
+    :param disabled: Names of the laser plugins to leave out
+    """
+    plugin_loader = LaserPluginLoader()
+    instrument_virtual_machine = plugin_loader.instrument_virtual_machine
+
+    def selective_instrument(symbolic_vm, with_plugins):
+        names = with_plugins or [name for name, builder in plugin_loader.laser_plugin_builders.items() if builder.enabled]
+        for name in disabled:
+            # The loader is shared between runs, so drop instances left over from earlier ones
+            plugin_loader.laser_plugin_instances.pop(name, None)
+        return instrument_virtual_machine(symbolic_vm, [name for name in names if name not in disabled])
+
+    plugin_loader.instrument_virtual_machine = selective_instrument
+    try:
+        yield
+    finally:
+        del plugin_loader.instrument_virtual_machine
+
 def merge_gas_items(global_gas_item, add_gas_item):
     global_gas_item.min_opcode_gas_used += add_gas_item.min_opcode_gas_used
     global_gas_item.max_opcode_gas_used += add_gas_item.max_opcode_gas_used
@@ -142,8 +206,13 @@ class SymExec:
                 bin_runtime=True,
                 no_onchain_data=True,
                 query_signature=None,
-                ignore_constraints=True
+                ignore_constraints=True,
+                checkpoint=CHECKPOINTS_ENABLED,
+                creation_cache=CREATION_CACHE_ENABLED,
+                incremental=False,
+                analyses=None
                 ) -> None:
+        self.timings = Timings()
         self.command = command
         self.solidity_files = solidity_files
         self.onchain_address = onchain_address
@@ -161,33 +230,55 @@ class SymExec:
         self.unconstrained_storage = unconstrained_storage
         self.bin_runtime = bin_runtime
         self.ignore_constraints = ignore_constraints
+        self.checkpoint = checkpoint
+        self.creation_cache = creation_cache
+        self.incremental = incremental
+        self.analyses = sorted(ANALYSIS_PLUGINS) if analyses is None else sorted(set(analyses))
+        
+        unknown = [analysis for analysis in self.analyses if analysis not in ANALYSIS_PLUGINS]
+        if len(unknown) > 0:
+            raise InvalidSettingsError(f"Unknown analyses: {', '.join(unknown)}")
         
         self.infura_id = os.environ.get('SOLBOLT_INFURA_ID', '')
         self.no_onchain_data = no_onchain_data
         
-        config = self.set_config()
+        with self.timings.phase("config"):
+            config = self.set_config()
         self.query_signature = query_signature
         solc_json = None
         solv = None
-        self.disassembler = MythrilDisassembler(
-            eth=config.eth,
-            solc_version=solv,
-            solc_settings_json=solc_json,
-            enable_online_lookup=query_signature,
-        )
+        with self.timings.phase("load_contract"):
+            self.disassembler = MythrilDisassembler(
+                eth=config.eth,
+                solc_version=solv,
+                solc_settings_json=solc_json,
+                enable_online_lookup=query_signature,
+            )
 
-        self.address = self.load_code(self.disassembler)
+            self.address = self.load_code(self.disassembler)
         
         # initialised with execute_command
         self.sym = None
         self.analyzer = None
+        self.resumed_round = None
+        self.creation_reused = False
+        self.contract_index = None
+        self.incremental_store = None
+        self.previous_run = None
+        self.reused_functions = set()
 
     def set_config(self):
         config = MythrilConfig()
         if self.infura_id:
             config.set_api_infura_id(self.infura_id)
         if not self.no_onchain_data:
-            config.set_api_from_config_path()
+            if ONCHAIN_RPC:
+                config.set_api_rpc(ONCHAIN_RPC)
+            else:
+                config.set_api_from_config_path()
+            
+            if config.eth is not None and ONCHAIN_CACHE_ENABLED:
+                config.eth = CachedEthJsonRpc(config.eth)
 
         return config
 
@@ -197,6 +288,8 @@ class SymExec:
             # Load from bytecode
             code = self.code[2:] if self.code.startswith("0x") else self.code
             address, _ = disassembler.load_from_bytecode(code, self.bin_runtime)
+            # Bytecode carries no contract name, so analyse the contract it was loaded as
+            self.contract_name = self.contract_name or disassembler.contracts[-1].name
         elif self.solidity_files is not None and self.json is not None:
             # Compile Solidity source file(s)
             if len(self.json) > 1:
@@ -257,6 +350,7 @@ class SymExec:
 
         start = time.process_time()
 
+        analyzer_start = time.monotonic()
         self.analyzer = MythrilAnalyzer(
             strategy=self.strategy,
             disassembler=self.disassembler,
@@ -279,6 +373,7 @@ class SymExec:
             ignore_constraints=self.ignore_constraints
             # solver_log=self.solver_log,
         )
+        self.timings.add("analyzer_setup", time.monotonic() - analyzer_start)
 
         if not self.disassembler.contracts:
             self.exit_with_error(
@@ -297,49 +392,237 @@ class SymExec:
                 "text", "contract name is not found within compiled contracts"
             )
 
-        sym = SymExecWrapper(
-                sym_contract, # here is where we set which contract it is
-                self.address,
-                self.strategy,
-                dynloader=DynLoader(self.analyzer.eth, active=not self.no_onchain_data),
-                max_depth=self.max_depth,
-                execution_timeout=self.execution_timeout,
-                transaction_count=self.transaction_count,
-                create_timeout=self.create_timeout,
-                loop_bound=self.loop_bound,
-                # disable_dependency_pruning=self.disable_dependency_pruning,
-                run_analysis_modules=False,
-                # custom_modules_directory=self.custom_modules_directory,
-            )
+        cache_start = time.monotonic()
+        if isinstance(self.analyzer.eth, CachedEthJsonRpc) and self.onchain_address is not None:
+            self.analyzer.eth.prefetch(self.onchain_address)
+
+        checkpoints = self.checkpoint_store(sym_contract)
+        creation_cache = self.creation_store(sym_contract)
+        # The stored states are read in full here, so a set evicted by another worker is a miss, not a failed run
+        resume = find_resume(checkpoints, creation_cache, self.transaction_count, self.max_depth)
+        if resume is not None:
+            self.resumed_round, resume_meta, resume_data, self.creation_reused = resume
+        
+        skip_entries = self.plan_incremental(sym_contract)
+        load_incremental_plugin(skip_entries)
+        
+        load_checkpoint_plugin(store=checkpoints,
+                               creation_store=creation_cache,
+                               resume=resume_data if resume is not None else None,
+                               save_last_round=len(skip_entries) == 0)
+        load_timing_plugin(self.timings)
+        self.timings.add("cache_lookup", time.monotonic() - cache_start)
+        
+        contract = sym_contract
+        address = self.address
+        create_timeout = self.create_timeout
+        
+        if resume is not None:
+            # Without creation code the wrapper starts from a preconfigured world state, which
+            # the checkpoint plugin then swaps for the stored open states
+            log.info("Resuming from checkpoint after transaction round %d", self.resumed_round)
+            contract = copy(sym_contract)
+            contract.creation_code = ""
+            address = resume_meta["address"]
+            create_timeout = 0
+
+        exploration_start = time.monotonic()
+        with plugin_selection(self.disabled_plugins()):
+            sym = SymExecWrapper(
+                    contract, # here is where we set which contract it is
+                    address,
+                    self.strategy,
+                    dynloader=DynLoader(self.analyzer.eth, active=not self.no_onchain_data),
+                    max_depth=self.max_depth,
+                    execution_timeout=self.execution_timeout,
+                    transaction_count=self.transaction_count - (self.resumed_round or 0),
+                    create_timeout=create_timeout,
+                    loop_bound=self.loop_bound,
+                    # disable_dependency_pruning=self.disable_dependency_pruning,
+                    run_analysis_modules=False,
+                    # custom_modules_directory=self.custom_modules_directory,
+                )
 
         self.sym = sym
+        # Whatever the wrapper spent outside the laser run, e.g. building the initial world state
+        self.timings.add("exploration_setup", time.monotonic() - exploration_start
+                         - self.timings.phases.get("creation_exploration", 0) / 1000
+                         - self.timings.phases.get("runtime_exploration", 0) / 1000)
+        
+        if isinstance(self.analyzer.eth, CachedEthJsonRpc):
+            log.info("On-chain cache: %d hits, %d misses", self.analyzer.eth.hits, self.analyzer.eth.misses)
+
+    def pinned_settings(self, settings):
+        """
+        Adds the on-chain block to settings used as a cache key
+        :return: The settings, or None if on-chain reads are not reproducible
+        """
+        if self.no_onchain_data:
+            return settings
+        
+        # On-chain reads are only reproducible when pinned to a block
+        if not isinstance(self.analyzer.eth, CachedEthJsonRpc):
+            return None
+        return {**settings, "block": self.analyzer.eth.block}
+
+    def checkpoint_store(self, sym_contract):
+        """
+        Returns the checkpoint store shared by runs of this contract with the same settings,
+        or None if checkpointing does not apply to this run
+        """
+        if not self.checkpoint:
+            return None
+        
+        settings = self.pinned_settings({
+            "onchain_address": self.onchain_address,
+            "max_depth": self.max_depth,
+            "call_depth_limit": self.call_depth_limit,
+            "strategy": self.strategy,
+            "loop_bound": self.loop_bound,
+            "execution_timeout": self.execution_timeout,
+            "solver_timeout": self.solver_timeout,
+            "create_timeout": self.create_timeout,
+            "unconstrained_storage": self.unconstrained_storage,
+            "no_onchain_data": self.no_onchain_data,
+            "ignore_constraints": self.ignore_constraints,
+            "analyses": self.analyses,
+        })
+        
+        return CheckpointStore(checkpoint_key(sym_contract, settings)) if settings is not None else None
+
+    def creation_store(self, sym_contract):
+        """
+        Returns the store of post-creation states shared by runs that only differ in runtime settings,
+        or None if creation caching does not apply to this run
+        """
+        if not self.creation_cache:
+            return None
+        
+        # A complete creation explores the same states under any strategy, and the depth bound is
+        # checked against the stored entry. Creation transactions get a loop bound of at least 8,
+        # so every loop_bound up to 7 behaves the same.
+        settings = self.pinned_settings({
+            "phase": "creation",
+            "onchain_address": self.onchain_address,
+            "call_depth_limit": self.call_depth_limit,
+            "creation_loop_bound": max(7, self.loop_bound),
+            "solver_timeout": self.solver_timeout,
+            "create_timeout": self.create_timeout,
+            "unconstrained_storage": self.unconstrained_storage,
+            "no_onchain_data": self.no_onchain_data,
+            "ignore_constraints": self.ignore_constraints,
+            "analyses": self.analyses,
+        })
+        
+        if settings is None:
+            return None
+        return CheckpointStore(checkpoint_key(sym_contract, settings), "creation",
+                               ttl=CREATION_CACHE_TTL, max_bytes=CREATION_CACHE_MAX_BYTES)
+
+    def disabled_plugins(self):
+        return [ANALYSIS_PLUGINS[analysis] for analysis in ANALYSIS_PLUGINS if analysis not in self.analyses]
+
+    def plugin(self, analysis):
+        """
+        :return: The laser plugin instance of an analysis, or None if it was not requested
+        """
+        if analysis not in self.analyses:
+            return None
+        return self.sym.plugin_loader.laser_plugin_instances.get(ANALYSIS_PLUGINS[analysis])
+
+    def plan_incremental(self, sym_contract):
+        """
+        Finds the functions whose results from the last run of this contract can be reused
+        :return: Entry addresses of the reused functions, which are skipped in the last transaction round
+        """
+        if not self.incremental or self.json is None:
+            return []
+        
+        settings = self.pinned_settings({
+            "onchain_address": self.onchain_address,
+            "max_depth": self.max_depth,
+            "call_depth_limit": self.call_depth_limit,
+            "strategy": self.strategy,
+            "loop_bound": self.loop_bound,
+            "transaction_count": self.transaction_count,
+            "execution_timeout": self.execution_timeout,
+            "solver_timeout": self.solver_timeout,
+            "create_timeout": self.create_timeout,
+            "unconstrained_storage": self.unconstrained_storage,
+            "no_onchain_data": self.no_onchain_data,
+            "ignore_constraints": self.ignore_constraints,
+            "analyses": self.analyses,
+        })
+        if settings is None:
+            return []
+        
+        try:
+            self.contract_index = ContractIndex(self.json[0], self.solidity_files, self.contract_name)
+        except (KeyError, ValueError) as e:
+            log.info("Could not index %s for incremental execution: %s", self.contract_name, e)
+            return []
+        
+        # Keyed without the code, so edits of the same contract find the previous run
+        self.incremental_store = IncrementalStore(incremental_key(self.contract_name, settings))
+        self.previous_run = self.incremental_store.load()
+        self.reused_functions = plan_reuse(self.contract_index, self.previous_run)
+        
+        skip_entries = [self.contract_index.functions[selector]["entry"] for selector in self.reused_functions
+                            if self.contract_index.functions[selector]["entry"] is not None]
+        log.info("Reusing %d of %d functions", len(self.reused_functions), len(self.contract_index.functions))
+        return skip_entries
+
+    def apply_incremental(self, result):
+        """
+        Merges the stored results of reused functions into a serialised result and stores the
+        per-function results for the next run
+        :param result: Dict with runtime, function_gas, loop_gas and detected_issues, updated in place
+        :return: Signatures of the reused and the re-explored functions
+        """
+        if self.contract_index is None:
+            return None
+        
+        apply_reuse(result, self.contract_index, self.previous_run, self.reused_functions)
+        self.incremental_store.save(split_results(result, self.contract_index))
+        
+        functions = self.contract_index.functions
+        return {
+            "reused": sorted(functions[selector]["signature"] for selector in self.reused_functions),
+            "explored": sorted(function["signature"] for selector, function in functions.items() if selector not in self.reused_functions),
+        }
 
     def parse_exec_results(self):
+        with self.timings.phase("parse_results"):
+            return self._parse_exec_results()
+
+    def _parse_exec_results(self):
         # parse creation transactions
         creation_transaction_gas_map = dict()
-        creation_gas_meter = self.sym.plugin_loader.laser_plugin_instances["gas-meter"].creation_gas_meter
-        
-        self.accumulate_gas(creation_transaction_gas_map, creation_gas_meter)
-        
-        # parse runtime transactions
         runtime_transaction_gas_map = dict()
-        runtime_gas_meter = self.sym.plugin_loader.laser_plugin_instances["gas-meter"].runtime_gas_meter
+        gas_plugin = self.plugin("gas")
         
-        self.accumulate_gas(runtime_transaction_gas_map, runtime_gas_meter)
+        if gas_plugin is not None:
+            self.accumulate_gas(creation_transaction_gas_map, gas_plugin.creation_gas_meter)
+            
+            # parse runtime transactions
+            self.accumulate_gas(runtime_transaction_gas_map, gas_plugin.runtime_gas_meter)
         
-        coverage_plugin = self.sym.plugin_loader.laser_plugin_instances["coverage"]
+        cov_percentage = None
+        coverage_plugin = self.plugin("coverage")
         
-        code = next(reversed(coverage_plugin.coverage))
-        code_cov = coverage_plugin.coverage[code]
-                                            
-        if sum(code_cov[1]) == 0 and code_cov[0] == 0:
-            cov_percentage = 0
-        else:
-            cov_percentage = sum(code_cov[1]) / float(code_cov[0]) * 100
+        if coverage_plugin is not None and len(coverage_plugin.coverage) > 0:
+            code = next(reversed(coverage_plugin.coverage))
+            code_cov = coverage_plugin.coverage[code]
+                                                
+            if sum(code_cov[1]) == 0 and code_cov[0] == 0:
+                cov_percentage = 0
+            else:
+                cov_percentage = sum(code_cov[1]) / float(code_cov[0]) * 100
         
         detected_issues = dict()
+        loop_mutation_plugin = self.plugin("loop_mutation")
         
-        loop_mutations = self.sym.plugin_loader.laser_plugin_instances["loop-mutation-detector"].detected_keys
+        loop_mutations = loop_mutation_plugin.detected_keys if loop_mutation_plugin is not None else []
         
         for key in loop_mutations:
             if key not in detected_issues:
@@ -347,11 +630,14 @@ class SymExec:
                 
             detected_issues[key].append('loop-mutation')
         
+        function_plugin = self.plugin("function_gas")
+        loop_gas_plugin = self.plugin("loop_gas")
+        
         return (
             creation_transaction_gas_map, 
             runtime_transaction_gas_map, 
-            self.sym.plugin_loader.laser_plugin_instances["function-tracker"].function_gas_meter,
-            self.sym.plugin_loader.laser_plugin_instances["loop-gas-meter"].global_loop_gas_meter,
+            function_plugin.function_gas_meter if function_plugin is not None else dict(),
+            loop_gas_plugin.global_loop_gas_meter if loop_gas_plugin is not None else dict(),
             cov_percentage,
             detected_issues
         )
@@ -0,0 +1,215 @@
+"""
+Queue and memory aware autoscaling of the Celery worker pool.
+
+Start the worker with --autoscale=MAX,MIN to use it. Every SCALE_INTERVAL seconds, and whenever a
+task message arrives, the pool is sized from the work waiting in the broker queue and reserved by
+the worker, split by task type, and from the memory available to the container. Symbolic execution processes are bounded by the memory they are expected
+to need, so a queue of symexec jobs never runs more of them than fit in RAM, while a queue of
+compiles can use the whole pool. Each resize is logged with the figures that drove it.
+"""
+import logging
+import math
+import os
+import time
+
+import redis
+from celery.worker import state
+from celery.worker.autoscale import Autoscaler
+
+from .metrics import BROKER_URL, queued_tasks
+
+log = logging.getLogger(__name__)
+
+AUTOSCALE_QUEUE = os.environ.get("SOLBOLT_AUTOSCALE_QUEUE", "celery")
+# Messages inspected to split the queue by task, the rest of the queue is assumed to have the same mix
+AUTOSCALE_SAMPLE = int(os.environ.get("SOLBOLT_AUTOSCALE_SAMPLE", "50"))
+# Seconds between pool size checks. On the event loop Celery itself only checks when a task message
+# arrives and every keepalive (30 seconds), too late to react to memory running out.
+SCALE_INTERVAL = 1.0
+# Reading the queue on every check would add broker load for no benefit
+QUEUE_READ_INTERVAL = 2.0
+
+# Expected peak memory of a process running each task, in MB
+SYMEXEC_MEMORY_MB = int(os.environ.get("SOLBOLT_SYMEXEC_MEMORY_MB", "2048"))
+TASK_MEMORY_MB = {
+    "compile_solidity": int(os.environ.get("SOLBOLT_COMPILE_MEMORY_MB", "256")),
+    "symbolic_exec": SYMEXEC_MEMORY_MB,
+    "symbolic_exec_bytecode": SYMEXEC_MEMORY_MB,
+}
+# Tasks not counted against the symexec memory bound. Every other task, unknown ones included, is heavy.
+LIGHT_TASKS = ("compile_solidity",)
+# Memory left free for the main process, the broker client and page cache
+MIN_FREE_MB = int(os.environ.get("SOLBOLT_AUTOSCALE_MIN_FREE_MB", "512"))
+
+def read_number(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return int(value) if value.isdigit() else None
+    except OSError:
+        return None
+
+def available_memory_mb():
+    """
+    :return: Memory available to this container in MB, the lower of the host's and the cgroup's,
+             or None if neither can be read
+    """
+    available = list()
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available.append(int(line.split()[1]) // 1024)
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # cgroup v2, then v1. A missing or "max" limit means the host's memory is the bound.
+    for limit_path, usage_path in (("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+                                   ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes")):
+        limit, usage = read_number(limit_path), read_number(usage_path)
+        if limit is not None and usage is not None and limit < 2 ** 60:
+            available.append(max(0, limit - usage) // (1024 * 1024))
+            break
+
+    return min(available) if len(available) > 0 else None
+
+def task_memory_mb(task):
+    return TASK_MEMORY_MB.get(task, SYMEXEC_MEMORY_MB)
+
+def is_light(task):
+    return task in LIGHT_TASKS
+
+def plan(queued, reserved, active, available_mb, min_concurrency, max_concurrency):
+    """
+    Picks the pool size for the current work and memory
+    :param queued: Estimated messages waiting in the broker queue, by task name
+    :param reserved: Tasks prefetched by this worker and not started yet, by task name
+    :param active: Tasks running in this worker, by task name
+    :param available_mb: Memory available in MB, or None if unknown
+    :return: Target number of processes, and the figures behind it
+    """
+    heavy_waiting = sum(count for task, count in queued.items() if not is_light(task))
+    heavy_waiting += sum(count for task, count in reserved.items() if not is_light(task))
+    light_waiting = sum(count for task, count in queued.items() if is_light(task))
+    light_waiting += sum(count for task, count in reserved.items() if is_light(task))
+    heavy_active = sum(count for task, count in active.items() if not is_light(task))
+    light_active = sum(count for task, count in active.items() if is_light(task))
+    running = heavy_active + light_active
+
+    if available_mb is None:
+        spare_mb = math.inf
+    else:
+        spare_mb = max(0, available_mb - MIN_FREE_MB)
+
+    # Running tasks already hold their memory, new ones need it from what is spare
+    heavy_slots = heavy_active + (max_concurrency if spare_mb == math.inf else int(spare_mb // SYMEXEC_MEMORY_MB))
+    heavy_target = min(heavy_active + heavy_waiting, heavy_slots)
+    spare_mb -= (heavy_target - heavy_active) * SYMEXEC_MEMORY_MB
+    light_slots = light_active + (max_concurrency if spare_mb == math.inf else int(spare_mb // task_memory_mb(LIGHT_TASKS[0])))
+    light_target = min(light_active + light_waiting, light_slots)
+
+    target = heavy_target + light_target
+    reason = "demand"
+    if heavy_active + heavy_waiting > heavy_slots:
+        # Any process can pick up the next symexec job, so with more of them waiting than fit in
+        # memory, the pool must not grow past what memory allows for them
+        target = min(target, max(heavy_slots, running))
+        reason = "memory"
+    if available_mb is not None and available_mb < MIN_FREE_MB:
+        # Out of headroom, only keep processes that are busy
+        target = min(target, running)
+        reason = "memory_pressure"
+
+    target = max(min_concurrency, min(max_concurrency, target))
+    return target, {
+        "reason": reason,
+        "heavy_waiting": heavy_waiting,
+        "light_waiting": light_waiting,
+        "heavy_active": heavy_active,
+        "light_active": light_active,
+        "heavy_slots": heavy_slots,
+        "available_mb": available_mb,
+    }
+
+def count_by_task(requests):
+    counts = dict()
+    for request in requests:
+        counts[request.name] = counts.get(request.name, 0) + 1
+    return counts
+
+class QueueMemoryAutoscaler(Autoscaler):
+    """
+    Autoscaler sizing the pool with plan(). Configured as worker_autoscaler in tasks.py.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._client = None
+        self._last_read = (0, dict())
+        # The hub is created before the pool, so it exists by the time the autoscaler is.
+        # Without an event loop the base class runs as a thread that checks every second.
+        hub = getattr(self.worker, "hub", None)
+        if hub is not None and getattr(self.worker, "use_eventloop", False):
+            hub.call_repeatedly(SCALE_INTERVAL, self.maybe_scale)
+
+    def queued(self):
+        """
+        :return: Estimated messages waiting in the broker queue by task name, empty if it cannot be read
+        """
+        read_at, queued = self._last_read
+        if time.monotonic() - read_at < QUEUE_READ_INTERVAL:
+            return queued
+        if not BROKER_URL.startswith(("redis://", "rediss://", "unix://")):
+            return dict()
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(BROKER_URL, socket_timeout=1)
+        try:
+            length, counts = queued_tasks(self._client, AUTOSCALE_QUEUE, AUTOSCALE_SAMPLE)
+            inspected = sum(counts.values())
+            queued = {task: math.ceil(count * length / inspected) for task, count in counts.items()} if inspected > 0 else dict()
+        except redis.RedisError as e:
+            log.warning("Could not read queue %s for autoscaling: %s", AUTOSCALE_QUEUE, e)
+            queued = dict()
+        self._last_read = (time.monotonic(), queued)
+        return queued
+
+    def _maybe_scale(self, req=None):
+        active = count_by_task(state.active_requests)
+        reserved = count_by_task(request for request in state.reserved_requests if request not in state.active_requests)
+        available_mb = available_memory_mb()
+        target, details = plan(self.queued(), reserved, active, available_mb, self.min_concurrency, self.max_concurrency)
+
+        procs = self.processes
+        if target > procs:
+            self.scale_up(target - procs)
+        elif target < procs and (details["reason"] == "memory_pressure" or self.may_scale_down()):
+            # Shrinking only removes idle processes, so under memory pressure do not wait for the keepalive
+            if not self._shrink(procs - target):
+                return False
+        else:
+            return False
+
+        log.info("Autoscaled from %d to %d processes (%s): waiting %d symexec and %d compile, running %d symexec "
+                 "and %d compile, %s MB available, room for %d symexec", procs, target, details["reason"],
+                 details["heavy_waiting"], details["light_waiting"], details["heavy_active"], details["light_active"],
+                 details["available_mb"], details["heavy_slots"])
+        return True
+
+    def may_scale_down(self):
+        # Unlike the base class, also scale down a pool that never scaled up
+        return self._last_scale_up is None or time.monotonic() - self._last_scale_up > self.keepalive
+
+    def _shrink(self, n):
+        """
+        :return: True if the pool shrank, the base class swallows the error when every process is busy
+        """
+        try:
+            self.pool.shrink(n)
+        except ValueError:
+            log.debug("Not scaling down, all processes are busy")
+            return False
+        except Exception as e:
+            log.error("Could not scale down by %d processes: %r", n, e, exc_info=True)
+            return False
+        return True
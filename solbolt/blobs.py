@@ -0,0 +1,189 @@
+"""
+Content-addressed store for large task results.
+
+Results above BLOB_THRESHOLD bytes of JSON are written to the cache directory instead of the
+Redis result backend, which only keeps a small pointer. The API and the workers have to share the
+cache directory. Blobs expire BLOB_TTL seconds after their last write, and the oldest ones are
+evicted once the store grows beyond BLOB_MAX_BYTES.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+from flask import Response
+
+from .cache import cache_path
+
+log = logging.getLogger(__name__)
+
+BLOB_THRESHOLD = int(os.environ.get("SOLBOLT_BLOB_THRESHOLD", str(256 * 1024)))
+BLOB_TTL = int(os.environ.get("SOLBOLT_BLOB_TTL", str(24 * 60 * 60)))
+BLOB_MAX_BYTES = int(os.environ.get("SOLBOLT_BLOB_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Eviction scans the whole store, so run it at most this often per process
+EVICTION_INTERVAL = 60
+
+CHUNK_SIZE = 64 * 1024
+
+class BlobStore:
+    def __init__(self, directory=None, ttl=BLOB_TTL, max_bytes=BLOB_MAX_BYTES) -> None:
+        self.directory = directory or os.path.dirname(cache_path("blobs", "blob"))
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._last_eviction = 0
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put(self, data):
+        """
+        :param data: Bytes to store
+        :return: sha256 hex digest identifying the blob
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Same content already stored, just restart its TTL
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        if time.time() - self._last_eviction >= EVICTION_INTERVAL:
+            self.evict()
+        return digest
+
+    def path(self, digest):
+        """
+        :return: Path of a live blob, or None if it does not exist or has expired
+        """
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            return None
+        path = self._path(digest)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+        except OSError:
+            return None
+        return path
+
+    def read(self, digest):
+        path = self.path(digest)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def open(self, digest):
+        """
+        :return: Open binary file of a live blob, or None. An open blob stays readable if it is evicted.
+        """
+        path = self.path(digest)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except OSError:
+            return None
+
+    def evict(self):
+        """
+        Removes expired blobs, then the least recently written ones until the store fits in max_bytes
+        """
+        self._last_eviction = time.time()
+        now = time.time()
+        blobs = list()
+        removed = 0
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    removed += self._remove(path)
+                elif not filename.endswith(".tmp"):
+                    blobs.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+
+        if removed > 0:
+            log.info("Evicted %d blobs, %d bytes left", removed, total)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+_store = None
+
+def store():
+    global _store
+    if _store is None:
+        _store = BlobStore()
+    return _store
+
+def offload_result(result):
+    """
+    Moves a task result to the blob store if its JSON is larger than BLOB_THRESHOLD
+    :param result: Task result
+    :return: The result itself, or a pointer to the blob holding it
+    """
+    data = json.dumps(result).encode("utf8")
+    if len(data) <= BLOB_THRESHOLD:
+        return result
+    return {"success": result.get("success"), "blob": {"id": store().put(data), "size": len(data)}}
+
+def is_pointer(result):
+    return isinstance(result, dict) and isinstance(result.get("blob"), dict) and "result" not in result
+
+def load_result(result):
+    """
+    :param result: Task result or blob pointer
+    :return: The full task result, or an error result if the blob has expired
+    """
+    if not is_pointer(result):
+        return result
+    data = store().read(result["blob"]["id"])
+    if data is None:
+        return {"success": False, "result": "Result has expired, please run the task again"}
+    return json.loads(data)
+
+def status_response(task_id, task_status, task_result):
+    """
+    Builds the body of a status endpoint. Offloaded results are streamed from the blob store
+    without being decoded.
+    :return: A dict for flask_restplus, or a streaming Flask response
+    """
+    status = {"task_id": task_id, "task_status": task_status}
+    if not is_pointer(task_result):
+        return {**status, "task_result": task_result}
+
+    f = store().open(task_result["blob"]["id"])
+    if f is None:
+        return {**status, "task_result": load_result(task_result)}
+
+    def generate():
+        with f:
+            yield json.dumps(status)[:-1].encode("utf8") + b', "task_result": '
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            yield b"}"
+
+    return Response(generate(), mimetype="application/json")
@@ -0,0 +1,14 @@
+import os
+
+# Root directory for all on-disk state shared between worker runs
+CACHE_DIR = os.environ.get("SOLBOLT_CACHE_DIR", os.path.join(os.getcwd(), "cache"))
+
+def cache_path(*parts):
+    """
+    Returns a path inside the cache directory, creating its parent directories
+    :param parts: Path components relative to the cache directory
+    :return: Absolute path
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
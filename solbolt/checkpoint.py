@@ -0,0 +1,428 @@
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+import time
+import zlib
+
+import z3
+from mythril.laser.ethereum.cfg import Node
+from mythril.laser.ethereum.function_managers.keccak_function_manager import keccak_function_manager
+from mythril.laser.ethereum.svm import LaserEVM
+from mythril.laser.ethereum.time_handler import time_handler
+from mythril.laser.ethereum.transaction.transaction_models import tx_id_manager
+from mythril.laser.plugin.builder import PluginBuilder
+from mythril.laser.plugin.interface import LaserPlugin
+from mythril.laser.plugin.loader import LaserPluginLoader
+from mythril.support.loader import DynLoader
+
+from .cache import cache_path
+
+log = logging.getLogger(__name__)
+
+CHECKPOINTS_ENABLED = os.environ.get("SOLBOLT_CHECKPOINTS", "1") == "1"
+CREATION_CACHE_ENABLED = os.environ.get("SOLBOLT_CREATION_CACHE", "1") == "1"
+# Checkpoint sets expire CHECKPOINT_TTL seconds after their last use, and the least recently used
+# ones are evicted once all of them together grow beyond CHECKPOINT_MAX_BYTES
+CHECKPOINT_TTL = int(os.environ.get("SOLBOLT_CHECKPOINT_TTL", str(24 * 60 * 60)))
+CHECKPOINT_MAX_BYTES = int(os.environ.get("SOLBOLT_CHECKPOINT_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+# Post-creation states get their own budget, so they are not crowded out by round checkpoints
+CREATION_CACHE_TTL = int(os.environ.get("SOLBOLT_CREATION_CACHE_TTL", str(24 * 60 * 60)))
+CREATION_CACHE_MAX_BYTES = int(os.environ.get("SOLBOLT_CREATION_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Eviction scans every checkpoint set, so run it at most this often per process
+EVICTION_INTERVAL = 60
+
+# Bump whenever the pickled layout changes so stale checkpoints are never resumed
+CHECKPOINT_FORMAT = 1
+
+CHECKPOINT_PLUGIN_NAME = "solbolt-checkpoint"
+
+def _dump_z3_expr(expr):
+    solver = z3.Solver()
+    solver.add(expr == expr)
+    return solver.sexpr()
+
+def _load_z3_expr(smt2):
+    return z3.parse_smt2_string(smt2)[0].arg(0)
+
+def _load_z3_sort(smt2):
+    return _load_z3_expr(smt2).sort()
+
+def _load_z3_func_decl(name, domain, range_sort):
+    return z3.Function(name, *domain, range_sort)
+
+class StatePickler(pickle.Pickler):
+    """
+    Pickles laser world states. z3 terms are written out as SMT-LIB, the dynamic loader and
+    the VM are replaced by the ones of the resuming run and CFG nodes are dropped.
+    """
+    def persistent_id(self, obj):
+        if isinstance(obj, DynLoader):
+            return "dynloader"
+        if isinstance(obj, LaserEVM):
+            return "laser"
+        if isinstance(obj, Node):
+            return "node"
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, z3.FuncDeclRef):
+            return _load_z3_func_decl, (obj.name(), [obj.domain(i) for i in range(obj.arity())], obj.range())
+        if isinstance(obj, z3.SortRef):
+            return _load_z3_sort, (_dump_z3_expr(z3.Const("sort", obj)),)
+        if isinstance(obj, z3.ExprRef):
+            return _load_z3_expr, (_dump_z3_expr(obj),)
+        return NotImplemented
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, laser=None) -> None:
+        super().__init__(file)
+        self.laser = laser
+
+    def persistent_load(self, pid):
+        if pid == "dynloader":
+            return self.laser.dynamic_loader if self.laser is not None else None
+        if pid == "laser":
+            return self.laser
+        return None
+
+def dumps(obj):
+    buf = io.BytesIO()
+    StatePickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buf.getvalue()
+
+def loads(data, laser=None):
+    return StateUnpickler(io.BytesIO(data), laser).load()
+
+def checkpoint_key(contract, settings):
+    """
+    Identifies the runs that may share checkpoints: same contract and every setting except transaction_count
+    :param contract: Contract being executed
+    :param settings: Dict of the execution settings that affect the explored states
+    :return: Hex digest
+    """
+    key = {
+        "format": CHECKPOINT_FORMAT,
+        "name": contract.name,
+        "creation_code": contract.creation_code,
+        "code": contract.code,
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+class CheckpointStore:
+    """
+    On-disk checkpoints of the open world states after each transaction round, one file per round.
+    Round 0 holds the states right after contract creation.
+    """
+    def __init__(self, key, kind="checkpoints", ttl=CHECKPOINT_TTL, max_bytes=CHECKPOINT_MAX_BYTES) -> None:
+        """
+        :param kind: Directory in the cache holding this store and the others it is evicted with
+        """
+        self.key = key
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = os.path.dirname(cache_path(kind, key, "round"))
+
+    def _path(self, round):
+        return os.path.join(self.directory, f"round-{round}.pkl.gz")
+
+    def rounds(self):
+        found = list()
+        try:
+            filenames = os.listdir(self.directory)
+        except FileNotFoundError:
+            # Evicted by another process
+            return found
+        for filename in filenames:
+            # The metadata file is written last, so its presence marks a complete checkpoint
+            m = re.match(r"^round-(\d+)\.json$", filename)
+            if m:
+                found.append(int(m.group(1)))
+        return sorted(found)
+
+    def latest(self, max_round):
+        """
+        :param max_round: Deepest round that may be used
+        :return: Deepest stored round not above max_round, or None
+        """
+        candidates = [round for round in self.rounds() if round <= max_round]
+        if len(candidates) == 0:
+            return None
+        self.touch()
+        return candidates[-1]
+
+    def touch(self):
+        """
+        Marks the checkpoint set as used, the directory's mtime is what eviction goes by
+        """
+        try:
+            os.utime(self.directory)
+        except OSError:
+            pass
+
+    def meta(self, round):
+        """
+        :param round: Stored round
+        :return: Metadata of the checkpoint, including the address of the contract account the states were executing,
+                 or None if the round was evicted or cannot be read
+        """
+        try:
+            with open(os.path.join(self.directory, f"round-{round}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.info("Checkpoint metadata for round %d is gone or unreadable: %s", round, e)
+            return None
+
+    def fetch(self, round):
+        """
+        Reads a stored round in full, so that an eviction after this point cannot affect the run
+        :param round: Stored round
+        :return: The metadata and the pickled checkpoint, or None if the round was evicted or cannot be read
+        """
+        meta = self.meta(round)
+        if meta is None:
+            return None
+        try:
+            with gzip.open(self._path(round), "rb") as f:
+                # Reading to the end checks the gzip CRC, so a truncated or corrupt file fails here
+                data = f.read()
+        except (OSError, EOFError, zlib.error) as e:
+            log.info("Checkpoint for round %d is gone or unreadable: %s", round, e)
+            return None
+        return meta, data
+
+    def save(self, round, checkpoint, **meta):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(round)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=3) as f:
+            f.write(dumps(checkpoint))
+        os.replace(tmp_path, path)
+
+        # Readers take the metadata file as the mark of a complete checkpoint, so it must never be seen half written
+        meta_path = os.path.join(self.directory, f"round-{round}.json")
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**meta, "size": os.path.getsize(path)}, f)
+        os.replace(tmp_path, meta_path)
+        log.info("Saved checkpoint for round %d (%d bytes)", round, os.path.getsize(path))
+
+        root = os.path.dirname(self.directory)
+        if time.time() - _last_eviction.get(root, 0) >= EVICTION_INTERVAL:
+            evict(root, self.ttl, self.max_bytes, keep=self.directory)
+
+_last_eviction = dict()
+
+def evict(root, ttl, max_bytes, keep=None):
+    """
+    Removes checkpoint sets unused for ttl seconds, then the least recently used ones until the
+    rest fit in max_bytes. Sets are removed whole, as rounds are only written in order.
+    :param root: Directory holding one directory per checkpoint set
+    :param keep: Directory of a set in use, which is never removed
+    """
+    _last_eviction[root] = time.time()
+    now = time.time()
+    sets = list()
+    removed = 0
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        try:
+            mtime = os.stat(directory).st_mtime
+            size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        except OSError:
+            continue
+        if directory != keep and now - mtime > ttl:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+        else:
+            sets.append((directory == keep, mtime, size, directory))
+
+    # The set in use sorts last, so it is only counted and never removed
+    total = sum(size for _, _, size, _ in sets)
+    for in_use, _, size, directory in sorted(sets):
+        if total <= max_bytes or in_use:
+            break
+        shutil.rmtree(directory, ignore_errors=True)
+        removed += 1
+        total -= size
+
+    if removed > 0:
+        log.info("Evicted %d checkpoint sets from %s, %d bytes left", removed, root, total)
+
+def find_resume(checkpoints, creation_cache, transaction_count, max_depth):
+    """
+    Picks the stored states a run starts from: the deepest usable round checkpoint, else reusable post-creation states.
+    Stores are shared with other workers, whose eviction may remove a set at any time, so a set that is gone by
+    the time it is read counts as a miss.
+    :param checkpoints: CheckpointStore of the run's transaction round checkpoints, or None
+    :param creation_cache: CheckpointStore of the run's post-creation states, or None
+    :return: (round, metadata, pickled checkpoint, whether it came from the creation cache), or None to run from creation
+    """
+    if checkpoints is not None:
+        round = checkpoints.latest(transaction_count)
+        if round is not None:
+            stored = checkpoints.fetch(round)
+            if stored is not None:
+                return (round, *stored, False)
+
+    if creation_cache is not None and 0 in creation_cache.rounds():
+        meta = creation_cache.meta(0)
+        if meta is not None and creation_reusable(meta, max_depth):
+            stored = creation_cache.fetch(0)
+            if stored is not None:
+                creation_cache.touch()
+                return (0, *stored, True)
+            log.info("Cached creation states were evicted while being read, running the creation transaction")
+    return None
+
+def creation_reusable(meta, max_depth):
+    """
+    Checks whether stored post-creation states are valid for a run with the given max_depth
+    :param meta: Metadata of the creation checkpoint
+    :param max_depth: max_depth of the new run
+    :return: True if the creation transaction would explore the same states
+    """
+    if meta["depth"] + 1 < meta["max_depth"]:
+        # No creation state ever came close enough to the bound to be pruned
+        return meta["depth"] < max_depth
+    return meta["max_depth"] == max_depth
+
+class CheckpointPluginBuilder(PluginBuilder):
+    name = CHECKPOINT_PLUGIN_NAME
+
+    def __call__(self, *args, **kwargs):
+        return CheckpointPlugin(**kwargs)
+
+class CheckpointPlugin(LaserPlugin):
+    """
+    Saves the open states and the state of the other plugins after contract creation and at the end
+    of every transaction round. When resuming, restores them in place of the creation transaction.
+    """
+    def __init__(self, store=None, creation_store=None, resume=None, save_last_round=True) -> None:
+        self.store = store
+        self.creation_store = creation_store
+        self.resume = resume
+        self.save_last_round = save_last_round
+        self.round = 0
+        self.creation_depth = 0
+
+    def initialize(self, symbolic_vm):
+        if self.store is None and self.creation_store is None and self.resume is None:
+            return
+
+        checkpoint = None
+        if self.resume is not None:
+            checkpoint = loads(self.resume, symbolic_vm)
+            self.round = checkpoint["round"]
+            # The creation transaction is skipped, so there is nothing to cache
+            self.creation_store = None
+
+        def save(store, round):
+            address = symbolic_vm.open_states[0].transaction_sequence[-1].callee_account.address.value
+            store.save(round, {
+                "round": round,
+                "open_states": symbolic_vm.open_states,
+                "plugins": self.snapshot_plugins(),
+                "tx_id": tx_id_manager._next_transaction_id,
+                "keccak": dumps(vars(keccak_function_manager)),
+            }, address=address, max_depth=symbolic_vm.max_depth, depth=self.creation_depth)
+
+        def restore_hook():
+            self.restore_plugins(checkpoint["plugins"], symbolic_vm)
+            tx_id_manager._next_transaction_id = max(tx_id_manager._next_transaction_id, checkpoint["tx_id"])
+            vars(keccak_function_manager).update(loads(checkpoint["keccak"], symbolic_vm))
+
+        def execute_state_hook(global_state):
+            if self.creation_store is not None:
+                self.creation_depth = max(self.creation_depth, global_state.mstate.depth)
+
+        def save_creation_hook():
+            creation_store = self.creation_store
+            self.creation_store = None
+            if creation_store is None or len(symbolic_vm.open_states) == 0:
+                return
+            if symbolic_vm.create_timeout > 0 and time.time() - start_time >= symbolic_vm.create_timeout:
+                log.info("Contract creation timed out, not caching its states")
+                return
+            save(creation_store, 0)
+
+        def start_sym_trans_hook():
+            nonlocal checkpoint
+            if checkpoint is None:
+                return
+            open_states = checkpoint["open_states"]
+            if getattr(symbolic_vm, "use_reachability_check", False):
+                open_states = [state for state in open_states if state.constraints.is_possible]
+            symbolic_vm.open_states[:] = open_states
+            checkpoint = None
+
+        def stop_sym_trans_hook():
+            self.round += 1
+            if self.store is None or len(symbolic_vm.open_states) == 0:
+                return
+            if not self.save_last_round and self.round == first_round + symbolic_vm.transaction_count:
+                # Another plugin pruned paths in this round, so its open states are incomplete
+                return
+            if time_handler.time_remaining() <= 0:
+                # The round was cut short, so its open states are not a valid starting point
+                log.info("Execution timed out during round %d, no further checkpoints", self.round)
+                self.store = None
+                return
+            save(self.store, self.round)
+
+        start_time = time.time()
+        first_round = self.round
+
+        @symbolic_vm.laser_hook("start_sym_exec")
+        def install_hooks():
+            nonlocal start_time
+            start_time = time.time()
+            # Every other plugin has registered its hooks by now, so these run after theirs:
+            # restoring after their start_sym_exec resets and saving after their per-round bookkeeping.
+            # Hooks appended here still run in the current start_sym_exec pass.
+            if checkpoint is not None:
+                symbolic_vm.register_laser_hooks("start_sym_exec", restore_hook)
+            if self.creation_store is not None:
+                symbolic_vm.register_laser_hooks("execute_state", execute_state_hook)
+                # The creation snapshot has to be taken before any plugin reacts to the first message call
+                symbolic_vm._start_sym_trans_hooks.insert(0, save_creation_hook)
+            symbolic_vm.register_laser_hooks("start_sym_trans", start_sym_trans_hook)
+            symbolic_vm.register_laser_hooks("stop_sym_trans", stop_sym_trans_hook)
+
+    def snapshot_plugins(self):
+        snapshot = dict()
+        for name, plugin in LaserPluginLoader().laser_plugin_instances.items():
+            if name == CHECKPOINT_PLUGIN_NAME:
+                continue
+            snapshot[name] = dict()
+            for attr, value in vars(plugin).items():
+                try:
+                    snapshot[name][attr] = dumps(value)
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    log.debug("Not checkpointing %s.%s: %s", name, attr, e)
+        return snapshot
+
+    def restore_plugins(self, snapshot, symbolic_vm):
+        for name, plugin in LaserPluginLoader().laser_plugin_instances.items():
+            for attr, value in snapshot.get(name, {}).items():
+                setattr(plugin, attr, loads(value, symbolic_vm))
+
+def load_checkpoint_plugin(store=None, creation_store=None, resume=None, save_last_round=True):
+    """
+    Registers the checkpoint plugin with the laser plugin loader and sets its arguments for the next run
+    :param store: CheckpointStore to save transaction round checkpoints to, or None
+    :param creation_store: CheckpointStore to save the post-creation states to, or None
+    :param resume: Pickled checkpoint to resume from, as read by CheckpointStore.fetch, or None to start from contract creation
+    :param save_last_round: Whether to checkpoint the last transaction round of the run
+    """
+    plugin_loader = LaserPluginLoader()
+    if CHECKPOINT_PLUGIN_NAME not in plugin_loader.laser_plugin_builders:
+        plugin_loader.load(CheckpointPluginBuilder())
+    plugin_loader.add_args(CHECKPOINT_PLUGIN_NAME, store=store, creation_store=creation_store,
+                           resume=resume, save_last_round=save_last_round)
@@ -0,0 +1,150 @@
+"""
+Compressed request and response bodies.
+
+Requests may send a gzip or zstd `Content-Encoding` body, which is decompressed before Flask sees it,
+up to MAX_REQUEST_SIZE bytes so a small compressed body cannot expand without bound. Responses are
+compressed with the best encoding the client accepts, including streamed status responses.
+Server-sent event streams are left alone so every event is delivered as soon as it is sent.
+"""
+import gzip
+import io
+import json
+import os
+import zlib
+
+from flask import request
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import get_input_stream
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Largest decompressed request body accepted
+MAX_REQUEST_SIZE = int(os.environ.get("SOLBOLT_MAX_REQUEST_SIZE", str(50 * 1024 * 1024)))
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.environ.get("SOLBOLT_COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("SOLBOLT_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.environ.get("SOLBOLT_ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+CHUNK_SIZE = 64 * 1024
+
+def encodings():
+    """
+    :return: Supported encodings, in order of preference
+    """
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+class RequestTooLarge(Exception):
+    pass
+
+def decompress(stream, encoding, limit=MAX_REQUEST_SIZE):
+    """
+    :param stream: Readable binary stream of the compressed body
+    :param encoding: "gzip" or "zstd"
+    :param limit: Largest decompressed size accepted
+    :return: The decompressed bytes
+    """
+    if encoding == "gzip":
+        reader = gzip.GzipFile(fileobj=stream, mode="rb")
+    else:
+        reader = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+
+    out = io.BytesIO()
+    with reader:
+        while True:
+            chunk = reader.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if out.tell() + len(chunk) > limit:
+                raise RequestTooLarge()
+            out.write(chunk)
+    return out.getvalue()
+
+def error_response(status, message):
+    return Response(json.dumps({"message": message}), status=status, mimetype="application/json")
+
+class DecompressionMiddleware:
+    """
+    WSGI middleware replacing a compressed request body with its decompressed content
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if encoding in ("", "identity"):
+            return self.app(environ, start_response)
+
+        if encoding not in encodings():
+            response = error_response(415, f"Unsupported Content-Encoding '{encoding}', use one of {', '.join(encodings())}")
+            return response(environ, start_response)
+
+        try:
+            body = decompress(get_input_stream(environ), encoding, MAX_REQUEST_SIZE)
+        except RequestTooLarge:
+            response = error_response(413, f"Request body is larger than {MAX_REQUEST_SIZE} bytes once decompressed")
+            return response(environ, start_response)
+        except (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ()):
+            response = error_response(400, f"Request body is not valid {encoding}")
+            return response(environ, start_response)
+
+        environ = dict(environ)
+        del environ["HTTP_CONTENT_ENCODING"]
+        environ["CONTENT_LENGTH"] = str(len(body))
+        environ["wsgi.input"] = io.BytesIO(body)
+        environ.pop("wsgi.input_terminated", None)
+        return self.app(environ, start_response)
+
+def compressor(encoding):
+    """
+    :return: Object with compress() and flush() methods for the encoding
+    """
+    if encoding == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+def compress_stream(chunks, encoding):
+    c = compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf8")
+        data = c.compress(chunk)
+        if data:
+            yield data
+    yield c.flush()
+
+def compress_response(response):
+    """
+    Flask after_request hook compressing the response with the encoding negotiated from Accept-Encoding
+    """
+    response.vary.add("Accept-Encoding")
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or request.method == "HEAD"):
+        return response
+
+    encoding = request.accept_encodings.best_match(encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        c = compressor(encoding)
+        response.set_data(c.compress(data) + c.flush())
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+def init_app(app):
+    app.wsgi_app = DecompressionMiddleware(app.wsgi_app)
+    app.after_request(compress_response)
@@ -0,0 +1,120 @@
+"""
+Local JSON-RPC stand-in for the on-chain data path, so symbolic execution with
+enable_onchain can run without Infura. Serves code, storage and balances from a
+fixture file of the form:
+
+    {
+      "blockNumber": 15000000,
+      "accounts": {
+        "0x...": {"code": "0x...", "balance": "0x0", "storage": {"0x0": "0x..."}}
+      }
+    }
+
+Run with `python -m solbolt.devnode fixture.json --port 8545` and point the
+worker at it with SOLBOLT_RPC=localhost:8545.
+"""
+import argparse
+import json
+import logging
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .onchain import EMPTY_SLOT, normalize_address
+
+log = logging.getLogger(__name__)
+
+class DevNode:
+    def __init__(self, fixture, batch=True) -> None:
+        """
+        :param batch: Whether to answer JSON-RPC batch requests, some providers reject them
+        """
+        self.batch = batch
+        self.block_number = int(fixture.get("blockNumber", 1))
+        self.accounts = dict()
+        for address, account in fixture.get("accounts", {}).items():
+            self.accounts[normalize_address(address)] = {
+                "code": account.get("code", "0x"),
+                "balance": account.get("balance", "0x0"),
+                "storage": {int(k, 16): v for k, v in account.get("storage", {}).items()},
+            }
+        self.calls = Counter()
+
+    def handle(self, method, params):
+        self.calls[method] += 1
+
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method in ("eth_chainId", "net_version"):
+            return "0x1" if method == "eth_chainId" else "1"
+
+        account = self.accounts.get(normalize_address(params[0]), {})
+        if method == "eth_getCode":
+            return account.get("code", "0x")
+        if method == "eth_getBalance":
+            return account.get("balance", "0x0")
+        if method == "eth_getStorageAt":
+            return account.get("storage", {}).get(int(params[1], 16), EMPTY_SLOT)
+
+        raise NotImplementedError(method)
+
+    def respond(self, request):
+        try:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": self.handle(request["method"], request.get("params", []))}
+        except NotImplementedError:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        except (KeyError, IndexError, ValueError) as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32602, "message": f"Invalid params: {e}"}}
+
+def make_handler(node):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                request = json.loads(body)
+            except ValueError:
+                self.send_error(400, "Invalid JSON")
+                return
+
+            if isinstance(request, list) and not node.batch:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Batch requests are not supported"}}
+            elif isinstance(request, list):
+                response = [node.respond(item) for item in request]
+            else:
+                response = node.respond(request)
+
+            payload = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            log.debug(format, *args)
+
+    return Handler
+
+def serve(fixture_path, host="localhost", port=8545, batch=True):
+    with open(fixture_path) as f:
+        node = DevNode(json.load(f), batch)
+
+    server = ThreadingHTTPServer((host, port), make_handler(node))
+    log.info("Serving %d accounts at block %d on %s:%d", len(node.accounts), node.block_number, host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        log.info("RPC calls served: %s", dict(node.calls))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve on-chain fixture data over JSON-RPC')
+    parser.add_argument('fixture', help='JSON file with the accounts to serve')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--no-batch', action='store_true', help='Reject batch requests like some hosted providers')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.fixture, args.host, args.port, not args.no_batch)
@@ -0,0 +1,178 @@
+"""
+Etherscan API client for the evaluation scripts.
+
+Requests share one pooled session and a token bucket kept in SQLite, so every process on the host
+together stays under the API rate limit. Responses are cached on disk. In replay mode requests are
+only answered from the cache, which makes evaluations repeatable offline.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import cache_path
+
+log = logging.getLogger(__name__)
+
+API_ENDPOINT = "https://api.etherscan.io/api"
+
+# live: no cache. cache: read through the cache. record: refetch everything and update the cache.
+# replay: answer from the cache only, never touching the network.
+MODES = ("live", "cache", "record", "replay")
+DEFAULT_MODE = os.environ.get("SOLBOLT_ETHERSCAN_MODE", "cache")
+# Requests per second allowed by the API key, shared by every process using the same store
+RATE = float(os.environ.get("SOLBOLT_ETHERSCAN_RATE", "5"))
+# Cached responses older than this many seconds are refetched, 0 to keep them forever
+MAX_AGE = int(os.environ.get("SOLBOLT_ETHERSCAN_MAX_AGE", "0"))
+
+MAX_RATE_LIMIT_RETRIES = 5
+POOL_SIZE = 4
+
+class EtherscanError(Exception):
+    pass
+
+class EtherscanReplayError(EtherscanError):
+    """
+    Raised in replay mode for a request that was never recorded
+    """
+    pass
+
+class EtherscanStore:
+    """
+    Persistent cache of Etherscan responses, plus the shared rate limiter state
+    """
+    def __init__(self, path=None) -> None:
+        self.path = path or cache_path("etherscan.sqlite")
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                key TEXT PRIMARY KEY,
+                                body TEXT NOT NULL,
+                                fetched_at REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS buckets (
+                                name TEXT PRIMARY KEY,
+                                tokens REAL NOT NULL,
+                                updated REAL NOT NULL)""")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, max_age=0):
+        row = self._connection().execute("SELECT body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (max_age > 0 and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, body):
+        self._connection().execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, json.dumps(body), time.time()))
+
+    def take_token(self, name, rate, burst):
+        """
+        Takes a token from a bucket refilled at rate tokens per second
+        :return: Seconds to wait before a token is available, 0 if one was taken
+        """
+        conn = self._connection()
+        now = time.time()
+        # Serialises the read-modify-write between processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0, now - row[1]) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if wait == 0:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+class EtherscanClient:
+    def __init__(self, api_key, mode=DEFAULT_MODE, store=None, rate=RATE, max_age=MAX_AGE, endpoint=API_ENDPOINT) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown Etherscan mode {mode}, use one of {', '.join(MODES)}")
+        self.api_key = api_key
+        self.mode = mode
+        # Live mode still keeps the rate limiter state in the store
+        self.store = store if store is not None else EtherscanStore()
+        self.rate = rate
+        self.max_age = max_age
+        self.endpoint = endpoint
+
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=1, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(params):
+        return json.dumps(params, sort_keys=True)
+
+    def wait_for_token(self):
+        while True:
+            wait = self.store.take_token(self.api_key or "", self.rate, max(1, self.rate))
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    def fetch(self, params):
+        for attempt in range(MAX_RATE_LIMIT_RETRIES):
+            self.wait_for_token()
+            response = self.session.get(self.endpoint, params={**params, "apikey": self.api_key}, timeout=60)
+            if response.status_code != 200:
+                raise EtherscanError(f"Etherscan returned HTTP {response.status_code}")
+            body = response.json()
+            if body.get("status") == "0" and "rate limit" in str(body.get("result", "")).lower():
+                # Another client shares the key, back off and try again
+                time.sleep(2 ** attempt)
+                continue
+            return body
+        raise EtherscanError("Etherscan rate limit still reached after retries")
+
+    @staticmethod
+    def cacheable(body):
+        # Errors other than empty results, e.g. an invalid API key, are worth retrying later
+        return body.get("status") == "1" or body.get("message", "").startswith("No ")
+
+    def get(self, **params):
+        """
+        :param params: Query parameters, without the API key
+        :return: Decoded JSON response
+        """
+        key = self.cache_key(params)
+        if self.mode in ("cache", "replay"):
+            body = self.store.get(key, self.max_age if self.mode == "cache" else 0)
+            if body is not None:
+                self.hits += 1
+                return body
+            if self.mode == "replay":
+                raise EtherscanReplayError(f"No recorded response for {key}")
+
+        self.misses += 1
+        body = self.fetch(params)
+        if self.mode != "live" and self.cacheable(body):
+            self.store.put(key, body)
+        return body
+
+    def get_source_code(self, address):
+        return self.get(module="contract", action="getsourcecode", address=address)
+
+    def get_transactions(self, address, page, offset=1000):
+        return self.get(module="account", action="txlist", address=address, startblock=0, endblock=99999999,
+                        page=page, offset=offset, sort="desc")
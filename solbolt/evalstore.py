@@ -0,0 +1,215 @@
+"""
+SQLite store for evaluation results.
+
+The summary of each evaluated contract is split into columns and per-function and per-gas-class
+tables, so the result parsers run a single query instead of reading every result. The complete
+result, with the bulky symexec output, is kept compressed on the side and only read when needed.
+
+The outputs of the expensive pipeline stages (compile, symexec) are cached by a hash of their
+inputs, so rerunning an evaluation with a different sampling only repeats the final stage.
+"""
+import ast
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+RESULTS_PATH = os.environ.get("SOLBOLT_EVAL_RESULTS", os.path.join("eval", "results.sqlite"))
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS results (
+        prefix TEXT NOT NULL,
+        address TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        error TEXT,
+        accuracy_sum REAL,
+        accuracy_mean REAL,
+        accuracy_median REAL,
+        accuracy_count INTEGER,
+        cov_percentage REAL,
+        updated REAL NOT NULL,
+        PRIMARY KEY (prefix, address))""",
+    """CREATE TABLE IF NOT EXISTS functions (
+        prefix TEXT NOT NULL,
+        address TEXT NOT NULL,
+        selector TEXT NOT NULL,
+        accuracy_sum REAL NOT NULL,
+        accuracy_mean REAL NOT NULL,
+        accuracy_median REAL NOT NULL,
+        accuracy_count INTEGER NOT NULL,
+        PRIMARY KEY (prefix, address, selector))""",
+    """CREATE TABLE IF NOT EXISTS gas_classes (
+        prefix TEXT NOT NULL,
+        address TEXT NOT NULL,
+        gas_class INTEGER NOT NULL,
+        accuracy_sum REAL NOT NULL,
+        accuracy_mean REAL NOT NULL,
+        accuracy_median REAL NOT NULL,
+        accuracy_count INTEGER NOT NULL,
+        PRIMARY KEY (prefix, address, gas_class))""",
+    """CREATE TABLE IF NOT EXISTS details (
+        prefix TEXT NOT NULL,
+        address TEXT NOT NULL,
+        output BLOB NOT NULL,
+        PRIMARY KEY (prefix, address))""",
+    """CREATE TABLE IF NOT EXISTS contract_versions (
+        address TEXT PRIMARY KEY,
+        compiler TEXT NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS sources (
+        name TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS stages (
+        stage TEXT NOT NULL,
+        key TEXT NOT NULL,
+        output BLOB NOT NULL,
+        created REAL NOT NULL,
+        PRIMARY KEY (stage, key))""",
+    "CREATE INDEX IF NOT EXISTS results_status ON results (prefix, status)",
+)
+
+# Rows inserted per statement while building the version index
+VERSION_BATCH = 10000
+
+def summary_columns(summary):
+    return (summary["sum"], summary["mean"], summary["median"], summary["count"])
+
+class EvalStore:
+    def __init__(self, path=RESULTS_PATH) -> None:
+        self.path = path
+        self._conn = None
+        self._pid = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        # Evaluation workers are forked, and a connection must not be shared with the parent
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._conn
+
+    def put(self, address, output, prefix=None):
+        """
+        :param output: Evaluation output, {"status": 1, "result": ...} or {"status": 0, "result": "<error>", ...}
+        :param prefix: Evaluation run the result belongs to, None for the main one
+        """
+        prefix = prefix or ""
+        key = (prefix, address)
+        result = output["result"]
+
+        with self._connection() as conn:
+            for table in ("results", "functions", "gas_classes", "details"):
+                conn.execute(f"DELETE FROM {table} WHERE prefix = ? AND address = ?", key)
+
+            if output["status"] == 1:
+                conn.execute("INSERT INTO results VALUES (?, ?, 1, NULL, ?, ?, ?, ?, ?, ?)",
+                             (*key, *summary_columns(result["summary"]),
+                              result["symexec_result"].get("cov_percentage"), time.time()))
+                conn.executemany("INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 [(*key, selector, *summary_columns(summary)) for selector, summary in result["functions"].items()])
+                conn.executemany("INSERT INTO gas_classes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 [(*key, int(gas_class), *summary_columns(summary)) for gas_class, summary in result["gas_class"].items()])
+            else:
+                conn.execute("INSERT INTO results VALUES (?, ?, ?, ?, NULL, NULL, NULL, NULL, NULL, ?)",
+                             (*key, output["status"], str(result), time.time()))
+
+            conn.execute("INSERT INTO details VALUES (?, ?, ?)", (*key, zlib.compress(json.dumps(output).encode("utf8"))))
+
+    def get(self, address, prefix=None):
+        """
+        :return: The complete evaluation output, or None if the contract was not evaluated
+        """
+        row = self._connection().execute("SELECT output FROM details WHERE prefix = ? AND address = ?",
+                                         (prefix or "", address)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def status(self, address, prefix=None):
+        row = self._connection().execute("SELECT status FROM results WHERE prefix = ? AND address = ?",
+                                         (prefix or "", address)).fetchone()
+        return row[0] if row else None
+
+    def query(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchall()
+
+    @staticmethod
+    def stage_key(inputs):
+        """
+        :param inputs: JSON serialisable inputs of a stage
+        :return: Key of the stage output, the same for equal inputs
+        """
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode("utf8")).hexdigest()
+
+    def get_stage(self, stage, key):
+        """
+        :return: The cached output of the stage for the key, or None
+        """
+        row = self._connection().execute("SELECT output FROM stages WHERE stage = ? AND key = ?", (stage, key)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def put_stage(self, stage, key, output):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)",
+                         (stage, key, zlib.compress(json.dumps(output).encode("utf8")), time.time()))
+
+    def versions_current(self, source):
+        """
+        :param source: Path of the contracts index the version index was built from
+        :return: Whether the version index matches the current contents of the source
+        """
+        stat = os.stat(source)
+        row = self._connection().execute("SELECT size, mtime FROM sources WHERE name = ?", ("contract_versions",)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    @contextmanager
+    def rebuilding_versions(self, source):
+        """
+        Replaces the address to compiler version index, in one transaction
+        :param source: Path of the contracts index the rows come from
+        :return: Context yielding a function add(address, compiler)
+        """
+        stat = os.stat(source)
+        batch = list()
+        with self._connection() as conn:
+            conn.execute("DELETE FROM contract_versions")
+
+            def add(address, compiler):
+                batch.append((address, compiler))
+                if len(batch) >= VERSION_BATCH:
+                    conn.executemany("INSERT OR REPLACE INTO contract_versions VALUES (?, ?)", batch)
+                    batch.clear()
+
+            yield add
+            conn.executemany("INSERT OR REPLACE INTO contract_versions VALUES (?, ?)", batch)
+            conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", ("contract_versions", stat.st_size, stat.st_mtime))
+
+    def import_directory(self, directory):
+        """
+        Imports result files written as str(dict) by earlier versions of eval.py. Files directly in
+        the directory belong to the main run, files in a subdirectory to the run named after it.
+        :return: Number of results imported
+        """
+        imported = 0
+        for root, _, filenames in os.walk(directory):
+            relative = os.path.relpath(root, directory)
+            prefix = None if relative == "." else relative
+            for filename in sorted(filenames):
+                if not filename.endswith(".txt"):
+                    continue
+                try:
+                    with open(os.path.join(root, filename)) as f:
+                        output = ast.literal_eval(f.read())
+                    self.put(filename[:-4], output, prefix)
+                    imported += 1
+                except (ValueError, SyntaxError, KeyError, TypeError) as e:
+                    log.warning("Could not import %s: %s", os.path.join(root, filename), e)
+        return imported
@@ -0,0 +1,169 @@
+"""
+Task state notifications for server-sent event streams.
+
+Workers publish every state transition of a task on a Redis channel of its own. The API subscribes
+to the channels of the tasks a client is waiting for and forwards the transitions, ending with
+the result, so clients no longer have to poll. They also record the last state of each task in a
+small key of its own, so task states can be read without fetching the results.
+"""
+import json
+import logging
+import os
+import time
+
+import redis
+from flask import Response, stream_with_context
+from celery.signals import task_postrun, task_prerun, task_revoked
+
+from .blobs import load_result
+
+log = logging.getLogger(__name__)
+
+EVENTS_URL = os.environ.get("SOLBOLT_EVENTS_URL", os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379"))
+# Streams end after this many seconds even if tasks are still running, clients may reconnect
+STREAM_TIMEOUT = int(os.environ.get("SOLBOLT_STREAM_TIMEOUT", "600"))
+KEEPALIVE_INTERVAL = 15
+# Fallback poll interval when the result backend is not Redis
+POLL_INTERVAL = 1.0
+MAX_STREAM_TASKS = 100
+# Lifetime of the recorded task states, Celery's default result_expires
+STATE_TTL = int(os.environ.get("SOLBOLT_STATE_TTL", str(24 * 60 * 60)))
+
+FINISHED_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+_client = None
+
+def events_enabled():
+    return EVENTS_URL.startswith(("redis://", "rediss://", "unix://"))
+
+def client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(EVENTS_URL)
+    return _client
+
+def channel(task_id):
+    return f"solbolt:task:{task_id}"
+
+def state_key(task_id):
+    return f"solbolt:state:{task_id}"
+
+def publish(task_id, status, result=None):
+    if not events_enabled():
+        return
+    message = {"task_id": task_id, "task_status": status}
+    if status in FINISHED_STATES:
+        message["task_result"] = result
+    try:
+        pipeline = client().pipeline(transaction=False)
+        pipeline.set(state_key(task_id), status, ex=STATE_TTL)
+        pipeline.publish(channel(task_id), json.dumps(message, default=str))
+        pipeline.execute()
+    except redis.RedisError as e:
+        log.warning("Could not publish state of task %s: %s", task_id, e)
+
+def read_states(task_ids):
+    """
+    :return: Last state the workers recorded for each task, None for tasks without one
+    """
+    if not events_enabled():
+        return [None] * len(task_ids)
+    try:
+        values = client().mget([state_key(task_id) for task_id in task_ids])
+    except redis.RedisError as e:
+        log.warning("Could not read task states: %s", e)
+        return [None] * len(task_ids)
+    return [value.decode() if value is not None else None for value in values]
+
+@task_prerun.connect
+def publish_started(task_id=None, **kwargs):
+    publish(task_id, "STARTED")
+
+@task_postrun.connect
+def publish_finished(task_id=None, retval=None, state=None, **kwargs):
+    publish(task_id, state or "SUCCESS", retval if state == "SUCCESS" else str(retval))
+
+@task_revoked.connect
+def publish_revoked(request=None, **kwargs):
+    # Running tasks that are terminated never reach task_postrun
+    publish(request.id, "REVOKED")
+
+def format_event(event, data):
+    if "task_result" in data:
+        # Offloaded results are only sent once, so inline them
+        data = {**data, "task_result": load_result(data["task_result"])}
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def status_of(async_result):
+    status = async_result.status
+    message = {"task_id": async_result.id, "task_status": status}
+    if status in FINISHED_STATES:
+        message["task_result"] = async_result.result if status == "SUCCESS" else str(async_result.result)
+    return message
+
+def stream(celery, task_ids):
+    """
+    Generates the server-sent events for a set of tasks: a `status` event per state transition and
+    a `result` event with the final state of each task, then `end` once all of them finished
+    :param celery: Celery app, used to read the state of tasks that finished before subscribing
+    :param task_ids: Task ids to follow
+    """
+    pending = set(task_ids)
+    pubsub = None
+
+    if events_enabled():
+        # Subscribe before reading the current state, so no transition is missed in between
+        pubsub = client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*[channel(task_id) for task_id in pending])
+
+    try:
+        for task_id in list(pending):
+            message = status_of(celery.AsyncResult(task_id))
+            if message["task_status"] in FINISHED_STATES:
+                pending.discard(task_id)
+                yield format_event("result", message)
+            else:
+                yield format_event("status", message)
+
+        start = time.monotonic()
+        last_sent = start
+        while len(pending) > 0 and time.monotonic() - start < STREAM_TIMEOUT:
+            if pubsub is not None:
+                messages = list()
+                item = pubsub.get_message(timeout=1.0)
+                if item is not None and item["type"] == "message":
+                    messages.append(json.loads(item["data"]))
+            else:
+                time.sleep(POLL_INTERVAL)
+                messages = [status_of(celery.AsyncResult(task_id)) for task_id in pending]
+                messages = [message for message in messages if message["task_status"] in FINISHED_STATES]
+
+            for message in messages:
+                if message["task_id"] not in pending:
+                    continue
+                if message["task_status"] in FINISHED_STATES:
+                    pending.discard(message["task_id"])
+                    yield format_event("result", message)
+                else:
+                    yield format_event("status", message)
+                last_sent = time.monotonic()
+
+            if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+
+        yield format_event("end", {"pending": sorted(pending)})
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+def stream_response(celery, task_ids):
+    """
+    :return: Flask response streaming the events of the given tasks
+    """
+    headers = {
+        "Cache-Control": "no-cache",
+        # Stops nginx from buffering the stream
+        "X-Accel-Buffering": "no",
+    }
+    return Response(stream_with_context(stream(celery, task_ids)), mimetype="text/event-stream", headers=headers)
@@ -0,0 +1,455 @@
+import hashlib
+import json
+import logging
+import os
+import re
+
+from mythril.laser.plugin.builder import PluginBuilder
+from mythril.laser.plugin.interface import LaserPlugin
+from mythril.laser.plugin.loader import LaserPluginLoader
+from mythril.laser.plugin.signals import PluginSkipState
+
+from .cache import cache_path
+
+log = logging.getLogger(__name__)
+
+INCREMENTAL_PLUGIN_NAME = "solbolt-incremental"
+
+# Bump whenever the stored layout changes so stale entries are never reused
+INCREMENTAL_FORMAT = 1
+
+OPCODE_JUMPDEST = 0x5b
+OPCODE_PUSH1 = 0x60
+OPCODE_PUSH4 = 0x63
+OPCODE_PUSH32 = 0x7f
+OPCODE_EQ = 0x14
+OPCODE_JUMPI = 0x57
+
+# Pushes up to this size that hit a JUMPDEST are treated as code addresses, which move whenever other code changes
+MAX_JUMP_PUSH_SIZE = 4
+
+LINK_PLACEHOLDER = re.compile(r"__.{36}__")
+SELECTOR_KEY = re.compile(r"^0x([0-9a-fA-F]{8})")
+
+def parse_instructions(bytecode):
+    """
+    :param bytecode: Hex encoded bytecode, possibly with library link placeholders
+    :return: List of (address, opcode, push argument or None)
+    """
+    bytecode = bytecode[2:] if bytecode.startswith("0x") else bytecode
+    code = bytes.fromhex(LINK_PLACEHOLDER.sub("0" * 40, bytecode))
+
+    instructions = list()
+    i = 0
+    while i < len(code):
+        opcode = code[i]
+        if OPCODE_PUSH1 <= opcode <= OPCODE_PUSH32:
+            end = i + 1 + opcode - OPCODE_PUSH1 + 1
+            instructions.append((i, opcode, code[i + 1:end]))
+            i = end
+        else:
+            instructions.append((i, opcode, None))
+            i += 1
+    return instructions
+
+def decode_source_map(source_map, length):
+    """
+    Expands a compressed solc source map
+    :param source_map: Compressed source map
+    :param length: Number of instructions
+    :return: List of (start, length, file index) per instruction
+    """
+    entries = list()
+    start, size, file_index = -1, -1, -1
+    for item in source_map.split(";"):
+        fields = item.split(":")
+        if len(fields) > 0 and fields[0] != "":
+            start = int(fields[0])
+        if len(fields) > 1 and fields[1] != "":
+            size = int(fields[1])
+        if len(fields) > 2 and fields[2] != "":
+            file_index = int(fields[2])
+        entries.append((start, size, file_index))
+
+    entries.extend([(-1, -1, -1)] * (length - len(entries)))
+    return entries[:length]
+
+def source_ranges(bytecode, source_map, addresses):
+    """
+    :param bytecode: Hex encoded bytecode the source map belongs to
+    :param source_map: Compressed solc source map
+    :param addresses: Instruction addresses to look up, as ints or strings
+    :return: Dict of each address with a source range to [start, length, file index]
+    """
+    instructions = parse_instructions(bytecode)
+    ranges = {address: [start, size, file_index]
+                for (address, _, _), (start, size, file_index) in zip(instructions, decode_source_map(source_map, len(instructions)))
+                if file_index >= 0}
+    return {key: ranges[address] for key, address in ((key, _address_key(key)) for key in addresses) if address in ranges}
+
+def parse_src(src):
+    start, size, file_index = (int(field) for field in src.split(":"))
+    return start, size, file_index
+
+def walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value)
+
+def dispatch_entries(instructions):
+    """
+    Finds the entry point of every external function from the dispatcher, which compares the selector
+    with a PUSH4 and jumps to the function with EQ, PUSH and JUMPI shortly after
+    :return: Dict of selector hex to entry address
+    """
+    entries = dict()
+    for i, (_, opcode, arg) in enumerate(instructions):
+        if opcode != OPCODE_PUSH4:
+            continue
+        window = instructions[i + 1:i + 5]
+        for j, (_, next_opcode, _) in enumerate(window[:-2]):
+            if next_opcode != OPCODE_EQ:
+                continue
+            push = window[j + 1]
+            if OPCODE_PUSH1 <= push[1] <= OPCODE_PUSH32 and window[j + 2][1] == OPCODE_JUMPI:
+                entries.setdefault(arg.hex(), int.from_bytes(push[2], "big"))
+            break
+    return entries
+
+class ContractIndex:
+    """
+    Splits a compiled contract into per-function fingerprints. A function's region is every runtime
+    instruction whose source map points into the function, its modifiers or the functions it calls,
+    and its storage dependencies are the state variables referenced from that same closure.
+    """
+    def __init__(self, compiled_json, solidity_files, contract_name) -> None:
+        self.contract_name = contract_name
+        self.functions = dict()
+        self.salt = None
+
+        contract_file, contract_output = self._find_contract(compiled_json, contract_name)
+        evm = contract_output["evm"]
+
+        self.instructions = parse_instructions(evm["deployedBytecode"]["object"])
+        self.source_map = decode_source_map(evm["deployedBytecode"].get("sourceMap", ""), len(self.instructions))
+        self.jumpdests = {address for address, opcode, _ in self.instructions if opcode == OPCODE_JUMPDEST}
+
+        self.contents = {file["name"]: file["content"].encode("utf8") for file in solidity_files}
+        self.file_names = {source["id"]: name for name, source in compiled_json.get("sources", {}).items()}
+
+        self.nodes = dict()
+        for source in compiled_json.get("sources", {}).values():
+            for node in walk(source.get("ast", {})):
+                if "nodeType" in node and "id" in node:
+                    self.nodes[node["id"]] = node
+
+        contract_node = self._find_contract_node(compiled_json, contract_file, contract_name)
+        if contract_node is None:
+            log.info("No compact AST for %s, incremental reuse disabled", contract_name)
+            return
+
+        bases = [self.nodes[base_id] for base_id in contract_node.get("linearizedBaseContracts", [contract_node["id"]])
+                    if base_id in self.nodes]
+        members = [member for base in bases for member in base.get("nodes", [])]
+        entries = dispatch_entries(self.instructions)
+
+        for signature, selector in evm.get("methodIdentifiers", {}).items():
+            node = self._find_function_node(members, signature, selector)
+            self.functions[selector] = self._index_function(signature, selector, node, members, entries.get(selector))
+
+        # Anything outside the external functions that affects every run: layout, constructor, fallback and compiler
+        layout = [[base.get("name"), member.get("name"), member.get("typeDescriptions", {}).get("typeString")]
+                    for base in reversed(bases) for member in base.get("nodes", [])
+                    if member.get("nodeType") == "VariableDeclaration" and member.get("stateVariable")]
+        special = [member for member in members if member.get("nodeType") == "FunctionDefinition"
+                    and (member.get("kind") in ("constructor", "fallback", "receive") or member.get("isConstructor")
+                         or (member.get("name") == "" and member.get("kind") is None))]
+        special_texts, _ = self._closure_texts(special, members)
+
+        try:
+            compiler = json.loads(contract_output.get("metadata", "{}"))
+            compiler = [compiler.get("compiler"), compiler.get("settings", {}).get("optimizer"), compiler.get("settings", {}).get("evmVersion")]
+        except ValueError:
+            compiler = None
+
+        self.salt = hashlib.sha256(json.dumps([INCREMENTAL_FORMAT, contract_name, layout, special_texts, compiler],
+                                              sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _find_contract(compiled_json, contract_name):
+        for file, contracts in compiled_json.get("contracts", {}).items():
+            if contract_name in contracts:
+                return file, contracts[contract_name]
+        raise KeyError(contract_name)
+
+    def _find_contract_node(self, compiled_json, contract_file, contract_name):
+        ast = compiled_json.get("sources", {}).get(contract_file, {}).get("ast", {})
+        for node in walk(ast):
+            if node.get("nodeType") == "ContractDefinition" and node.get("name") == contract_name:
+                return node
+        return None
+
+    @staticmethod
+    def _find_function_node(members, signature, selector):
+        for member in members:
+            if member.get("functionSelector") == selector:
+                return member
+
+        # Older compilers do not annotate selectors, so fall back to name and arity
+        name, params = signature[:-1].split("(", 1)
+        depth, arity = 0, 1 if params else 0
+        for char in params:
+            depth += char == "("
+            depth -= char == ")"
+            arity += char == "," and depth == 0
+
+        for member in members:
+            if member.get("name") != name:
+                continue
+            if member.get("nodeType") == "FunctionDefinition":
+                if len(member.get("parameters", {}).get("parameters", [])) == arity:
+                    return member
+            elif member.get("nodeType") == "VariableDeclaration" and member.get("stateVariable"):
+                return member
+        return None
+
+    def _closure(self, roots, members):
+        closure = dict()
+        state_vars = set()
+        pending = list(roots)
+        while len(pending) > 0:
+            node = pending.pop()
+            if node["id"] in closure:
+                continue
+            closure[node["id"]] = node
+
+            for child in walk(node):
+                target = self.nodes.get(child.get("referencedDeclaration"))
+                if target is None:
+                    continue
+                if target.get("nodeType") in ("FunctionDefinition", "ModifierDefinition"):
+                    # Virtual calls may land on any override in the hierarchy
+                    pending.append(target)
+                    pending.extend(member for member in members if member.get("name") == target.get("name")
+                                   and member.get("nodeType") == target.get("nodeType"))
+                elif target.get("nodeType") == "VariableDeclaration" and target.get("stateVariable"):
+                    state_vars.add(f"{target.get('name')}:{target.get('typeDescriptions', {}).get('typeString')}")
+        return closure, state_vars
+
+    def _closure_texts(self, roots, members):
+        closure, state_vars = self._closure(roots, members)
+        texts = list()
+        for node in closure.values():
+            start, size, file_index = parse_src(node["src"])
+            content = self.contents.get(self.file_names.get(file_index), b"")
+            texts.append(content[start:start + size].decode("utf8", errors="replace"))
+        return sorted(texts), state_vars
+
+    def _index_function(self, signature, selector, node, members, entry):
+        if node is None:
+            return {"signature": signature, "fingerprint": None, "state_vars": None, "region": [], "entry": entry}
+
+        closure, state_vars = self._closure([node], members)
+        ranges = [parse_src(closure_node["src"]) for closure_node in closure.values()]
+
+        region = list()
+        masked = list()
+        for (address, opcode, arg), (start, size, file_index) in zip(self.instructions, self.source_map):
+            if file_index < 0 or not any(file_index == r_file and r_start <= start and start + size <= r_start + r_size
+                                         for r_start, r_size, r_file in ranges):
+                continue
+            region.append(address)
+            if arg is not None and len(arg) <= MAX_JUMP_PUSH_SIZE and int.from_bytes(arg, "big") in self.jumpdests:
+                masked.append(f"{opcode:02x}:J")
+            else:
+                masked.append(f"{opcode:02x}:{arg.hex() if arg is not None else ''}")
+
+        texts, _ = self._closure_texts([node], members)
+        fingerprint = hashlib.sha256(json.dumps([signature, masked, texts]).encode()).hexdigest()
+
+        return {
+            "signature": signature,
+            "fingerprint": fingerprint,
+            "state_vars": sorted(state_vars),
+            "region": region,
+            "entry": entry,
+        }
+
+    def exclusive_owner(self):
+        """
+        :return: Dict of instruction address to the selector of the only function whose region contains it
+        """
+        owners = dict()
+        for selector, function in self.functions.items():
+            for address in function["region"]:
+                owners[address] = selector if address not in owners else None
+        return {address: selector for address, selector in owners.items() if selector is not None}
+
+def incremental_key(contract_name, settings):
+    """
+    Identifies the runs whose per-function results may be reused: same contract name and settings
+    :return: Hex digest
+    """
+    key = {"format": INCREMENTAL_FORMAT, "name": contract_name, "settings": settings}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+class IncrementalStore:
+    """
+    Per-function results of the last run of a contract with given settings
+    """
+    def __init__(self, key) -> None:
+        self.path = cache_path("incremental", f"{key}.json")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, entry):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self.path)
+
+def plan_reuse(index, previous):
+    """
+    Picks the functions whose stored results are still valid: same fingerprint, and no state variable
+    shared with a function that has to be re-explored or was removed
+    :param index: ContractIndex of the current build
+    :param previous: Stored entry of the previous run, or None
+    :return: Set of reusable selectors
+    """
+    if previous is None or index.salt is None or previous.get("salt") != index.salt:
+        return set()
+
+    stored = previous["functions"]
+    candidates = {selector for selector, function in index.functions.items()
+                    if function["fingerprint"] is not None and selector in stored
+                    and stored[selector]["fingerprint"] == function["fingerprint"]
+                    and len(stored[selector]["region"]) == len(function["region"])}
+
+    changed = [function for selector, function in index.functions.items() if selector not in candidates]
+    changed += [function for selector, function in stored.items() if selector not in index.functions]
+
+    while True:
+        if any(function["state_vars"] is None for function in changed):
+            return set()
+        dirty_vars = {var for function in changed for var in function["state_vars"]}
+        conflicts = {selector for selector in candidates if dirty_vars.intersection(index.functions[selector]["state_vars"])}
+        if len(conflicts) == 0:
+            return candidates
+        candidates -= conflicts
+        changed += [index.functions[selector] for selector in conflicts]
+
+def _address_key(key):
+    try:
+        return int(key)
+    except (TypeError, ValueError):
+        return None
+
+def apply_reuse(result, index, previous, reused):
+    """
+    Replaces the results of reused functions with the stored ones, moving stored instruction
+    addresses to where the same instructions sit in the current build
+    :param result: Serialised symbolic execution result, updated in place
+    """
+    owners = index.exclusive_owner()
+
+    for selector in reused:
+        stored = previous["functions"][selector]
+        address_map = dict(zip(stored["region"], index.functions[selector]["region"]))
+        stored_results = stored["results"]
+
+        for key in [key for key in result["function_gas"] if _selector_of(key) == selector]:
+            del result["function_gas"][key]
+        result["function_gas"].update(stored_results["function_gas"])
+
+        for key in [key for key in result["detected_issues"] if _selector_of(key) == selector]:
+            del result["detected_issues"][key]
+        for key, issues in stored_results["detected_issues"].items():
+            result["detected_issues"][key] = sorted(set(result["detected_issues"].get(key, [])) | set(issues))
+
+        for key, items in result["loop_gas"].items():
+            for pc in [pc for pc in items if owners.get(_address_key(pc)) == selector]:
+                del items[pc]
+        for key, items in stored_results["loop_gas"].items():
+            loop_items = result["loop_gas"].setdefault(key, dict())
+            for pc, item in items.items():
+                if int(pc) in address_map:
+                    loop_items[address_map[int(pc)]] = item
+
+        for pc in [pc for pc in result["runtime"] if owners.get(_address_key(pc)) == selector]:
+            del result["runtime"][pc]
+        for pc, item in stored_results["runtime"].items():
+            if int(pc) in address_map:
+                result["runtime"][address_map[int(pc)]] = item
+
+def _selector_of(key):
+    m = SELECTOR_KEY.match(key) if isinstance(key, str) else None
+    return m.group(1).lower() if m else None
+
+def split_results(result, index):
+    """
+    Builds the entry to store for the next run: every function's fingerprint with the parts of
+    the result that belong to it alone
+    """
+    owners = index.exclusive_owner()
+    functions = dict()
+    for selector, function in index.functions.items():
+        functions[selector] = {
+            **function,
+            "results": {
+                "function_gas": {key: value for key, value in result["function_gas"].items() if _selector_of(key) == selector},
+                "detected_issues": {key: value for key, value in result["detected_issues"].items() if _selector_of(key) == selector},
+                "loop_gas": {key: {str(pc): item for pc, item in items.items() if owners.get(_address_key(pc)) == selector}
+                                for key, items in result["loop_gas"].items()},
+                "runtime": {str(pc): item for pc, item in result["runtime"].items() if owners.get(_address_key(pc)) == selector},
+            }
+        }
+    return {"salt": index.salt, "functions": functions}
+
+class IncrementalPluginBuilder(PluginBuilder):
+    name = INCREMENTAL_PLUGIN_NAME
+
+    def __call__(self, *args, **kwargs):
+        return IncrementalPlugin(**kwargs)
+
+class IncrementalPlugin(LaserPlugin):
+    """
+    Drops the paths that enter a reused function during the last transaction round. Earlier rounds
+    are explored in full because their end states are the starting point of the changed functions.
+    """
+    def __init__(self, skip_entries=()) -> None:
+        self.skip_entries = set(skip_entries)
+
+    def initialize(self, symbolic_vm):
+        if len(self.skip_entries) == 0:
+            return
+
+        rounds_started = 0
+
+        @symbolic_vm.laser_hook("start_sym_trans")
+        def start_sym_trans_hook():
+            nonlocal rounds_started
+            rounds_started += 1
+
+        @symbolic_vm.post_hook("JUMPI")
+        def jumpi_hook(global_state):
+            if rounds_started < symbolic_vm.transaction_count or len(global_state.transaction_stack) != 1:
+                return
+            if global_state.get_current_instruction()["address"] in self.skip_entries:
+                raise PluginSkipState
+
+def load_incremental_plugin(skip_entries=()):
+    """
+    Registers the incremental plugin with the laser plugin loader and sets the entries to skip in the next run
+    """
+    plugin_loader = LaserPluginLoader()
+    if INCREMENTAL_PLUGIN_NAME not in plugin_loader.laser_plugin_builders:
+        plugin_loader.load(IncrementalPluginBuilder())
+    plugin_loader.add_args(INCREMENTAL_PLUGIN_NAME, skip_entries=skip_entries)
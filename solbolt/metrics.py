@@ -0,0 +1,185 @@
+"""
+Prometheus metrics for the API and the Celery workers.
+
+The API serves /metrics, including the current queue length per task type read from the broker.
+Workers export their own metrics on SOLBOLT_WORKER_METRICS_PORT. Both gunicorn and the prefork
+worker pool run several processes, so set PROMETHEUS_MULTIPROC_DIR to a directory shared by the
+processes of one container to have their metrics aggregated.
+"""
+import json
+import logging
+import os
+import resource
+import time
+
+import redis
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+    worker_ready,
+)
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+log = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+WORKER_METRICS_PORT = int(os.environ.get("SOLBOLT_WORKER_METRICS_PORT", "0"))
+BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379")
+QUEUES = [queue for queue in os.environ.get("SOLBOLT_METRICS_QUEUES", "celery").split(",") if queue]
+# Messages inspected per scrape to split the queue length by task, the rest of the queue is assumed
+# to have the same mix. Messages carry whole requests, so reading many of them would make scrapes slow.
+QUEUE_SAMPLE = int(os.environ.get("SOLBOLT_METRICS_QUEUE_SAMPLE", "100"))
+
+SENT_AT_HEADER = "solbolt_sent_at"
+
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+TASK_WAIT = Histogram("solbolt_task_wait_seconds", "Time between publishing a task and a worker starting it",
+                      ["task"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+TASK_RUN = Histogram("solbolt_task_run_seconds", "Time a worker spent running a task",
+                     ["task"], buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200))
+TASK_RESULTS = Counter("solbolt_task_results_total", "Finished tasks by outcome", ["task", "outcome"])
+REJECTED = Counter("solbolt_rejected_requests_total", "Requests rejected before enqueueing", ["task", "reason"])
+COMPILES = Counter("solbolt_compiles_total", "Compilations by solc version", ["version"])
+WORKER_RSS = Gauge("solbolt_worker_rss_bytes", "Resident set size of a worker process after its last task",
+                   multiprocess_mode="liveall")
+
+def record_result(task, outcome):
+    """
+    :param task: Task name
+    :param outcome: "success" or the class of error the task reported
+    """
+    TASK_RESULTS.labels(task=task, outcome=outcome).inc()
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current, but better than nothing where procfs is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def queued_tasks(client, queue, limit=QUEUE_SAMPLE):
+    """
+    Reads a Redis broker queue
+    :param client: Redis client of the broker
+    :param limit: Number of messages inspected to count them by task. kombu pushes messages on the left
+                  and pops them from the right, so the ones inspected are the oldest, which run next.
+    :return: Queue length and the number of inspected messages per task name
+    """
+    length = client.llen(queue)
+    counts = dict()
+    # lrange(0, -1) would return the whole queue
+    messages = client.lrange(queue, -limit, -1) if limit > 0 else []
+    for message in messages:
+        try:
+            task = json.loads(message).get("headers", {}).get("task", "unknown")
+        except ValueError:
+            task = "unknown"
+        counts[task] = counts.get(task, 0) + 1
+    return length, counts
+
+def estimate_by_task(length, counts):
+    """
+    Scales the counts of a sample of a queue up to the whole queue
+    :param length: Queue length
+    :param counts: Inspected messages per task name
+    :return: Estimated messages per task name
+    """
+    inspected = sum(counts.values())
+    if inspected == 0:
+        return dict()
+    return {task: count * length / inspected for task, count in counts.items()}
+
+class QueueCollector:
+    """
+    Reports the number of messages waiting in each broker queue, split by task name
+    """
+    def __init__(self, broker_url=BROKER_URL, queues=QUEUES) -> None:
+        self.client = redis.Redis.from_url(broker_url, socket_timeout=2)
+        self.queues = queues
+
+    def collect(self):
+        length = GaugeMetricFamily("solbolt_queue_length", "Messages waiting in the broker queue", labels=["queue"])
+        by_task = GaugeMetricFamily("solbolt_queue_tasks", "Messages waiting in the broker queue by task, "
+                                    f"estimated from {QUEUE_SAMPLE} of them", labels=["queue", "task"])
+
+        for queue in self.queues:
+            try:
+                queue_length, counts = queued_tasks(self.client, queue)
+                length.add_metric([queue], queue_length)
+                for task, count in estimate_by_task(queue_length, counts).items():
+                    by_task.add_metric([queue, task], count)
+            except redis.RedisError as e:
+                log.warning("Could not read queue %s: %s", queue, e)
+
+        yield length
+        yield by_task
+
+def make_registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+_api_registry = None
+
+def metrics_view():
+    """
+    Flask view serving the API metrics and the broker queue lengths
+    """
+    global _api_registry
+    if _api_registry is None:
+        _api_registry = make_registry()
+        _api_registry.register(QueueCollector())
+    return generate_latest(_api_registry), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
+_started = dict()
+
+@before_task_publish.connect
+def stamp_sent_at(headers=None, **kwargs):
+    if headers is not None:
+        headers[SENT_AT_HEADER] = time.time()
+
+@task_prerun.connect
+def observe_wait(task_id=None, task=None, **kwargs):
+    # Custom message headers are exposed on the request
+    sent_at = getattr(task.request, SENT_AT_HEADER, None)
+    if sent_at is not None:
+        TASK_WAIT.labels(task=task.name).observe(max(0, time.time() - sent_at))
+    _started[task_id] = time.monotonic()
+
+@task_postrun.connect
+def observe_run(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        TASK_RUN.labels(task=task.name).observe(time.monotonic() - started)
+    if state == "FAILURE":
+        record_result(task.name, "unhandled")
+    WORKER_RSS.set(rss_bytes())
+
+@worker_ready.connect
+def start_worker_exporter(**kwargs):
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT, registry=make_registry())
+        log.info("Serving worker metrics on port %d", WORKER_METRICS_PORT)
+
+@worker_process_shutdown.connect
+def mark_process_dead(pid=None, **kwargs):
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,283 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from mythril.ethereum.interface.rpc.base_client import BaseClient
+from mythril.ethereum.interface.rpc.exceptions import (
+    BadJsonError,
+    BadResponseError,
+    BadStatusCodeError,
+    ConnectionError,
+)
+from requests.exceptions import RequestException
+
+from .cache import cache_path
+
+log = logging.getLogger(__name__)
+
+# Reads are pinned to the latest block rounded down to this many blocks, so runs
+# started close together share cache entries. Full nodes keep the last 128 blocks.
+BLOCK_WINDOW = int(os.environ.get("SOLBOLT_ONCHAIN_BLOCK_WINDOW", "64"))
+# Upper bound on the number of slots fetched in one prefetch batch
+MAX_PREFETCH_SLOTS = int(os.environ.get("SOLBOLT_ONCHAIN_MAX_PREFETCH", "256"))
+# Seconds to wait for a prefetch batch before falling back to single reads
+PREFETCH_TIMEOUT = float(os.environ.get("SOLBOLT_ONCHAIN_PREFETCH_TIMEOUT", "10"))
+
+# Errors of a JSON-RPC request that leave the per-read path worth trying
+RPC_ERRORS = (BadJsonError, BadResponseError, BadStatusCodeError, ConnectionError, RequestException)
+
+EMPTY_SLOT = "0x0000000000000000000000000000000000000000000000000000000000000000"
+
+KIND_CODE = "code"
+KIND_STORAGE = "storage"
+KIND_BALANCE = "balance"
+
+OPCODE_SLOAD = 0x54
+OPCODE_PUSH1 = 0x60
+OPCODE_PUSH32 = 0x7f
+
+def normalize_address(address):
+    if isinstance(address, int):
+        return "0x{:040x}".format(address)
+    return address.lower()
+
+def static_storage_slots(code):
+    """
+    Finds the constant storage slots read by a piece of bytecode, i.e. every PUSH directly followed by SLOAD
+    :param code: Hex encoded bytecode
+    :return: Sorted list of slot indices
+    """
+    code = code[2:] if code.startswith("0x") else code
+    try:
+        code_bytes = bytes.fromhex(code)
+    except ValueError:
+        return []
+
+    slots = set()
+    i = 0
+    while i < len(code_bytes):
+        opcode = code_bytes[i]
+        if OPCODE_PUSH1 <= opcode <= OPCODE_PUSH32:
+            push_len = opcode - OPCODE_PUSH1 + 1
+            end = i + 1 + push_len
+            if end < len(code_bytes) and code_bytes[end] == OPCODE_SLOAD:
+                slots.add(int.from_bytes(code_bytes[i + 1:end], "big"))
+            i = end
+        else:
+            i += 1
+
+    return sorted(slots)
+
+class OnchainStore:
+    """
+    Persistent store of (address, kind, slot, block) reads, shared by every worker on the host
+    """
+    def __init__(self, path=None) -> None:
+        self.path = path or cache_path("onchain.sqlite")
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS reads (
+                                address TEXT NOT NULL,
+                                kind TEXT NOT NULL,
+                                slot TEXT NOT NULL,
+                                block INTEGER NOT NULL,
+                                value TEXT NOT NULL,
+                                PRIMARY KEY (address, kind, slot, block))""")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, address, kind, slot, block):
+        row = self._connection().execute(
+            "SELECT value FROM reads WHERE address = ? AND kind = ? AND slot = ? AND block = ?",
+            (address, kind, slot, block)).fetchone()
+        return row[0] if row else None
+
+    def get_code(self, address):
+        # Code is effectively immutable, so any block will do
+        row = self._connection().execute(
+            "SELECT value FROM reads WHERE address = ? AND kind = ? ORDER BY block DESC LIMIT 1",
+            (address, KIND_CODE)).fetchone()
+        return row[0] if row else None
+
+    def known_slots(self, address):
+        rows = self._connection().execute(
+            "SELECT DISTINCT slot FROM reads WHERE address = ? AND kind = ?",
+            (address, KIND_STORAGE)).fetchall()
+        return [int(row[0], 16) for row in rows]
+
+    def put_many(self, rows):
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO reads VALUES (?, ?, ?, ?, ?)", rows)
+
+class CachedEthJsonRpc(BaseClient):
+    """
+    Read-through cache in front of an EthJsonRpc client. Code, storage and balance reads are pinned
+    to one block per run, served from the OnchainStore when possible, and the first touch of an
+    address prefetches all of its known slots in a single batched request.
+    """
+    def __init__(self, eth, store=None, block_window=BLOCK_WINDOW) -> None:
+        self.eth = eth
+        self.store = store or OnchainStore()
+        self.block_window = block_window
+        self._block = None
+        self._prefetched = set()
+        # Cleared once a prefetch fails, e.g. because the provider does not accept batch requests
+        self._prefetch_enabled = True
+
+        self.hits = 0
+        self.misses = 0
+
+    def _url(self):
+        scheme = "https" if self.eth.tls else "http"
+        if self.eth.port:
+            return f"{scheme}://{self.eth.host}:{self.eth.port}"
+        return f"{scheme}://{self.eth.host}"
+
+    def _call(self, method, params=None, _id=1):
+        return self.eth._call(method, params, _id)
+
+    def _batch_call(self, calls):
+        """
+        Sends several JSON-RPC requests in one HTTP round-trip
+        :param calls: List of (method, params) tuples
+        :return: List of results in the same order, None for requests that failed
+        """
+        if len(calls) == 0:
+            return []
+
+        data = [{"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+                    for i, (method, params) in enumerate(calls)]
+        try:
+            r = self.eth.session.post(self._url(), headers={"Content-Type": "application/json"}, data=json.dumps(data),
+                                      timeout=PREFETCH_TIMEOUT)
+        except RequestException:
+            # Timeouts included, the caller only needs to know that the batch did not go through
+            raise ConnectionError
+        if r.status_code // 100 != 2:
+            raise BadStatusCodeError(r.status_code)
+        try:
+            response = r.json()
+        except ValueError:
+            raise BadJsonError(r.text)
+        if not isinstance(response, list):
+            raise BadResponseError(response)
+
+        results = [None] * len(calls)
+        for item in response:
+            if isinstance(item, dict) and "result" in item and isinstance(item.get("id"), int) and item["id"] < len(calls):
+                results[item["id"]] = item["result"]
+        return results
+
+    @property
+    def block(self):
+        if self._block is None:
+            latest = self.eth.eth_blockNumber()
+            self._block = latest - latest % self.block_window if self.block_window > 1 else latest
+            log.info("Pinning on-chain reads to block %d", self._block)
+        return self._block
+
+    def _resolve_block(self, block):
+        return block if isinstance(block, int) else self.block
+
+    def prefetch(self, address, slots=()):
+        """
+        Fetches the code, balance and every known storage slot of an address in one batch. This is only an
+        optimisation: if the provider rejects the batch or cannot be reached, reads fall back to one request each.
+        :param address: Contract address
+        :param slots: Extra slots to fetch on top of the ones found in the code and in earlier runs
+        """
+        address = normalize_address(address)
+        if not self._prefetch_enabled or address in self._prefetched:
+            return
+        self._prefetched.add(address)
+        block = self.block
+
+        try:
+            self._prefetch(address, block, slots)
+        except RPC_ERRORS as e:
+            self._prefetch_enabled = False
+            log.warning("Prefetching on-chain reads failed, reading slots one by one from now on: %r", e)
+
+    def _prefetch(self, address, block, slots):
+        code = self.store.get_code(address)
+        if code is None:
+            code = self._call("eth_getCode", [address, hex(block)])
+            self.store.put_many([(address, KIND_CODE, "", block, code)])
+
+        wanted = set(slots) | set(self.store.known_slots(address)) | set(static_storage_slots(code))
+        missing = [slot for slot in sorted(wanted) if self.store.get(address, KIND_STORAGE, hex(slot), block) is None]
+        missing = missing[:MAX_PREFETCH_SLOTS]
+
+        calls = [("eth_getStorageAt", [address, hex(slot), hex(block)]) for slot in missing]
+        if self.store.get(address, KIND_BALANCE, "", block) is None:
+            calls.append(("eth_getBalance", [address, hex(block)]))
+
+        results = self._batch_call(calls)
+
+        rows = list()
+        for (method, params), result in zip(calls, results):
+            if result is None:
+                continue
+            if method == "eth_getStorageAt":
+                rows.append((address, KIND_STORAGE, params[1], block, result if result != "0x" else EMPTY_SLOT))
+            else:
+                rows.append((address, KIND_BALANCE, "", block, result))
+        self.store.put_many(rows)
+
+        log.info("Prefetched %d of %d on-chain reads for %s at block %d", len(rows), len(calls), address, block)
+
+    def eth_getCode(self, address, default_block="latest"):
+        address = normalize_address(address)
+        code = self.store.get_code(address)
+        if code is not None:
+            self.hits += 1
+            return code
+
+        self.misses += 1
+        block = self._resolve_block(default_block)
+        code = self._call("eth_getCode", [address, hex(block)])
+        self.store.put_many([(address, KIND_CODE, "", block, code)])
+        return code
+
+    def eth_getStorageAt(self, address=None, position=0, block="latest"):
+        address = normalize_address(address)
+        self.prefetch(address)
+        block = self._resolve_block(block)
+
+        value = self.store.get(address, KIND_STORAGE, hex(position), block)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = self._call("eth_getStorageAt", [address, hex(position), hex(block)])
+        if value == "0x":
+            value = EMPTY_SLOT
+        self.store.put_many([(address, KIND_STORAGE, hex(position), block, value)])
+        return value
+
+    def eth_getBalance(self, address=None, block="latest"):
+        address = normalize_address(address)
+        self.prefetch(address)
+        block = self._resolve_block(block)
+
+        value = self.store.get(address, KIND_BALANCE, "", block)
+        if value is not None:
+            self.hits += 1
+            return int(value, 16)
+
+        self.misses += 1
+        value = self._call("eth_getBalance", [address, hex(block)])
+        self.store.put_many([(address, KIND_BALANCE, "", block, value)])
+        return int(value, 16)
+
+    def close(self):
+        self.eth.close()
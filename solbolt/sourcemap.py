@@ -0,0 +1,203 @@
+"""
+Source level gas aggregation.
+
+The gas maps of a symbolic execution are keyed by instruction address. A SourceMapIndex maps every
+instruction of a contract's creation and runtime code to its file, line range and enclosing
+function, decoded from the solc source maps and ASTs once per build. Indexes are kept in memory and
+in the cache directory, so repeated runs of the same build skip the decoding.
+"""
+import hashlib
+import json
+import logging
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+
+from .cache import cache_path
+from .incremental import decode_source_map, parse_instructions, parse_src, walk
+
+log = logging.getLogger(__name__)
+
+# Bump whenever the stored layout changes so stale indexes are never used
+SOURCEMAP_FORMAT = 1
+
+SOURCEMAP_CACHE_ENABLED = os.environ.get("SOLBOLT_SOURCEMAP_CACHE", "1") == "1"
+# Indexes kept in memory by each worker process
+MEMORY_ENTRIES = 16
+
+SECTIONS = {
+    "creation": "bytecode",
+    "runtime": "deployedBytecode",
+}
+
+def line_starts(content):
+    """
+    :return: Byte offset of the start of every line, as solc source ranges are byte offsets
+    """
+    data = content.encode("utf8")
+    return [0] + [i + 1 for i, byte in enumerate(data) if byte == 0x0a]
+
+def function_label(contract, node):
+    if node.get("name"):
+        return f"{contract}.{node['name']}"
+    kind = node.get("kind") or ("constructor" if node.get("isConstructor") else "fallback")
+    return f"{contract}.{kind}"
+
+def function_ranges(compiled_json):
+    """
+    :return: List of (file index, start, end, label) of every function and modifier definition
+    """
+    ranges = list()
+    for source in compiled_json.get("sources", {}).values():
+        for contract in walk(source.get("ast", {})):
+            if contract.get("nodeType") != "ContractDefinition":
+                continue
+            for member in contract.get("nodes", []):
+                if member.get("nodeType") in ("FunctionDefinition", "ModifierDefinition"):
+                    start, size, file_index = parse_src(member["src"])
+                    ranges.append((file_index, start, start + size, function_label(contract.get("name"), member)))
+    return ranges
+
+class SourceMapIndex:
+    def __init__(self, sections) -> None:
+        """
+        :param sections: Dict of section name to a dict of instruction address to
+                         [file name, start line, end line, function label or None]
+        """
+        self.sections = sections
+
+    @staticmethod
+    def key(compiled_json, contract_name, solidity_files):
+        """
+        :return: Key of the index, or None if the contract is not in the compiled JSON
+        """
+        contract = find_contract(compiled_json, contract_name)
+        if contract is None:
+            return None
+        evm = contract.get("evm", {})
+        code = [[evm.get(field, {}).get("object"), evm.get(field, {}).get("sourceMap")] for field in SECTIONS.values()]
+        contents = {file["name"]: hashlib.sha256(file["content"].encode("utf8")).hexdigest() for file in solidity_files}
+        return hashlib.sha256(json.dumps([SOURCEMAP_FORMAT, contract_name, code, contents], sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def build(cls, compiled_json, contract_name, solidity_files):
+        evm = find_contract(compiled_json, contract_name)["evm"]
+        file_names = {source["id"]: name for name, source in compiled_json.get("sources", {}).items() if "id" in source}
+        lines = {file["name"]: line_starts(file["content"]) for file in solidity_files}
+        functions = function_ranges(compiled_json)
+
+        # Many instructions share a source range, so each distinct range is resolved once
+        resolved = dict()
+        def resolve(start, size, file_index):
+            name = file_names.get(file_index)
+            if name not in lines:
+                return None
+            starts = lines[name]
+            label = next((label for f_index, f_start, f_end, label in functions
+                            if f_index == file_index and f_start <= start and start + size <= f_end), None)
+            return [name, bisect_right(starts, start), bisect_right(starts, start + max(size - 1, 0)), label]
+
+        sections = dict()
+        for section, field in SECTIONS.items():
+            bytecode = evm.get(field, {}).get("object", "")
+            instructions = parse_instructions(bytecode) if bytecode else []
+            source_map = decode_source_map(evm.get(field, {}).get("sourceMap", ""), len(instructions))
+            entries = dict()
+            for (address, _, _), source_range in zip(instructions, source_map):
+                if source_range[2] < 0:
+                    continue
+                if source_range not in resolved:
+                    resolved[source_range] = resolve(*source_range)
+                if resolved[source_range] is not None:
+                    entries[address] = resolved[source_range]
+            sections[section] = entries
+        return cls(sections)
+
+    def to_json(self):
+        return {section: {str(address): entry for address, entry in entries.items()} for section, entries in self.sections.items()}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls({section: {int(address): entry for address, entry in entries.items()} for section, entries in data.items()})
+
+def find_contract(compiled_json, contract_name):
+    for contracts in compiled_json.get("contracts", {}).values():
+        if contract_name in contracts:
+            return contracts[contract_name]
+    return None
+
+_memory = OrderedDict()
+
+def source_index(compiled_json, contract_name, solidity_files):
+    """
+    :param solidity_files: Files with their contents
+    :return: The SourceMapIndex of the contract, decoded on first use, or None if the contract is not in the compiled JSON
+    """
+    key = SourceMapIndex.key(compiled_json, contract_name, solidity_files)
+    if key is None:
+        return None
+    if key in _memory:
+        _memory.move_to_end(key)
+        return _memory[key]
+
+    path = cache_path("sourcemaps", f"{key}.json") if SOURCEMAP_CACHE_ENABLED else None
+    index = None
+    if path is not None and os.path.exists(path):
+        try:
+            with open(path) as f:
+                index = SourceMapIndex.from_json(json.load(f))
+        except (OSError, ValueError) as e:
+            log.warning("Could not read source map index %s: %s", path, e)
+
+    if index is None:
+        index = SourceMapIndex.build(compiled_json, contract_name, solidity_files)
+        if path is not None:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index.to_json(), f)
+            os.replace(tmp_path, path)
+
+    _memory[key] = index
+    if len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+    return index
+
+def merge_gas(total, item):
+    """
+    Adds the gas of an instruction to a total, the same way merge_gas_items combines gas meter items
+    """
+    for field, value in item.items():
+        if field == "num_tx":
+            total[field] = max(total.get(field, 0), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[field] = total.get(field, 0) + value
+
+def aggregate_gas(gas_map, entries):
+    """
+    :param gas_map: Serialised gas meter items by instruction address
+    :param entries: Section of a SourceMapIndex
+    :return: Dict with the gas of every (file, line range) in "lines" and of every function in "functions".
+             Instructions without a source range are summed in "unmapped".
+    """
+    lines = dict()
+    functions = dict()
+    unmapped = dict()
+    for key, item in gas_map.items():
+        try:
+            entry = entries.get(int(key))
+        except (TypeError, ValueError):
+            entry = None
+        if entry is None:
+            merge_gas(unmapped, item)
+            continue
+        (file_name, start_line, end_line, label) = entry
+        merge_gas(lines.setdefault((file_name, start_line, end_line), dict()), item)
+        if label is not None:
+            merge_gas(functions.setdefault(label, dict()), item)
+
+    return {
+        "lines": [{"file": file_name, "start_line": start_line, "end_line": end_line, **gas}
+                    for (file_name, start_line, end_line), gas in sorted(lines.items())],
+        "functions": functions,
+        "unmapped": unmapped,
+    }
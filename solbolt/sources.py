@@ -0,0 +1,95 @@
+"""
+Content-addressed store for uploaded Solidity sources.
+
+Clients upload each distinct file once and then refer to it by the sha256 hex digest of its UTF-8
+content, sending {"name": ..., "hash": ...} instead of {"name": ..., "content": ...}. Before a
+request the client asks which of its hashes are missing and uploads only those, so an edit loop
+resends just the files that changed. The API and the workers share the store through the cache
+directory, and the workers read the contents back when the task runs.
+"""
+import os
+
+from .blobs import BlobStore
+from .cache import cache_path
+
+# Sources are small and reused across many edits, so they are kept longer than task results
+SOURCE_TTL = int(os.environ.get("SOLBOLT_SOURCE_TTL", str(7 * 24 * 60 * 60)))
+SOURCE_MAX_BYTES = int(os.environ.get("SOLBOLT_SOURCE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+class MissingSourcesError(Exception):
+    """
+    Raised when files refer to hashes that are not, or no longer, in the store
+    """
+    def __init__(self, missing) -> None:
+        super().__init__(f"Unknown source hashes: {', '.join(missing)}")
+        self.missing = missing
+
+_store = None
+
+def store():
+    global _store
+    if _store is None:
+        _store = BlobStore(os.path.dirname(cache_path("sources", "source")), SOURCE_TTL, SOURCE_MAX_BYTES)
+    return _store
+
+def put(contents):
+    """
+    :param contents: Source strings
+    :return: Hash of each source
+    """
+    return [store().put(content.encode("utf8")) for content in contents]
+
+def missing(hashes):
+    """
+    Finds the hashes the client has to upload. Sources that are present have their TTL restarted,
+    so they do not expire between this check and the task reading them.
+    :return: Hashes not in the store, in request order without duplicates
+    """
+    absent = list()
+    for digest in dict.fromkeys(hashes):
+        path = store().path(digest)
+        if path is None:
+            absent.append(digest)
+            continue
+        try:
+            os.utime(path)
+        except OSError:
+            absent.append(digest)
+    return absent
+
+def size(digest):
+    """
+    :return: Size in bytes of a stored source, or None if it is missing
+    """
+    path = store().path(digest)
+    try:
+        return os.path.getsize(path) if path is not None else None
+    except OSError:
+        return None
+
+def has_content(file):
+    """
+    The same test admission.check_files applies, so a null content is resolved from the hash
+    """
+    return isinstance(file.get("content"), str)
+
+def resolve_files(files):
+    """
+    :param files: Files with either a 'content' or a 'hash'
+    :return: The files with the content of every hashed file filled in
+    :raises MissingSourcesError: If some hashes are not in the store
+    """
+    contents = dict()
+    absent = list()
+    for file in files:
+        if has_content(file) or file["hash"] in contents:
+            continue
+        data = store().read(file["hash"])
+        if data is None:
+            absent.append(file["hash"])
+        else:
+            contents[file["hash"]] = data.decode("utf8")
+    if len(absent) > 0:
+        raise MissingSourcesError(list(dict.fromkeys(absent)))
+
+    return [file if has_content(file) else {"name": file["name"], "content": contents[file["hash"]]} for file in files]
@@ -1,7 +1,9 @@
 import os
 import time
+from functools import cached_property
 
 from celery import Celery
+from celery.app.backends import by_url
 
 from mythril.exceptions import CompilerError
 from json.decoder import JSONDecodeError
@@ -9,14 +11,56 @@ import json
 
 from subprocess import PIPE, Popen
 
-from .apis.symexec import SymExec
+from .apis.symexec import SymExec, InvalidSettingsError
+from .timing import Timings, children_cpu_time
+from .metrics import COMPILES, record_result
+from .blobs import offload_result
+from .sources import MissingSourcesError, resolve_files
+from .incremental import source_ranges
+from .sourcemap import SECTIONS, aggregate_gas, source_index
+# Registers the signal handlers that publish task state transitions
+from . import events
 
 import traceback
 
-celery = Celery(__name__)
+def cooperative():
+    """
+    :return: True when running under gevent with monkey patching, e.g. in gunicorn gevent workers
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+class SharedBackendCelery(Celery):
+    """
+    Celery app with one result backend per process. Celery keeps one per thread, which is per
+    greenlet once threading.local is patched, so every request would build its own backend and
+    Redis connection pool. redis-py is safe to share between greenlets on patched sockets.
+    """
+    @cached_property
+    def backend(self):
+        backend, url = by_url(self.backend_cls or self.conf.result_backend, self.loader)
+        return backend(app=self, url=url)
+
+celery = (SharedBackendCelery if cooperative() else Celery)(__name__)
 celery.conf.broker_url = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379")
 celery.conf.result_backend = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379")
 celery.conf.worker_redirect_stdouts = False
+# Used when the worker runs with --autoscale
+celery.conf.worker_autoscaler = "solbolt.autoscale:QueueMemoryAutoscaler"
+
+if celery.conf.broker_url.startswith("filesystem://"):
+    # Redis-free stand-in for local load tests: messages are files in a shared directory.
+    # Pair it with a file:// result backend.
+    broker_dir = os.environ.get("SOLBOLT_BROKER_DIR", os.path.join(os.getcwd(), "broker"))
+    os.makedirs(os.path.join(broker_dir, "queue"), exist_ok=True)
+    celery.conf.broker_transport_options = {
+        "data_folder_in": os.path.join(broker_dir, "queue"),
+        "data_folder_out": os.path.join(broker_dir, "queue"),
+        "store_processed": False,
+    }
 
 solc_binaries = [
     'v0.8.13+commit.abaa5c0e',
@@ -92,9 +136,13 @@ solc_binaries = [
 
 @celery.task(name="compile_solidity")
 def compile_solidity(sol_files, settings):
+  timings = Timings()
   try:
     sources = dict()
     
+    with timings.phase("read_sources"):
+        sol_files = resolve_files(sol_files)
+    
     for file in sol_files:
         sources[file['name']] = {
             'content': file['content']
@@ -137,44 +185,68 @@ def compile_solidity(sol_files, settings):
     if (settings['evmVersion'] != 'Default'):
         json_settings["evmVersion"] = settings['evmVersion']
     
+    COMPILES.labels(version=settings['version']).inc()
+    
     solc_binary = f"./solc/solc-linux-amd64-{settings['version']}"
     
-    result = get_solc_json(sources, json_settings, solc_binary)
+    result = get_solc_json(sources, json_settings, solc_binary, timings)
     
-    return {
+    record_result("compile_solidity", "success")
+    return offload_result({
         "success": True,
-        "result": result
-    }
+        "result": result,
+        "timings": timings.as_dict()
+    })
     
+  except MissingSourcesError as e:
+      record_result("compile_solidity", "MissingSourcesError")
+      return {
+        "success": False,
+        "result": f'Sources have expired, please upload them again: {", ".join(e.missing)}',
+        "timings": timings.as_dict()
+      }
   except CompilerError as e:
+      record_result("compile_solidity", "CompilerError")
       return {
         "success": False,
-        "result": f'Failed to compile Solidity: {str(e)}'
+        "result": f'Failed to compile Solidity: {str(e)}',
+        "timings": timings.as_dict()
       }
   except JSONDecodeError as e:
+      record_result("compile_solidity", "JSONDecodeError")
       return {
         "success": False,
-        "result": 'Failed to decode EVM output, please try again'
+        "result": 'Failed to decode EVM output, please try again',
+        "timings": timings.as_dict()
       }
   except KeyError as e:
+      record_result("compile_solidity", "KeyError")
       return {
         "success": False,
-        "result": "Internal server error, could not compile content"
+        "result": "Internal server error, could not compile content",
+        "timings": timings.as_dict()
       }
   except Exception as e:
+      record_result("compile_solidity", "Exception")
       return {
         "success": False,
-        "result": "Unknown exception occured, please try again soon"
+        "result": "Unknown exception occured, please try again soon",
+        "timings": timings.as_dict()
       }
+  finally:
+    timings.log("compile_solidity", version=settings.get('version'))
   
-def get_solc_json(sources, json_settings, solc_binary="solc"):
+def get_solc_json(sources, json_settings, solc_binary="solc", timings=None):
     """
 
     :param file:
     :param solc_binary:
     :param solc_settings_json:
+    :param timings: Timings to record spawn, solc and JSON decode times into
     :return:
     """
+    timings = timings if timings is not None else Timings()
+
     cmd = [solc_binary, "--standard-json", "--allow-paths", "."]
 
     input_json = json.dumps(
@@ -186,18 +258,22 @@ def get_solc_json(sources, json_settings, solc_binary="solc"):
     )
 
     try:
-        p = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-        stdout, stderr = p.communicate(bytes(input_json, "utf8"))
+        with timings.phase("spawn"):
+            p = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        cpu_start = children_cpu_time()
+        with timings.phase("solc"):
+            stdout, stderr = p.communicate(bytes(input_json, "utf8"))
+        timings.add("solc_cpu", children_cpu_time() - cpu_start)
 
     except FileNotFoundError:
         raise CompilerError(
             "Compiler not found. Make sure that solc is installed and in PATH, or set the SOLC environment variable."
         )
 
-    out = stdout.decode("UTF-8")
-
     try:
-        result = json.loads(out)
+        with timings.phase("json_decode"):
+            out = stdout.decode("UTF-8")
+            result = json.loads(out)
     except JSONDecodeError as e:
         raise e
 
@@ -209,29 +285,20 @@ def get_solc_json(sources, json_settings, solc_binary="solc"):
 
     return result
   
-@celery.task(name="symbolic_exec")
-def symbolic_exec(solidity_files, contract, compiled_json, settings):
-  try:
-    onchain_address = settings.get('onchain_address', None) if settings['enable_onchain'] else None
-    no_onchain_data = not settings['enable_onchain']
-    
-    exec_env = SymExec(solidity_files=solidity_files,
-                onchain_address=onchain_address,
-                contract_name=contract,
-                json=[compiled_json],
-                max_depth=settings['max_depth'],
-                call_depth_limit=settings['call_depth_limit'],
-                strategy=settings['strategy'],
-                loop_bound=settings['loop_bound'],
-                transaction_count=settings['transaction_count'],
-                no_onchain_data=no_onchain_data,
-                ignore_constraints=settings['ignore_constraints']
-            )
-            
+def run_symexec(exec_env, timings):
+    """
+    Explores a loaded contract and serialises the analyses
+    :param exec_env: SymExec to run
+    :param timings: Timings to record the phases into
+    :return: Result dict with creation, runtime, function_gas, loop_gas, cov_percentage and detected_issues
+    """
     exec_env.execute_command()
+    timings.update(exec_env.timings)
     
     (creation_transaction_gas_map, runtime_transaction_gas_map, function_gas_map, loop_gas_meter, cov_percentage, detected_issues) = exec_env.parse_exec_results()
+    timings.add("parse_results", exec_env.timings.phases["parse_results"] / 1000)
     
+    serialise_start = time.monotonic()
     creation_result = { k: v.__dict__() for k, v in creation_transaction_gas_map.items() }
     
     runtime_result = { k: v.__dict__() for k, v in runtime_transaction_gas_map.items() }
@@ -257,30 +324,164 @@ def symbolic_exec(solidity_files, contract, compiled_json, settings):
                 "isHidden": loop_gas_item.is_hidden
             }
     
-    return {
+    result = {
+      "creation": creation_result,
+      "runtime": runtime_result,
+      "function_gas": dict(function_gas_map),
+      "loop_gas": loop_gas_result,
+      "cov_percentage": cov_percentage,
+      "detected_issues": detected_issues,
+      "resumed_round": exec_env.resumed_round,
+      "creation_reused": exec_env.creation_reused
+    }
+    
+    timings.add("serialise", time.monotonic() - serialise_start)
+
+    return result
+
+@celery.task(name="symbolic_exec")
+def symbolic_exec(solidity_files, contract, compiled_json, settings):
+  timings = Timings()
+  try:
+    onchain_address = settings.get('onchain_address', None) if settings['enable_onchain'] else None
+    no_onchain_data = not settings['enable_onchain']
+    
+    with timings.phase("read_sources"):
+        solidity_files = resolve_files(solidity_files)
+    
+    exec_env = SymExec(solidity_files=solidity_files,
+                onchain_address=onchain_address,
+                contract_name=contract,
+                json=[compiled_json],
+                max_depth=settings['max_depth'],
+                call_depth_limit=settings['call_depth_limit'],
+                strategy=settings['strategy'],
+                loop_bound=settings['loop_bound'],
+                transaction_count=settings['transaction_count'],
+                no_onchain_data=no_onchain_data,
+                ignore_constraints=settings['ignore_constraints'],
+                incremental=settings.get('incremental', False),
+                analyses=settings.get('analyses', None)
+            )
+            
+    result = run_symexec(exec_env, timings)
+    
+    with timings.phase("incremental_merge"):
+        result["incremental"] = exec_env.apply_incremental(result)
+    
+    if settings.get('aggregate_gas', False):
+        # Source level totals replace the much larger instruction level gas maps
+        with timings.phase("aggregate_gas"):
+            index = source_index(compiled_json, contract, solidity_files)
+            if index is not None:
+                result["source_gas"] = {section: aggregate_gas(result.pop(section), index.sections[section]) for section in SECTIONS}
+    
+    record_result("symbolic_exec", "success")
+    return offload_result({
       "success": True,
-      "result": {
-        "creation": creation_result,
-        "runtime": runtime_result,
-        "function_gas": function_gas_map,
-        "loop_gas": loop_gas_result,
-        "cov_percentage": cov_percentage,
-        "detected_issues": detected_issues
+      "result": result,
+      "timings": timings.as_dict()
+    })
+    
+  except MissingSourcesError as e:
+    record_result("symbolic_exec", "MissingSourcesError")
+    return {
+        "success": False,
+        "result": f"Sources have expired, please upload them again: {', '.join(e.missing)}",
+        "timings": timings.as_dict()
       }
-    }
+  except InvalidSettingsError as e:
+    record_result("symbolic_exec", "InvalidSettingsError")
+    return {
+        "success": False,
+        "result": f"Invalid settings: {str(e)}",
+        "timings": timings.as_dict()
+      }
+  except KeyError as e:
+    record_result("symbolic_exec", "KeyError")
+    return {
+        "success": False,
+        "result": "Internal server error, could not symbolic execute",
+        "timings": timings.as_dict()
+      }
+  except RuntimeError as e:
+    record_result("symbolic_exec", "RuntimeError")
+    return {
+        "success": False,
+        "result": "Runtime error, could not symbolic execute",
+        "timings": timings.as_dict()
+      }
+  except Exception as e:
+    record_result("symbolic_exec", "Exception")
+    return {
+        "success": False,
+        "result": "Unknown exception occured, please try again soon",
+        "timings": timings.as_dict()
+      }
+  finally:
+    timings.log("symbolic_exec", contract=contract)
+
+@celery.task(name="symbolic_exec_bytecode")
+def symbolic_exec_bytecode(bytecode, runtime, source_map, settings):
+  timings = Timings()
+  try:
+    onchain_address = settings.get('onchain_address', None) if settings['enable_onchain'] else None
+    no_onchain_data = not settings['enable_onchain']
+    
+    exec_env = SymExec(code=bytecode,
+                bin_runtime=runtime,
+                onchain_address=onchain_address,
+                max_depth=settings['max_depth'],
+                call_depth_limit=settings['call_depth_limit'],
+                strategy=settings['strategy'],
+                loop_bound=settings['loop_bound'],
+                transaction_count=settings['transaction_count'],
+                no_onchain_data=no_onchain_data,
+                ignore_constraints=settings['ignore_constraints'],
+                analyses=settings.get('analyses', None)
+            )
+    
+    result = run_symexec(exec_env, timings)
     
+    if source_map:
+        # The source map only covers the code it was generated for
+        with timings.phase("source_map"):
+            result["source_map"] = source_ranges(bytecode, source_map, result["runtime" if runtime else "creation"])
+    
+    record_result("symbolic_exec_bytecode", "success")
+    return offload_result({
+      "success": True,
+      "result": result,
+      "timings": timings.as_dict()
+    })
+    
+  except InvalidSettingsError as e:
+    record_result("symbolic_exec_bytecode", "InvalidSettingsError")
+    return {
+        "success": False,
+        "result": f"Invalid settings: {str(e)}",
+        "timings": timings.as_dict()
+      }
   except KeyError as e:
+    record_result("symbolic_exec_bytecode", "KeyError")
     return {
         "success": False,
-        "result": "Internal server error, could not symbolic execute"
+        "result": "Internal server error, could not symbolic execute",
+        "timings": timings.as_dict()
       }
   except RuntimeError as e:
+    record_result("symbolic_exec_bytecode", "RuntimeError")
     return {
         "success": False,
-        "result": "Runtime error, could not symbolic execute"
+        "result": "Runtime error, could not symbolic execute",
+        "timings": timings.as_dict()
       }
   except Exception as e:
+    record_result("symbolic_exec_bytecode", "Exception")
     return {
         "success": False,
-        "result": "Unknown exception occured, please try again soon"
+        "result": "Unknown exception occured, please try again soon",
+        "timings": timings.as_dict()
       }
+  finally:
+    timings.log("symbolic_exec_bytecode", runtime=runtime, size=len(bytecode) // 2)
@@ -0,0 +1,96 @@
+import json
+import logging
+import resource
+import time
+from contextlib import contextmanager
+
+from mythril.laser.plugin.builder import PluginBuilder
+from mythril.laser.plugin.interface import LaserPlugin
+from mythril.laser.plugin.loader import LaserPluginLoader
+
+log = logging.getLogger(__name__)
+
+TIMING_PLUGIN_NAME = "solbolt-timing"
+
+class Timings:
+    """
+    Wall clock duration of each phase of a task, in milliseconds, measured with a monotonic clock
+    """
+    def __init__(self) -> None:
+        self.phases = dict()
+        self.start = time.monotonic()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - start)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + round(seconds * 1000, 3)
+
+    def update(self, other):
+        for name, ms in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0) + ms
+
+    def as_dict(self):
+        return {**self.phases, "total": round((time.monotonic() - self.start) * 1000, 3)}
+
+    def log(self, task, **fields):
+        """
+        Logs the timings as a single JSON line so they can be aggregated
+        """
+        log.info("timings %s", json.dumps({"task": task, **fields, "timings_ms": self.as_dict()}, sort_keys=True, default=str))
+
+def children_cpu_time():
+    """
+    :return: User plus system CPU seconds used by terminated child processes so far
+    """
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class TimingPluginBuilder(PluginBuilder):
+    name = TIMING_PLUGIN_NAME
+
+    def __call__(self, *args, **kwargs):
+        return TimingPlugin(**kwargs)
+
+class TimingPlugin(LaserPlugin):
+    """
+    Splits a laser run into contract creation and runtime exploration. Creation ends when the
+    first message call round starts.
+    """
+    def __init__(self, timings=None) -> None:
+        self.timings = timings
+
+    def initialize(self, symbolic_vm):
+        if self.timings is None:
+            return
+
+        marks = dict()
+
+        @symbolic_vm.laser_hook("start_sym_exec")
+        def start_sym_exec_hook():
+            marks["start"] = time.monotonic()
+
+        @symbolic_vm.laser_hook("start_sym_trans")
+        def start_sym_trans_hook():
+            marks.setdefault("runtime", time.monotonic())
+
+        @symbolic_vm.laser_hook("stop_sym_exec")
+        def stop_sym_exec_hook():
+            stop = time.monotonic()
+            runtime = marks.get("runtime", stop)
+            self.timings.add("creation_exploration", runtime - marks.get("start", runtime))
+            self.timings.add("runtime_exploration", stop - runtime)
+
+def load_timing_plugin(timings):
+    """
+    Registers the timing plugin with the laser plugin loader and sets the Timings to record the next run into
+    """
+    plugin_loader = LaserPluginLoader()
+    if TIMING_PLUGIN_NAME not in plugin_loader.laser_plugin_builders:
+        plugin_loader.load(TimingPluginBuilder())
+    plugin_loader.add_args(TIMING_PLUGIN_NAME, timings=timings)
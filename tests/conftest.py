@@ -0,0 +1,12 @@
+import pytest
+
+from solbolt import cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """
+    Points the shared cache directory at a fresh temporary directory
+    """
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,28 @@
+import pytest
+
+from solbolt.admission import InvalidSettingsError, check_symexec_settings
+
+SETTINGS = {
+    "max_depth": 22,
+    "call_depth_limit": 3,
+    "loop_bound": 3,
+    "transaction_count": 2,
+    "strategy": "bfs",
+    "enable_onchain": False,
+    "ignore_constraints": False,
+}
+
+
+def test_known_analyses():
+    check_symexec_settings({**SETTINGS, "analyses": ["gas", "coverage"]})
+
+
+@pytest.mark.parametrize("analyses", ["gas", {"gas": True}, [{"name": "gas"}], [["gas"]], 1])
+def test_analyses_not_a_list_of_strings(analyses):
+    with pytest.raises(InvalidSettingsError, match="'analyses'"):
+        check_symexec_settings({**SETTINGS, "analyses": analyses})
+
+
+def test_unknown_analyses():
+    with pytest.raises(InvalidSettingsError, match="Unknown analyses: storage"):
+        check_symexec_settings({**SETTINGS, "analyses": ["gas", "storage"]})
@@ -0,0 +1,64 @@
+import os
+import shutil
+
+from solbolt.checkpoint import CheckpointStore, evict, find_resume, loads
+
+
+def save_creation(store, max_depth=128, depth=3):
+    store.save(0, {"round": 0}, address=7, max_depth=max_depth, depth=depth)
+
+
+def test_creation_cache_hit(cache_dir):
+    creation_cache = CheckpointStore("contract", "creation")
+    save_creation(creation_cache)
+
+    round, meta, data, from_creation = find_resume(None, creation_cache, 2, 128)
+    assert (round, meta["address"], from_creation) == (0, 7, True)
+    assert loads(data) == {"round": 0}
+
+
+def test_creation_cache_evicted_between_lookup_and_load(cache_dir):
+    creation_cache = CheckpointStore("contract", "creation")
+    save_creation(creation_cache)
+
+    # Another worker evicts the entry right after this run has seen it listed
+    list_rounds = creation_cache.rounds
+    def rounds():
+        found = list_rounds()
+        evict(os.path.dirname(creation_cache.directory), ttl=-1, max_bytes=0)
+        return found
+    creation_cache.rounds = rounds
+
+    assert find_resume(None, creation_cache, 2, 128) is None
+    assert not os.path.exists(creation_cache.directory)
+
+
+def test_creation_cache_pickle_removed_after_meta(cache_dir):
+    creation_cache = CheckpointStore("contract", "creation")
+    save_creation(creation_cache)
+
+    read_meta = creation_cache.meta
+    def meta(round):
+        found = read_meta(round)
+        shutil.rmtree(creation_cache.directory, ignore_errors=True)
+        return found
+    creation_cache.meta = meta
+
+    assert find_resume(None, creation_cache, 2, 128) is None
+
+
+def test_truncated_checkpoint_falls_back_to_creation_cache(cache_dir):
+    checkpoints = CheckpointStore("contract")
+    creation_cache = CheckpointStore("contract", "creation")
+    checkpoints.save(1, {"round": 1, "padding": os.urandom(4096)}, address=7, max_depth=128, depth=3)
+    save_creation(creation_cache)
+
+    path = os.path.join(checkpoints.directory, "round-1.pkl.gz")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    assert checkpoints.fetch(1) is None
+    round, _, _, from_creation = find_resume(checkpoints, creation_cache, 2, 128)
+    assert (round, from_creation) == (0, True)
@@ -0,0 +1,55 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+from mythril.ethereum.interface.rpc.client import EthJsonRpc
+
+from solbolt.devnode import DevNode, make_handler
+from solbolt.onchain import CachedEthJsonRpc, OnchainStore
+
+ADDRESS = "0x00000000000000000000000000000000000000aa"
+SLOT_VALUE = "0x" + "00" * 31 + "2a"
+
+FIXTURE = {
+    "blockNumber": 1000,
+    "accounts": {
+        # PUSH1 0x01 SLOAD, so slot 1 is prefetched
+        ADDRESS: {"code": "0x600154", "balance": "0x10", "storage": {"0x1": SLOT_VALUE}},
+    },
+}
+
+
+@pytest.fixture
+def node_client(tmp_path, request):
+    node = DevNode(FIXTURE, batch=request.param)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(node))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = CachedEthJsonRpc(EthJsonRpc("127.0.0.1", server.server_port), OnchainStore(str(tmp_path / "onchain.sqlite")))
+    yield node, client
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("node_client", [True], indirect=True)
+def test_prefetch_batches_reads(node_client):
+    node, client = node_client
+    assert client.eth_getStorageAt(ADDRESS, 1) == SLOT_VALUE
+    assert client.eth_getBalance(ADDRESS) == 0x10
+    assert client.hits == 2 and client.misses == 0
+
+
+@pytest.mark.parametrize("node_client", [False], indirect=True)
+def test_rejected_batch_falls_back_to_single_reads(node_client):
+    node, client = node_client
+    client.prefetch(ADDRESS)
+
+    assert client.eth_getStorageAt(ADDRESS, 1) == SLOT_VALUE
+    assert client.eth_getStorageAt(ADDRESS, 2) == "0x" + "00" * 32
+    assert client.eth_getBalance(ADDRESS) == 0x10
+    assert node.calls["eth_getStorageAt"] == 2
+    assert node.calls["eth_getBalance"] == 1
+
+    # Once rejected, batches are not retried for other addresses
+    client.eth_getStorageAt("0x00000000000000000000000000000000000000bb", 0)
+    assert node.calls["eth_getCode"] == 1
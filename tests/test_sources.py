@@ -0,0 +1,33 @@
+import pytest
+
+from solbolt import sources
+from solbolt.sources import MissingSourcesError
+
+
+@pytest.fixture
+def store(cache_dir, monkeypatch):
+    monkeypatch.setattr(sources, "_store", None)
+    return sources.store()
+
+
+def test_hashed_files_are_resolved(store):
+    [digest] = sources.put(["contract A {}"])
+    files = [{"name": "A.sol", "hash": digest}, {"name": "B.sol", "content": "contract B {}"}]
+
+    assert sources.resolve_files(files) == [
+        {"name": "A.sol", "content": "contract A {}"},
+        {"name": "B.sol", "content": "contract B {}"},
+    ]
+
+
+def test_null_content_is_resolved_from_hash(store):
+    [digest] = sources.put(["contract A {}"])
+
+    resolved = sources.resolve_files([{"name": "A.sol", "content": None, "hash": digest}])
+    assert resolved == [{"name": "A.sol", "content": "contract A {}"}]
+
+
+def test_null_content_with_unknown_hash_is_missing(store):
+    with pytest.raises(MissingSourcesError) as e:
+        sources.resolve_files([{"name": "A.sol", "content": None, "hash": "0" * 64}])
+    assert e.value.missing == ["0" * 64]
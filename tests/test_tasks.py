@@ -0,0 +1,30 @@
+import threading
+
+from celery import Celery
+
+from solbolt.tasks import SharedBackendCelery
+
+BACKEND = "redis://localhost:6379"
+
+
+def backend_in_thread(app):
+    backends = list()
+    thread = threading.Thread(target=lambda: backends.append(app.backend))
+    thread.start()
+    thread.join()
+    return backends[0]
+
+
+def test_backend_is_shared_between_threads():
+    app = SharedBackendCelery("test", backend=BACKEND)
+
+    assert backend_in_thread(app) is app.backend
+
+
+def test_backend_matches_celery():
+    # Guards the backend construction copied from Celery against upgrades
+    shared = SharedBackendCelery("test", backend=BACKEND).backend
+    default = Celery("test", backend=BACKEND).backend
+
+    assert type(shared) is type(default)
+    assert shared.url == default.url